@@ -5,7 +5,6 @@ import threading
 from dotenv import load_dotenv
 import os
 import pyttsx3
-import speech_recognition as sr
 import random
 import webbrowser
 import datetime
@@ -14,7 +13,6 @@ import smtplib
 import ctypes
 import requests
 import pyautogui
-import whisper
 import tempfile
 import sounddevice as sd
 import scipy.io.wavfile
@@ -25,6 +23,12 @@ from gtts import gTTS
 import pygame
 import tempfile
 from alarm_manager import AlarmManager
+from intents import dispatch
+from translation_cache import TranslationCache
+from weather_service import shared_weather_service
+from news_service import shared_news_prefetcher
+from tiered_recognizer import shared_tiered_recognizer
+from model_registry import VOSK_MODEL_PATH, models
 
 # Load the variables from .env
 load_dotenv()
@@ -56,6 +60,12 @@ class ModernVoiceAssistant:
         self.API_KEY = os.getenv("API_KEY")
         self.BASE_URL = os.getenv("BASE_URL")
         self.NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+        self.weather_service = shared_weather_service()
+        self.news_prefetcher = shared_news_prefetcher()
+        # Load the offline speech model in the background while the window opens
+        models.warm_up([("vosk", VOSK_MODEL_PATH)])
+        if self.NEWS_API_KEY:
+            self.news_prefetcher.watch(country="us")
 
         # Email contacts
         self.email_contacts = {
@@ -85,6 +95,13 @@ class ModernVoiceAssistant:
 
         self.alarm_manager = AlarmManager()
 
+        # Translators are reused per target language; results are cached
+        self.translators = {}
+        self.translation_cache = TranslationCache()
+
+        # Voice command routing through the shared intent table
+        self.intent_handlers = self.create_intent_handlers()
+
     def configure_styles(self):
         self.style = ttk.Style()
         self.style.theme_use("clam")
@@ -447,21 +464,17 @@ class ModernVoiceAssistant:
 
     def command(self):
         """Capture voice command from user."""
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            self.update_conversation("System", "Listening...")
-            r.adjust_for_ambient_noise(source)
-            try:
-                audio = r.listen(source, timeout=5)
-                content = r.recognize_google(audio, language="en-in")
-                self.update_conversation("You", content)
-                return content.lower()
-            except sr.UnknownValueError:
-                self.update_conversation("System", "Sorry, I couldn't understand that.")
-                return ""
-            except sr.WaitTimeoutError:
-                self.update_conversation("System", "No speech detected, try again.")
-                return ""
+        # Vosk answers locally; Google is only asked when Vosk is unsure or missing
+        self.update_conversation("System", "Listening...")
+        result = shared_tiered_recognizer().listen(timeout=5)
+        if result is None:
+            self.update_conversation("System", "No speech detected, try again.")
+            return ""
+        if not result.text:
+            self.update_conversation("System", "Sorry, I couldn't understand that.")
+            return ""
+        self.update_conversation("You", result.text)
+        return result.text.lower()
 
     def search_web(self, query, platform):
         """Searches Google, YouTube, or Maps based on the platform specified."""
@@ -521,9 +534,7 @@ class ModernVoiceAssistant:
     def get_weather(self, city):
         """Fetches weather data for a given city."""
         try:
-            params = {"q": city, "appid": self.API_KEY, "units": "metric"}
-            response = requests.get(self.BASE_URL, params=params)
-            data = response.json()
+            data = self.weather_service.get(city)
 
             if data["cod"] != 200:
                 self.speak(
@@ -882,9 +893,7 @@ class ModernVoiceAssistant:
     def get_news(self):
         """Fetch top news headlines using News API."""
         try:
-            url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={self.NEWS_API_KEY}"
-            response = requests.get(url)
-            data = response.json()
+            data = self.news_prefetcher.get(country="us")
 
             if data["status"] != "ok":
                 self.speak("Sorry, I couldn't fetch the news at the moment.")
@@ -1417,13 +1426,44 @@ class ModernVoiceAssistant:
                 return None
             
             # Translate text
-            translator = GoogleTranslator(source='en', target=target_code)
-            translated = translator.translate(text)
+            translated = self.translate_batch([text], target_code)[0]
             return translated, target_code
         except Exception as e:
             self.update_conversation("System", f"Translation error: {str(e)}")
             return None, None
 
+    def get_translator(self, target_code):
+        """Return the shared English-to-target translator, creating it once."""
+        translator = self.translators.get(target_code)
+        if translator is None:
+            translator = GoogleTranslator(source='en', target=target_code)
+            self.translators[target_code] = translator
+        return translator
+
+    def translate_batch(self, texts, target_code):
+        """Translate a list of English strings, sending only uncached ones in one request."""
+        results = {}
+        misses = []
+        for text in dict.fromkeys(texts):
+            cached = self.translation_cache.get(text, "en", target_code)
+            if cached is not None:
+                results[text] = cached
+            else:
+                misses.append(text)
+
+        if misses:
+            translator = self.get_translator(target_code)
+            # One request for every miss; line breaks survive translation, so
+            # the reply splits back into the original strings
+            translated = translator.translate("\n".join(misses)).split("\n")
+            if len(translated) != len(misses):
+                translated = [translator.translate(text) for text in misses]
+            for text, translation in zip(misses, translated):
+                self.translation_cache.put(text, "en", target_code, translation)
+                results[text] = translation
+
+        return [results[text] for text in texts]
+
     def voice_translate(self):
         """Handle voice-based translation"""
         # Ask for the text to translate
@@ -1452,154 +1492,119 @@ class ModernVoiceAssistant:
         else:
             self.speak("Sorry, I couldn't translate the text. Please try again.")
 
-    def main_process(self):
-        """Main function to process commands."""
-        while self.listening:
-            request = self.command()
-
-            if not request:
-                continue  # Skip empty commands
-
-            if "hello" in request or "hi" in request or "hey" in request:
-                self.speak("Welcome! How can I assist you?")
-
-            elif "translate" in request:
-                self.voice_translate()
-
-            elif "play music" in request or "play song" in request:
-                self.speak("Playing song for you.")
-                songs = [
-                    "https://www.youtube.com/watch?v=1G4isv_Fylg",
-                    "https://www.youtube.com/watch?v=pElk1ShPrcE",
-                    "https://youtube.com/playlist?list=PLzo8U24DZFeqD4f6ndxeioj5GbxI_xM78&si=MG02jqW4ku2Oqw9r",
-                    "https://www.youtube.com/watch?v=1cDoRqPnCXU",
-                ]
-                webbrowser.open(random.choice(songs))
-
-            elif "time" in request:
-                self.get_time()
-
-            elif "date" in request:
-                self.get_date()
-
-            elif "search google for" in request:
-                search_query = request.replace("search google for", "").strip()
-                if search_query:
-                    self.search_web(search_query, "google")
-
-            elif "search youtube for" in request:
-                search_query = request.replace("search youtube for", "").strip()
-                if search_query:
-                    self.search_web(search_query, "youtube")
-
-            elif "search maps for" in request or "search google maps for" in request:
-                search_query = (
-                    request.replace("search maps for", "")
-                    .replace("search google maps for", "")
-                    .strip()
-                )
-                if search_query:
-                    self.search_web(search_query, "maps")
-
-            elif "open" in request:
-                app_name = request.replace("open", "").strip()
-                self.open_application(app_name)
-
-            elif "increase volume" in request:
-                self.change_volume("increase")
-
-            elif "decrease volume" in request:
-                self.change_volume("decrease")
-
-            elif "mute volume" in request:
-                self.change_volume("mute")
-
-            elif "unmute volume" in request:
-                self.change_volume("unmute")
-
-            elif "increase brightness" in request:
-                self.change_brightness("increase")
-
-            elif "decrease brightness" in request:
-                self.change_brightness("decrease")
-
-            elif "maximum brightness" in request or "brightness maximum" in request:
-                self.change_brightness("max")
-
-            elif "minimum brightness" in request or "brightness minimum" in request:
-                self.change_brightness("min")
-
-            elif "what is the brightness" in request or "current brightness" in request:
-                self.change_brightness("get")
-
-            elif "weather" in request or "what's the weather" in request:
-                self.speak("Which city's weather would you like to know?")
-                city = self.command()
-                if city:
-                    self.get_weather(city)
-                else:
-                    self.speak("I couldn't get the city name.")
-
-            elif "send email" in request:
-                self.speak("To whom should I send the email?")
-                recipient_name = self.command()
-
-                to_email = self.email_contacts.get(recipient_name)
-                if not to_email:
-                    self.speak("I couldn't find that contact. Please try again.")
-                    continue
+    def play_music(self):
+        """Open a random song on YouTube."""
+        self.speak("Playing song for you.")
+        songs = [
+            "https://www.youtube.com/watch?v=1G4isv_Fylg",
+            "https://www.youtube.com/watch?v=pElk1ShPrcE",
+            "https://youtube.com/playlist?list=PLzo8U24DZFeqD4f6ndxeioj5GbxI_xM78&si=MG02jqW4ku2Oqw9r",
+            "https://www.youtube.com/watch?v=1cDoRqPnCXU",
+        ]
+        webbrowser.open(random.choice(songs))
+
+    def search_for(self, search_query, platform):
+        """Search the platform unless the query is empty."""
+        if search_query:
+            self.search_web(search_query, platform)
+
+    def ask_weather(self):
+        """Ask for a city and speak its weather."""
+        self.speak("Which city's weather would you like to know?")
+        city = self.command()
+        if city:
+            self.get_weather(city)
+        else:
+            self.speak("I couldn't get the city name.")
 
-                self.speak("What should be the subject?")
-                subject = self.command()
-                if not subject:
-                    self.speak("Subject not recognized.")
-                    continue
+    def compose_email(self):
+        """Ask for recipient, subject and message, then send the email."""
+        self.speak("To whom should I send the email?")
+        recipient_name = self.command()
 
-                self.speak("What is the message?")
-                message = self.command()
-                if not message:
-                    self.speak("Message not recognized.")
-                    continue
+        to_email = self.email_contacts.get(recipient_name)
+        if not to_email:
+            self.speak("I couldn't find that contact. Please try again.")
+            return
 
-                self.send_email(to_email, subject, message)
+        self.speak("What should be the subject?")
+        subject = self.command()
+        if not subject:
+            self.speak("Subject not recognized.")
+            return
 
-            elif "send whatsapp message" in request or "send whatsapp" in request:
-                self.speak("To whom should I send the message? You can say a contact name or phone number.")
-                recipient = self.command()
-                if not recipient:
-                    self.speak("I couldn't get the recipient.")
-                    continue
+        self.speak("What is the message?")
+        message = self.command()
+        if not message:
+            self.speak("Message not recognized.")
+            return
 
-                self.speak("What is the message?")
-                message = self.command()
-                if not message:
-                    self.speak("I couldn't get the message.")
-                    continue
+        self.send_email(to_email, subject, message)
 
-                self.send_whatsapp_message(recipient, message)
+    def compose_whatsapp(self):
+        """Ask for recipient and message, then send the WhatsApp message."""
+        self.speak("To whom should I send the message? You can say a contact name or phone number.")
+        recipient = self.command()
+        if not recipient:
+            self.speak("I couldn't get the recipient.")
+            return
 
-            elif "start dictation" in request or "dictate" in request:
-                self.dictate_to_file()
+        self.speak("What is the message?")
+        message = self.command()
+        if not message:
+            self.speak("I couldn't get the message.")
+            return
 
-            elif "set reminder" in request or "create reminder" in request:
-                self.set_reminder()
+        self.send_whatsapp_message(recipient, message)
 
-            elif "manage reminders" in request or "show reminders" in request or "list reminders" in request:
-                self.manage_reminders()
+    def stop_listening(self):
+        """Say goodbye and stop the listening loop."""
+        self.speak("Goodbye! See you soon.")
+        self.listening = False
+        self.toggle_listening()  # Update button state
+
+    def create_intent_handlers(self):
+        """Map intent names from intents.py to assistant actions."""
+        return {
+            "greeting": lambda match: self.speak("Welcome! How can I assist you?"),
+            "translate": lambda match: self.voice_translate(),
+            "play_music": lambda match: self.play_music(),
+            "time": lambda match: self.get_time(),
+            "date": lambda match: self.get_date(),
+            "search_google": lambda match: self.search_for(match.remainder, "google"),
+            "search_youtube": lambda match: self.search_for(match.remainder, "youtube"),
+            "search_maps": lambda match: self.search_for(match.remainder, "maps"),
+            "open": lambda match: self.open_application(match.remainder),
+            "volume_up": lambda match: self.change_volume("increase"),
+            "volume_down": lambda match: self.change_volume("decrease"),
+            "volume_mute": lambda match: self.change_volume("mute"),
+            "volume_unmute": lambda match: self.change_volume("unmute"),
+            "brightness_up": lambda match: self.change_brightness("increase"),
+            "brightness_down": lambda match: self.change_brightness("decrease"),
+            "brightness_max": lambda match: self.change_brightness("max"),
+            "brightness_min": lambda match: self.change_brightness("min"),
+            "brightness_get": lambda match: self.change_brightness("get"),
+            "weather": lambda match: self.ask_weather(),
+            "send_email": lambda match: self.compose_email(),
+            "send_whatsapp": lambda match: self.compose_whatsapp(),
+            "dictation": lambda match: self.dictate_to_file(),
+            "set_reminder": lambda match: self.set_reminder(),
+            "manage_reminders": lambda match: self.manage_reminders(),
+            "news": lambda match: self.get_news(),
+            "joke": lambda match: self.get_joke(),
+            "manage_contacts": lambda match: self.manage_contacts(),
+            "exit": lambda match: self.stop_listening(),
+        }
 
-            elif "news" in request or "headlines" in request or "what's the news" in request:
-                self.get_news()
-            
-            elif "tell me a joke" in request or "joke" in request or "tell me another joke" in request:
-                self.get_joke()
+    def main_process(self):
+        """Main function to process commands."""
+        while self.listening:
+            request = self.command()
 
-            elif "manage contacts" in request or "edit contacts" in request:
-                self.manage_contacts()
+            if not request:
+                continue  # Skip empty commands
 
-            elif "exit" in request or "stop" in request or "bye" in request:
-                self.speak("Goodbye! See you soon.")
-                self.listening = False
-                self.toggle_listening()  # Update button state
+            dispatch(request, self.intent_handlers)
 
     def exit_app(self):
         """Clean exit from the application."""
@@ -4,86 +4,77 @@ from assistant import (
     speak, search_web, open_application, change_volume,
     get_weather, set_alarm, set_reminder
 )
+from intents import dispatch
 
 app = Flask(__name__)
 
+
+def respond(text):
+    """Speak text and return it as the page response."""
+    speak(text)
+    return text
+
+
+def search_for(query, platform, label):
+    """Search the platform and describe the search."""
+    search_web(query, platform)
+    return f"Searching {label} for {query}"
+
+
+def open_app(app_name):
+    """Open the application and describe it."""
+    open_application(app_name)
+    return f"Opening {app_name}"
+
+
+def volume(action, message):
+    """Change the volume and describe the change."""
+    change_volume(action)
+    return message
+
+
+def alarm():
+    """Open the clock to set an alarm."""
+    set_alarm()
+    return "Opening clock to set alarm"
+
+
+def reminder():
+    """Open the clock to set a reminder."""
+    set_reminder()
+    return "Opening clock to set reminder"
+
+
+# Intent handlers, routed through the shared matcher in intents.py
+handlers = {
+    "greeting": lambda match: respond("Welcome! How can I assist you?"),
+    "play_music": lambda match: respond("Playing music!"),
+    "time": lambda match: respond(f"The current time is {datetime.now().strftime('%H:%M')}"),
+    "date": lambda match: respond(f"Today's date is {datetime.now().strftime('%d-%m-%Y')}"),
+    "search_google": lambda match: search_for(match.remainder, "google", "Google"),
+    "search_youtube": lambda match: search_for(match.remainder, "youtube", "YouTube"),
+    "search_maps": lambda match: search_for(match.remainder, "maps", "Maps"),
+    "open": lambda match: open_app(match.remainder),
+    "volume_up": lambda match: volume("increase", "Volume increased"),
+    "volume_down": lambda match: volume("decrease", "Volume decreased"),
+    "volume_mute": lambda match: volume("mute", "Volume muted"),
+    "volume_unmute": lambda match: volume("unmute", "Volume unmuted"),
+    "weather": lambda match: get_weather("Mumbai"),  # Default city or extract from input if needed
+    "set_alarm": lambda match: alarm(),
+    "set_reminder": lambda match: reminder(),
+    "exit": lambda match: respond("Goodbye!"),
+}
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     response = ""
     if request.method == "POST":
         user_input = request.form.get("command").lower()
-
-        if "hello" in user_input or "hi" in user_input:
-            response = "Welcome! How can I assist you?"
-            speak(response)
-
-        elif "play music" in user_input:
-            response = "Playing music!"
-            speak(response)
-
-        elif "time" in user_input:
-            now = datetime.now().strftime("%H:%M")
-            response = f"The current time is {now}"
-            speak(response)
-
-        elif "date" in user_input:
-            today = datetime.now().strftime("%d-%m-%Y")
-            response = f"Today's date is {today}"
-            speak(response)
-
-        elif "search google for" in user_input:
-            query = user_input.replace("search google for", "").strip()
-            search_web(query, "google")
-            response = f"Searching Google for {query}"
-
-        elif "search youtube for" in user_input:
-            query = user_input.replace("search youtube for", "").strip()
-            search_web(query, "youtube")
-            response = f"Searching YouTube for {query}"
-
-        elif "search maps for" in user_input:
-            query = user_input.replace("search maps for", "").strip()
-            search_web(query, "maps")
-            response = f"Searching Maps for {query}"
-
-        elif "open" in user_input:
-            app_name = user_input.replace("open", "").strip()
-            open_application(app_name)
-            response = f"Opening {app_name}"
-
-        elif "increase volume" in user_input:
-            change_volume("increase")
-            response = "Volume increased"
-
-        elif "decrease volume" in user_input:
-            change_volume("decrease")
-            response = "Volume decreased"
-
-        elif "mute volume" in user_input:
-            change_volume("mute")
-            response = "Volume muted"
-
-        elif "unmute volume" in user_input:
-            change_volume("unmute")
-            response = "Volume unmuted"
-
-        elif "weather" in user_input or "what's the weather" in user_input:
-            response = get_weather("Mumbai")  # Default city or extract from input if needed
-
-        elif "set alarm" in user_input:
-            set_alarm()
-            response = "Opening clock to set alarm"
-
-        elif "set reminder" in user_input:
-            set_reminder()
-            response = "Opening clock to set reminder"
-
-        elif "exit" in user_input or "stop" in user_input:
-            response = "Goodbye!"
-            speak(response)
-
-        else:
-            response = "Sorry, I couldn't understand that."
-            speak(response)
+        response = dispatch(
+            user_input,
+            handlers,
+            default=lambda text: respond("Sorry, I couldn't understand that."),
+        )
 
     return render_template("index.html", response=response)
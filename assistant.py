@@ -1,27 +1,23 @@
 from dotenv import load_dotenv
 import os
-import pyttsx3
+from tts_service import SpeechOutput
+from weather_service import shared_weather_service
 import webbrowser
 import subprocess
 import ctypes
-import requests
 
 # Load .env variables
 load_dotenv()
 
-# Text-to-speech engine setup
-engine = pyttsx3.init()
-voices = engine.getProperty("voices")
-engine.setProperty("voice", voices[0].id)
-engine.setProperty("rate", 175)
+# Text-to-speech runs on its own thread so web requests never wait for it
+speech_output = SpeechOutput()
 
 API_KEY = os.getenv("API_KEY")
 BASE_URL = os.getenv("BASE_URL")
 
 def speak(text):
-    """Use text-to-speech to speak text"""
-    engine.say(text)
-    engine.runAndWait()
+    """Queue text for text-to-speech"""
+    speech_output.say(text)
 
 def search_web(query, platform):
     """Searches Google, YouTube, or Maps"""
@@ -77,9 +73,7 @@ def change_volume(action):
 def get_weather(city):
     """Get weather for a given city"""
     try:
-        params = {"q": city, "appid": API_KEY, "units": "metric"}
-        response = requests.get(BASE_URL, params=params)
-        data = response.json()
+        data = shared_weather_service().get(city)
 
         if data["cod"] != 200:
             message = f"Couldn't fetch weather. Error: {data.get('message', 'Unknown error')}"
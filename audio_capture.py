@@ -0,0 +1,442 @@
+import queue
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from audio_frontend import AUDIO_INPUT_CHANNELS, AudioFrontEnd, input_rate_for
+from audio_preprocess import AUDIO_PREPROCESS, Preprocessor
+from voice_activity import END, SAMPLE_WIDTH, START, VoiceActivityDetector
+
+try:
+    import sounddevice as sd
+except ImportError:  # Only needed for a real microphone; WAV input works without it
+    sd = None
+
+SAMPLE_RATE = 16000
+
+
+class RingBuffer:
+    """Fixed-size byte ring between the audio callback and the reader thread.
+
+    write() never blocks; when the reader falls behind the oldest audio is
+    overwritten and counted in dropped.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def write(self, data: bytes):
+        with self._condition:
+            data = memoryview(data)
+            if len(data) > self.capacity:
+                self.dropped += len(data) - self.capacity
+                data = data[-self.capacity:]
+            overflow = self._size + len(data) - self.capacity
+            if overflow > 0:
+                self._start = (self._start + overflow) % self.capacity
+                self._size -= overflow
+                self.dropped += overflow
+            end = (self._start + self._size) % self.capacity
+            first = min(len(data), self.capacity - end)
+            self._buffer[end:end + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self._size += len(data)
+            self._condition.notify()
+
+    def read(self, size: int, timeout: Optional[float] = None) -> bytes:
+        """Return exactly size bytes, or b"" on timeout or once closed."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._size >= size or self._closed, timeout):
+                return b""
+            if self._size < size:
+                return b""
+            first = min(size, self.capacity - self._start)
+            data = bytes(self._buffer[self._start:self._start + first]) + bytes(self._buffer[:size - first])
+            self._start = (self._start + size) % self.capacity
+            self._size -= size
+            return data
+
+    def clear(self):
+        with self._condition:
+            self._start = 0
+            self._size = 0
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class BlockRing:
+    """Preallocated ring of fixed-size audio blocks between a capture callback and one reader.
+
+    write() copies a block into the next free slot in place; get() hands the
+    reader a memoryview of the oldest slot, which stays untouched until
+    release(). No audio buffer is allocated per block. When the reader falls behind,
+    new blocks are dropped and counted in overruns rather than overwriting
+    audio it may still be decoding.
+    """
+
+    def __init__(self, block_bytes: int, blocks: int):
+        self.block_bytes = block_bytes
+        self._data = bytearray(block_bytes * blocks)
+        view = memoryview(self._data)
+        self._slots = [view[i * block_bytes:(i + 1) * block_bytes] for i in range(blocks)]
+        self._lengths = [0] * blocks
+        self._available = threading.Semaphore(0)
+        # Block counters; written - released is how many slots are in use
+        self.written = 0
+        self.released = 0
+        self.overruns = 0
+
+    def write(self, data) -> bool:
+        """Copy one block into the ring; returns False if it was dropped because the ring is full."""
+        if self.written - self.released >= len(self._slots):
+            self.overruns += 1
+            return False
+        index = self.written % len(self._slots)
+        size = min(len(data), self.block_bytes)
+        if size == self.block_bytes:
+            self._slots[index][:] = data
+        else:
+            self._slots[index][:size] = data[:size]
+        self._lengths[index] = size
+        self.written += 1
+        self._available.release()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """Return the oldest block, or None on timeout or once closed; release() it when done."""
+        if not self._available.acquire(timeout=timeout) or self.released >= self.written:
+            return None
+        index = self.released % len(self._slots)
+        slot = self._slots[index]
+        return slot if self._lengths[index] == self.block_bytes else slot[:self._lengths[index]]
+
+    def release(self):
+        """Hand the slot returned by get() back to the writer."""
+        self.released += 1
+
+    def close(self):
+        """Wake a reader blocked in get()."""
+        self._available.release()
+
+    def __len__(self) -> int:
+        return self.written - self.released
+
+
+@dataclass
+class Utterance:
+    audio: bytes
+    sample_rate: int
+    started_at: float
+    # When the endpointer closed the utterance
+    ended_at: float = 0.0
+    # Position in the stream, in seconds, of the last speech frame
+    speech_end: float = 0.0
+    # Bumped by reset(); utterances from before a reset are stale for listen()
+    epoch: int = 0
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / (self.sample_rate * SAMPLE_WIDTH)
+
+
+class WavInputStream:
+    """Stand-in for sd.RawInputStream that plays a 16-bit WAV file into the callback.
+
+    speed=1 delivers blocks at the file's own pace, like a microphone; higher
+    values replay faster and speed=0 as fast as possible (keep the reader's
+    buffer longer than the file then). Silence follows the end of the file
+    so the last utterance is closed.
+    """
+
+    def __init__(self, path: str, samplerate: int, blocksize: int, callback: Callable,
+                 speed: float = 1.0):
+        self.path = path
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"{path} must be 16-bit PCM")
+            if wav.getframerate() != samplerate:
+                raise ValueError(f"{path} is {wav.getframerate()} Hz, not {samplerate} Hz")
+            self.channels = wav.getnchannels()
+        self.samplerate = samplerate
+        self.finished = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._play, name="wav-input", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+    def _play(self):
+        block_seconds = self.blocksize / self.samplerate / (self.speed or float("inf"))
+        silence = bytes(self.blocksize * SAMPLE_WIDTH * self.channels)
+        next_block = time.monotonic()
+        with wave.open(self.path, "rb") as wav:
+            while self._running:
+                data = wav.readframes(self.blocksize)
+                if len(data) < len(silence):
+                    if not self.finished.is_set():
+                        data += silence[len(data):]
+                        self.finished.set()
+                    else:
+                        data = silence
+                # Like a real device, a block is delivered once its audio has been "recorded"
+                if self.finished.is_set():
+                    # Trailing silence at real-time pace so it never floods the reader
+                    time.sleep(self.blocksize / self.samplerate)
+                elif self.speed:
+                    next_block += block_seconds
+                    time.sleep(max(0.0, next_block - time.monotonic()))
+                self.callback(data, self.blocksize, None, None)
+
+
+class DeviceStatus:
+    """Counts the input overflows and underflows reported to an audio callback.
+
+    record() runs on the audio thread, so it only counts; report() prints
+    any new problems from the thread consuming the audio.
+    """
+
+    def __init__(self):
+        self.overflows = 0
+        self.underflows = 0
+        self._reported = (0, 0)
+
+    def record(self, status):
+        if status:
+            self.overflows += bool(status.input_overflow)
+            self.underflows += bool(status.input_underflow)
+
+    def report(self):
+        counts = (self.overflows, self.underflows)
+        if counts != self._reported:
+            self._reported = counts
+            print(f"Status: {counts[0]} input overflows, {counts[1]} input underflows so far")
+
+
+class MicrophoneStream:
+    """A capture stream that stays open and cuts the audio into utterances.
+
+    The input callback only copies audio into a ring buffer. A worker thread
+    reads frames from it and a VoiceActivityDetector cuts them into
+    utterances. listen() returns the next utterance as soon as it ends, with
+    no per-command stream setup or ambient noise calibration.
+
+    The device records at input_rate with any number of channels (by
+    default the recognizer's rate if the device supports it); the worker
+    converts to mono sample_rate audio before detection. With preprocess,
+    the converted audio is also denoised and gated (see Preprocessor), so
+    hum and fan noise do not open utterances.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, device=None,
+                 stream_factory: Optional[Callable] = None, buffer_seconds: float = 10.0,
+                 vad: Optional[VoiceActivityDetector] = None, input_rate: Optional[int] = None,
+                 channels: int = AUDIO_INPUT_CHANNELS, preprocess: bool = AUDIO_PREPROCESS):
+        self.sample_rate = sample_rate
+        self.vad = vad or VoiceActivityDetector(sample_rate)
+        self.frame_size = self.vad.frame_bytes // SAMPLE_WIDTH
+        self.device = device
+        self.stream_factory = stream_factory or self._open_device
+        if input_rate is None:
+            input_rate = input_rate_for(device, sample_rate, channels) if stream_factory is None else sample_rate
+        self.front_end = AudioFrontEnd(input_rate, sample_rate, channels)
+        self.preprocessor = Preprocessor(sample_rate) if preprocess else None
+        # Frames the device delivers per callback: one detector frame's worth
+        self.block_size = round(self.frame_size * input_rate / sample_rate)
+        self.buffer = RingBuffer(int(buffer_seconds * input_rate) * self.front_end.input_frame_bytes)
+        self._utterances: "queue.Queue[Utterance]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = False
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._epoch = 0
+        self._pending_epoch = 0
+        self.device_status = DeviceStatus()
+
+    @property
+    def in_speech(self) -> bool:
+        return self.vad.in_speech
+
+    @property
+    def noise_floor(self):
+        return self.vad.noise_floor
+
+    @classmethod
+    def from_wav(cls, path: str, speed: float = 1.0, **kwargs) -> "MicrophoneStream":
+        """Build a stream whose input device is a WAV file, for tests and replays."""
+        with wave.open(path, "rb") as wav:
+            input_rate = wav.getframerate()
+            channels = wav.getnchannels()
+
+        def factory(samplerate, blocksize, callback):
+            return WavInputStream(path, samplerate, blocksize, callback, speed=speed)
+
+        return cls(stream_factory=factory, input_rate=input_rate, channels=channels, **kwargs)
+
+    def _open_device(self, samplerate, blocksize, callback):
+        if sd is None:
+            raise RuntimeError("sounddevice is not installed")
+        return sd.RawInputStream(samplerate=samplerate, blocksize=blocksize, device=self.device,
+                                 dtype="int16", channels=self.front_end.channels, callback=callback)
+
+    def start(self):
+        """Open the input device and start segmenting."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="mic-segmenter", daemon=True)
+            self._thread.start()
+            try:
+                self._stream = self.stream_factory(self.front_end.input_rate, self.block_size, self._callback)
+                self._stream.start()
+            except Exception:
+                self._running = False
+                self.buffer.close()
+                self._thread.join()
+                raise
+
+    def stop(self):
+        """Close the input device and stop segmenting."""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        self.buffer.close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _callback(self, indata, frames, time_info, status):
+        # Runs on the audio thread: printing here could block and cause more overruns
+        self.device_status.record(status)
+        self.buffer.write(indata)
+
+    def _run(self):
+        frame_bytes = self.vad.frame_bytes
+        block_bytes = self.block_size * self.front_end.input_frame_bytes
+        pending = bytearray()
+        segment = bytearray()
+        started_at = 0.0
+        while self._running:
+            block = self.buffer.read(block_bytes, timeout=0.1)
+            self.device_status.report()
+            if not block:
+                continue
+            if self._pending_epoch != self._epoch:
+                self._epoch = self._pending_epoch
+                self.vad.reset()
+                pending.clear()
+                segment.clear()
+            audio = self.front_end.process(block)
+            if self.preprocessor is not None:
+                audio = self.preprocessor.process(audio)
+            pending += audio
+            while len(pending) >= frame_bytes:
+                frame = bytes(pending[:frame_bytes])
+                del pending[:frame_bytes]
+                event, audio = self.vad.process(frame)
+                if event == START:
+                    started_at = time.time() - len(audio) / (self.sample_rate * SAMPLE_WIDTH)
+                    segment = bytearray()
+                segment += audio
+                if event == END:
+                    speech_end = self.vad.last_speech_frame * self.vad.frame_ms / 1000
+                    self._utterances.put(Utterance(
+                        bytes(segment), self.sample_rate, started_at, time.time(), speech_end, self._epoch
+                    ))
+                    segment = bytearray()
+
+    def reset(self) -> int:
+        """Drop buffered audio and any utterance in progress; returns the new epoch."""
+        with self._lock:
+            self.buffer.clear()
+            while True:
+                try:
+                    self._utterances.get_nowait()
+                except queue.Empty:
+                    break
+            self._pending_epoch += 1
+            return self._pending_epoch
+
+    def utterances(self) -> Iterator[Utterance]:
+        """Yield utterances as they end until stop() is called."""
+        while self._running or not self._utterances.empty():
+            try:
+                yield self._utterances.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def listen(self, timeout: float = 5, fresh: bool = True) -> Optional[Utterance]:
+        """Return the next utterance, or None if no speech starts within timeout seconds.
+
+        With fresh=True, audio captured before the call (such as the
+        assistant's own voice) is discarded first.
+        """
+        epoch = self.reset() if fresh else self._epoch
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if not self.in_speech:
+                    return None
+                # Speech has started: the detector ends it within max_utterance_s
+                deadline = time.monotonic() + self.vad.max_frames * self.vad.frame_ms / 1000
+                continue
+            try:
+                utterance = self._utterances.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+            if utterance.epoch >= epoch:
+                return utterance
+
+
+_shared_microphone: Optional[MicrophoneStream] = None
+_shared_microphone_lock = threading.Lock()
+
+
+def shared_microphone() -> MicrophoneStream:
+    """Return the started process-wide microphone stream."""
+    global _shared_microphone
+    with _shared_microphone_lock:
+        if _shared_microphone is None:
+            microphone = MicrophoneStream()
+            microphone.start()
+            _shared_microphone = microphone
+        return _shared_microphone
+
@@ -0,0 +1,156 @@
+import os
+from math import gcd
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+except ImportError:  # Only needed to ask a real device what it supports
+    sd = None
+
+# 0 lets input_rate_for() pick: the recognizer's rate if the device supports
+# it, otherwise the device's default rate, converted by the front end
+AUDIO_INPUT_RATE = int(os.getenv("AUDIO_INPUT_RATE", "0"))
+AUDIO_INPUT_CHANNELS = int(os.getenv("AUDIO_INPUT_CHANNELS", "1"))
+
+# Scale of each input sample format relative to 16-bit PCM, and its zero point
+SAMPLE_FORMATS = {
+    "uint8": (256.0, 128),
+    "int16": (1.0, 0),
+    "int32": (1 / 65536, 0),
+    "float32": (32768.0, 0),
+}
+WAV_FORMATS = {1: "uint8", 2: "int16", 4: "int32"}
+
+
+def lowpass_filter(taps: int, cutoff: float, beta: float = 5.0) -> np.ndarray:
+    """Kaiser-windowed sinc lowpass with unity DC gain; cutoff is a fraction of Nyquist.
+
+    The same design scipy.signal.firwin(taps, cutoff, window=("kaiser", beta)) returns.
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(taps, beta)
+    return h / h.sum()
+
+
+class Resampler:
+    """Streaming polyphase resampler between two integer rates.
+
+    Equivalent to scipy.signal.resample_poly over the whole signal, but fed
+    block by block: each output sample is computed once, from the filter
+    phase it falls on, as soon as the input it needs has arrived. Only the
+    last few input samples are kept between blocks.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int):
+        divisor = gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        max_rate = max(self.up, self.down)
+        # Filter length and cutoff as resample_poly chooses them
+        self.half_len = 10 * max_rate
+        h = lowpass_filter(2 * self.half_len + 1, 1 / max_rate) * self.up
+        self.taps = -(-len(h) // self.up)
+        h = np.concatenate([h, np.zeros(self.taps * self.up - len(h))])
+        # _phases[p, j] = h[p + j * up], reversed so a row lines up with the input it weighs
+        self._phases = h.reshape(self.taps, self.up).T[:, ::-1].copy()
+        self._offsets = np.arange(self.taps)
+        # Input history, starting at absolute sample index _base; zeros before the stream
+        self._buffer = np.zeros(self.taps - 1)
+        self._base = -(self.taps - 1)
+        self._next = 0
+        self.samples_in = 0
+        self.samples_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next block of samples; returns every output sample now computable."""
+        self.samples_in += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples])
+        end = self._base + len(self._buffer)
+        # Output n sits at t = n * down + half_len in the upsampled signal and
+        # needs input up to t // up; half_len undoes the filter's delay
+        stop = max(self._next, -(-(end * self.up - self.half_len) // self.down))
+        n = np.arange(self._next, stop)
+        t = n * self.down + self.half_len
+        last = t // self.up - self._base
+        window = self._buffer[last[:, None] - (self.taps - 1) + self._offsets]
+        output = np.einsum("nk,nk->n", self._phases[t % self.up], window)
+
+        self._next = stop
+        keep_from = (stop * self.down + self.half_len) // self.up - (self.taps - 1)
+        if keep_from > self._base:
+            self._buffer = self._buffer[keep_from - self._base:]
+            self._base = keep_from
+        self.samples_out += len(output)
+        return output
+
+    def flush(self) -> np.ndarray:
+        """Return the output still owed for the input so far, as if followed by silence."""
+        total = -(-self.samples_in * self.up // self.down)
+        owed = total - self.samples_out
+        if owed <= 0:
+            return np.zeros(0)
+        samples_in = self.samples_in
+        output = self.process(np.zeros(self.half_len // self.up + self.taps + 1))[:owed]
+        self.samples_in = samples_in
+        self.samples_out = total
+        return output
+
+
+class AudioFrontEnd:
+    """Converts captured audio of any rate, channel count and sample format to mono 16-bit PCM.
+
+    process() takes raw interleaved blocks as they arrive and returns the
+    converted audio for them; input already in the output format is passed
+    through untouched.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int, channels: int = 1, dtype: str = "int16"):
+        if dtype not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {dtype}")
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.channels = channels
+        self.dtype = dtype
+        self.passthrough = input_rate == output_rate and channels == 1 and dtype == "int16"
+        self.resampler = Resampler(input_rate, output_rate) if input_rate != output_rate else None
+
+    @property
+    def input_frame_bytes(self) -> int:
+        return self.channels * np.dtype(self.dtype).itemsize
+
+    def process(self, data) -> bytes:
+        """Convert one block of raw input; returns 16-bit mono PCM at the output rate."""
+        if self.passthrough:
+            return data
+        scale, zero = SAMPLE_FORMATS[self.dtype]
+        samples = np.frombuffer(data, dtype=self.dtype)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        samples = (samples.astype(np.float64) - zero) * scale
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        return self._to_pcm(samples)
+
+    def flush(self) -> bytes:
+        """Return the converted audio still held back by the resampler at the end of the input."""
+        if self.resampler is None:
+            return b""
+        return self._to_pcm(self.resampler.flush())
+
+    @staticmethod
+    def _to_pcm(samples: np.ndarray) -> bytes:
+        return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+def input_rate_for(device, preferred: int, channels: int = 1) -> int:
+    """Return preferred if the input device can record at it, else the device's default rate."""
+    if AUDIO_INPUT_RATE:
+        return AUDIO_INPUT_RATE
+    if sd is None:
+        return preferred
+    try:
+        sd.check_input_settings(device=device, samplerate=preferred, channels=channels, dtype="int16")
+        return preferred
+    except Exception:
+        return int(sd.query_devices(device, "input")["default_samplerate"])
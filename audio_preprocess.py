@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+
+from voice_activity import NoiseFloor
+
+# Set to 1 to denoise and gate captured audio before recognition. Off by
+# default: it cuts the audio the endpointer passes on in noisy rooms (see
+# preprocess_benchmark.py), but its effect on recognition accuracy has not
+# been measured, and Kaldi models are trained on unprocessed noisy speech
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "0") == "1"
+AUDIO_NOISE_REDUCTION = os.getenv("AUDIO_NOISE_REDUCTION", "1") == "1"
+AUDIO_NOISE_GATE = os.getenv("AUDIO_NOISE_GATE", "1") == "1"
+# Vosk (Kaldi) and Whisper apply their own pre-emphasis when computing
+# features, so it is off by default; 0.97 suits engines that do not
+AUDIO_PRE_EMPHASIS = float(os.getenv("AUDIO_PRE_EMPHASIS", "0"))
+
+# Spectral subtraction runs on FFT_SIZE frames with 50% overlap; output lags
+# input by FFT_SIZE / 2 samples (16 ms at 16 kHz)
+FFT_SIZE = 512
+# How much of the noise estimate is subtracted, and the lowest gain any bin
+# keeps; a floor above zero avoids the "musical noise" of fully muted bins
+OVERSUBTRACTION = 2.0
+SPECTRAL_FLOOR = 0.1
+NOISE_SMOOTHING = 0.1
+# Frames whose energy is under NOISE_FRAME_RATIO times the noise estimate update it
+NOISE_FRAME_RATIO = 2.0
+# The gate closes after GATE_HOLD_MS below GATE_RATIO times the noise floor
+GATE_RATIO = 2.0
+GATE_MIN_RMS = 30.0
+GATE_HOLD_MS = 250
+DC_SMOOTHING = 0.01
+
+
+class Preprocessor:
+    """Cleans 16-bit mono PCM block by block before it reaches a recognizer.
+
+    Each call removes DC offset, subtracts a running estimate of the
+    background noise spectrum (hum, fans), zeroes stretches that stay near
+    the noise floor, and optionally applies pre-emphasis. All of it is
+    vectorized over the frames a block completes, so the cost per block is a
+    handful of NumPy calls. Output comes out in FFT_SIZE / 2 sample steps,
+    so a call may return more or less audio than it was given.
+    """
+
+    def __init__(self, sample_rate: int, noise_reduction: bool = AUDIO_NOISE_REDUCTION,
+                 gate: bool = AUDIO_NOISE_GATE, pre_emphasis: float = AUDIO_PRE_EMPHASIS,
+                 fft_size: int = FFT_SIZE):
+        self.sample_rate = sample_rate
+        self.noise_reduction = noise_reduction
+        self.gate = gate
+        self.pre_emphasis = pre_emphasis
+        self.fft_size = fft_size
+        self.hop = fft_size // 2
+        # sqrt-Hann analysis and synthesis windows overlap-add back to unity at 50% overlap
+        self._window = np.sqrt(np.hanning(fft_size + 1)[:-1])
+        self._frame_index = np.arange(fft_size)
+        self._input = np.zeros(self.hop)
+        self._overlap = np.zeros(self.hop)
+        self._noise_power = None
+        self._dc = 0.0
+        self._last_sample = 0.0
+        self.noise_floor = NoiseFloor(initial=GATE_MIN_RMS / GATE_RATIO, ratio=GATE_RATIO, minimum=GATE_MIN_RMS)
+        self._hold_hops = max(1, GATE_HOLD_MS * sample_rate // 1000 // self.hop)
+        self._quiet_hops = self._hold_hops
+        self.samples_in = 0
+        self.samples_gated = 0
+
+    def process(self, pcm: bytes) -> bytes:
+        """Clean the next block; returns the processed audio that is now complete."""
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+        self.samples_in += len(samples)
+        # DC offset follows a slow running mean, so it adapts across blocks
+        if len(samples):
+            self._dc += DC_SMOOTHING * (samples.mean() - self._dc)
+        buffer = np.concatenate([self._input, samples - self._dc])
+        hops = (len(buffer) - self.hop) // self.hop
+        if hops <= 0:
+            self._input = buffer
+            return b""
+        self._input = buffer[hops * self.hop:]
+
+        frames = buffer[np.arange(hops)[:, None] * self.hop + self._frame_index] * self._window
+        if self.noise_reduction:
+            frames = self._subtract_noise(frames)
+        else:
+            frames = frames * self._window
+        # Overlap-add: each hop is the first half of its frame plus the second half of the one before
+        halves = np.vstack([self._overlap[None, :], frames[:, self.hop:]])
+        output = (frames[:, :self.hop] + halves[:-1]).ravel()
+        self._overlap = halves[-1]
+
+        if self.gate:
+            self._apply_gate(output, buffer[:hops * self.hop])
+        if self.pre_emphasis:
+            previous = np.concatenate([[self._last_sample], output[:-1]])
+            self._last_sample = output[-1]
+            output = output - self.pre_emphasis * previous
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16).tobytes()
+
+    def _subtract_noise(self, frames: np.ndarray) -> np.ndarray:
+        spectrum = np.fft.rfft(frames, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        energy = power.mean(axis=1)
+        if self._noise_power is None:
+            # Assume the stream starts with background noise, as microphones usually do
+            self._noise_power = power.min(axis=0)
+        noise = energy < NOISE_FRAME_RATIO * self._noise_power.mean()
+        if noise.any():
+            self._noise_power += NOISE_SMOOTHING * (power[noise].mean(axis=0) - self._noise_power)
+        gain = np.sqrt(np.maximum(1 - OVERSUBTRACTION * self._noise_power / np.maximum(power, 1e-9),
+                                  SPECTRAL_FLOOR ** 2))
+        gain[:, 0] = 0  # DC
+        return np.fft.irfft(spectrum * gain, self.fft_size, axis=1) * self._window
+
+    def _apply_gate(self, output: np.ndarray, original: np.ndarray):
+        """Zero hops in place once the input has stayed at the noise floor for the hold time."""
+        levels = np.sqrt(np.mean(original.reshape(-1, self.hop) ** 2, axis=1))
+        for hop, level in enumerate(levels):
+            if self.noise_floor.is_speech(level):
+                self._quiet_hops = 0
+            else:
+                self.noise_floor.update(level)
+                self._quiet_hops += 1
+            if self._quiet_hops >= self._hold_hops:
+                output[hop * self.hop:(hop + 1) * self.hop] = 0
+                self.samples_gated += self.hop
+
+    def stats(self) -> dict:
+        return {
+            "seconds_in": round(self.samples_in / self.sample_rate, 3),
+            "gated_ratio": round(self.samples_gated / self.samples_in, 3) if self.samples_in else None,
+        }
+
@@ -0,0 +1,143 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List
+
+from audio_frontend import WAV_FORMATS, AudioFrontEnd
+from model_registry import VOSK_MODEL_PATH, models
+
+AUDIO_EXTENSIONS = (".wav",)
+CHUNK_FRAMES = 4000
+# Files at other rates, in stereo or in 8/32-bit PCM are converted to this
+SAMPLE_RATE = 16000
+
+# Set in each worker process by init_worker
+_model_path = None
+
+
+def find_audio_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the audio files they contain, in a stable order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def init_worker(model_path: str):
+    """Load the model once per worker process, before the first file arrives."""
+    global _model_path
+    _model_path = model_path
+    # Keep the registry's load message out of JSONL written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        models.load("vosk", model_path)
+
+
+def transcribe_file(path: str, words: bool = True) -> Dict[str, Any]:
+    """Decode one PCM WAV file with Vosk and return text, segments and timings."""
+    from vosk import KaldiRecognizer
+
+    started = time.perf_counter()
+    try:
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() not in WAV_FORMATS or wav.getcomptype() != "NONE":
+                raise ValueError("audio must be 8, 16 or 32-bit PCM WAV")
+            duration = wav.getnframes() / wav.getframerate()
+            # Converted chunk by chunk as it is read; no resampled copy is written anywhere
+            front_end = AudioFrontEnd(wav.getframerate(), SAMPLE_RATE, wav.getnchannels(),
+                                      WAV_FORMATS[wav.getsampwidth()])
+            recognizer = KaldiRecognizer(models.get("vosk", _model_path), SAMPLE_RATE)
+            recognizer.SetWords(words)
+            segments = []
+            while True:
+                data = wav.readframes(CHUNK_FRAMES)
+                data = front_end.process(data) if data else front_end.flush()
+                if not data:
+                    break
+                if recognizer.AcceptWaveform(data):
+                    segments.append(json.loads(recognizer.Result()))
+            segments.append(json.loads(recognizer.FinalResult()))
+    except Exception as e:
+        return {"file": path, "error": str(e) or type(e).__name__}
+
+    segments = [segment for segment in segments if segment.get("text")]
+    elapsed = time.perf_counter() - started
+    result = {
+        "file": path,
+        "duration": round(duration, 3),
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": [
+            {
+                "text": segment["text"],
+                "start": segment["result"][0]["start"] if segment.get("result") else None,
+                "end": segment["result"][-1]["end"] if segment.get("result") else None,
+                "words": segment.get("result", []),
+            }
+            for segment in segments
+        ],
+        "processing_seconds": round(elapsed, 3),
+        "rtf": round(elapsed / duration, 4) if duration else None,
+    }
+    if not words:
+        for segment in result["segments"]:
+            del segment["words"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe WAV files offline with Vosk, as JSON lines.")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories to search for them")
+    parser.add_argument("-o", "--output", help="write JSONL here instead of stdout")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--model", default=VOSK_MODEL_PATH, help="Vosk model directory")
+    parser.add_argument("--no-words", action="store_true", help="leave out per-word timings")
+    args = parser.parse_args(argv)
+
+    files = find_audio_files(args.paths)
+    if not files:
+        parser.error("no audio files found")
+    if not os.path.exists(args.model):
+        parser.error(f"Vosk model not found at {args.model}")
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    audio_seconds = 0.0
+    failures = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(files)), initializer=init_worker,
+                                 initargs=(args.model,)) as pool:
+            futures = [pool.submit(transcribe_file, path, not args.no_words) for path in files]
+            # Results are written as each file finishes, not in input order
+            for future in as_completed(futures):
+                result = future.result()
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                if "error" in result:
+                    failures += 1
+                    print(f"{result['file']}: {result['error']}", file=sys.stderr)
+                else:
+                    audio_seconds += result["duration"]
+                    print(f"{result['file']}: {result['duration']:.1f}s audio, RTF {result['rtf']:.3f}",
+                          file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(files) - failures}/{len(files)} files, {audio_seconds:.1f}s of audio in {elapsed:.1f}s: "
+          f"{audio_seconds / elapsed:.1f}x real time, {len(files) / elapsed * 60:.0f} files/min",
+          file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+
+class CommandRejected(Exception):
+    """Raised when the pool already holds its maximum number of pending commands."""
+
+
+@dataclass
+class CommandTicket:
+    id: int
+    command: str
+    future: Future
+
+
+class CommandPool:
+    """Runs commands on a fixed set of worker threads, one future per command.
+
+    Each submitted command gets its own correlation id and future, so a slow
+    command only holds up its own caller. Submissions beyond max_pending are
+    rejected immediately instead of queueing behind the backlog.
+    """
+
+    def __init__(self, handler: Callable[[str], Any], workers: int = 4, max_pending: int = 64):
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="command-worker")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._exec_total = 0.0
+        self._exec_max = 0.0
+
+    def submit(self, command: str) -> CommandTicket:
+        """Queue a command and return its ticket, or raise CommandRejected if full."""
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise CommandRejected(f"{self.max_pending} commands already pending")
+
+        command_id = next(self._ids)
+        submitted_at = time.perf_counter()
+        self._count("submitted")
+        try:
+            future = self._executor.submit(self._run, command, submitted_at)
+        except RuntimeError:
+            self._slots.release()
+            raise CommandRejected("Command pool is shut down")
+        future.add_done_callback(lambda _: self._slots.release())
+        return CommandTicket(command_id, command, future)
+
+    def run(self, command: str, timeout: float = 10) -> Any:
+        """Submit a command and wait up to timeout seconds for its result."""
+        ticket = self.submit(command)
+        try:
+            return ticket.future.result(timeout=timeout)
+        except TimeoutError:
+            # Drop it if no worker has picked it up yet; a running command
+            # finishes in the background and its result is discarded
+            ticket.future.cancel()
+            self._count("timed_out")
+            raise
+
+    def _run(self, command: str, submitted_at: float) -> Any:
+        started_at = time.perf_counter()
+        try:
+            result = self.handler(command)
+        except Exception:
+            self._record(started_at - submitted_at, time.perf_counter() - started_at, "failed")
+            raise
+        self._record(started_at - submitted_at, time.perf_counter() - started_at, "completed")
+        return result
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record(self, wait: float, execution: float, outcome: str):
+        with self._lock:
+            self._counters[outcome] += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._exec_total += execution
+            self._exec_max = max(self._exec_max, execution)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return counters plus average/max queue wait and execution time in ms."""
+        with self._lock:
+            finished = self._counters["completed"] + self._counters["failed"]
+            return {
+                **self._counters,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_wait_avg_ms": self._wait_total / finished * 1000 if finished else 0.0,
+                "queue_wait_max_ms": self._wait_max * 1000,
+                "execution_avg_ms": self._exec_total / finished * 1000 if finished else 0.0,
+                "execution_max_ms": self._exec_max * 1000,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting commands; pending ones are cancelled."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
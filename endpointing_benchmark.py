@@ -0,0 +1,81 @@
+import statistics
+import sys
+import time
+import wave
+
+from audio_capture import MicrophoneStream
+from voice_activity import END, VoiceActivityDetector, webrtcvad
+
+# Replays a recording through the voice activity detector and reports how
+# long after speech stops each utterance is closed, and how much of the audio
+# is kept away from recognition
+AUDIO_PATH = sys.argv[1] if len(sys.argv) > 1 else "test_audio.wav"
+HANGOVERS_MS = (100, 200, 300, 700)
+# Half a second of silence after the recording so the last utterance closes
+TAIL_SILENCE_S = 0.5
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getframerate(), wav.readframes(wav.getnframes())
+
+
+def replay_offline(sample_rate, audio, **vad_options):
+    """Run the detector over the whole file; latencies are in audio time."""
+    vad = VoiceActivityDetector(sample_rate, **vad_options)
+    audio += bytes(int(TAIL_SILENCE_S * sample_rate) * 2)
+    total = len(audio) // vad.frame_bytes
+    passed = 0
+    latencies = []
+    for i in range(total):
+        event, chunk = vad.process(audio[i * vad.frame_bytes:(i + 1) * vad.frame_bytes])
+        passed += len(chunk) // vad.frame_bytes
+        if event == END:
+            latencies.append((vad.frames - vad.last_speech_frame) * vad.frame_ms)
+    return latencies, passed, total
+
+
+def replay_realtime(path):
+    """Play the file as a live input device; latency is wall clock from the end of speech."""
+    latencies = []
+    with MicrophoneStream.from_wav(path) as microphone:
+        started = time.time()
+        while True:
+            utterance = microphone.listen(timeout=TAIL_SILENCE_S + 1, fresh=False)
+            if utterance is None:
+                break
+            delivered = time.time() - started
+            latencies.append((delivered - utterance.speech_end) * 1000)
+    return latencies
+
+
+def summarize(latencies):
+    if not latencies:
+        return f"{'-':>10} {'-':>10}"
+    return f"{statistics.mean(latencies):>10.0f} {max(latencies):>10.0f}"
+
+
+def main():
+    sample_rate, audio = read_wav(AUDIO_PATH)
+    print(f"{AUDIO_PATH}: {len(audio) / 2 / sample_rate:.2f}s at {sample_rate} Hz")
+    print(f"{'backend':>8} {'hangover':>9} {'utts':>5} {'mean ms':>10} {'max ms':>10} {'sent':>6}")
+
+    backends = ["energy"]
+    if webrtcvad is not None and sample_rate in (8000, 16000, 32000, 48000):
+        backends.append("webrtc")
+    for backend in backends:
+        for hangover in HANGOVERS_MS:
+            latencies, passed, total = replay_offline(sample_rate, audio, hangover_ms=hangover, backend=backend)
+            print(f"{backend:>8} {hangover:>7}ms {len(latencies):>5} {summarize(latencies)} "
+                  f"{passed / total:>6.0%}")
+    if "webrtc" not in backends:
+        print("webrtc: skipped (needs the webrtcvad package and 8/16/32/48 kHz audio)")
+
+    print("\nReal-time replay through MicrophoneStream (default settings):")
+    latencies = replay_realtime(AUDIO_PATH)
+    print(f"{len(latencies)} utterance(s), end of speech to delivery: "
+          f"{' '.join(f'{latency:.0f} ms' for latency in latencies) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
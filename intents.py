@@ -0,0 +1,224 @@
+import re
+import time
+import random
+from dataclasses import dataclass
+from typing import Callable, Container, Dict, List, NamedTuple, Optional, Tuple
+
+# Words are matched whole, so "hi" never fires inside "this" and "time" never
+# fires inside "sometimes". Apostrophes stay inside the token ("what's").
+TOKEN_PATTERN = re.compile(r"[\w']+")
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    phrases: Tuple[str, ...]
+    priority: int = 0
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    phrase: str
+    start: int  # character offsets of the phrase inside text
+    end: int
+    text: str
+
+    @property
+    def remainder(self) -> str:
+        """Return the utterance with the matched phrase cut out."""
+        return " ".join((self.text[:self.start] + " " + self.text[self.end:]).split())
+
+
+# Specific commands outrank the generic one-word intents they may contain
+# ("search youtube for time lapse" is a search, not "time")
+SPECIFIC = 1
+
+# Shared command set for every front end. When several intents match the same
+# utterance the highest priority wins, then the one registered first, which
+# keeps the ordering the old elif chains relied on.
+INTENTS: List[Intent] = [
+    Intent("greeting", ("hello", "hi", "hey")),
+    Intent("translate", ("translate",), SPECIFIC),
+    Intent("play_music", ("play music", "play song", "play a song")),
+    Intent("time", ("time",)),
+    Intent("date", ("date",)),
+    Intent("search_google", ("search google for",), SPECIFIC),
+    Intent("search_youtube", ("search youtube for",), SPECIFIC),
+    Intent("search_maps", ("search maps for", "search google maps for"), SPECIFIC),
+    Intent("open", ("open",)),
+    Intent("volume_up", ("increase volume",)),
+    Intent("volume_down", ("decrease volume",)),
+    Intent("volume_mute", ("mute volume",)),
+    Intent("volume_unmute", ("unmute volume",)),
+    Intent("brightness_up", ("increase brightness",)),
+    Intent("brightness_down", ("decrease brightness",)),
+    Intent("brightness_max", ("maximum brightness", "brightness maximum")),
+    Intent("brightness_min", ("minimum brightness", "brightness minimum")),
+    Intent("brightness_get", ("what is the brightness", "current brightness")),
+    Intent("weather", ("weather", "what's the weather"), SPECIFIC),
+    Intent("send_email", ("send email",)),
+    Intent("send_whatsapp", ("send whatsapp message", "send whatsapp")),
+    Intent("dictation", ("start dictation", "dictate")),
+    Intent("whisper_dictation", ("long dictation", "whisper dictation")),
+    Intent("set_alarm", ("set alarm", "create alarm")),
+    Intent("set_reminder", ("set reminder", "create reminder")),
+    Intent("manage_reminders", ("manage reminders", "show reminders", "list reminders")),
+    Intent("news", ("news", "headlines", "what's the news"), SPECIFIC),
+    Intent("joke", ("tell me a joke", "joke", "tell me another joke")),
+    Intent("manage_contacts", ("manage contacts", "edit contacts")),
+    Intent("exit", ("exit", "stop", "bye")),
+]
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Split text into lowercase word tokens with their character spans."""
+    return [(m.group().lower(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)]
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over word tokens for a fixed set of intents.
+
+    The automaton is compiled once; each lookup is a single left-to-right pass
+    over the utterance's tokens, independent of how many phrases are registered.
+    """
+
+    def __init__(self, intents: List[Intent]):
+        self.intents = list(intents)
+        self._index = {intent.name: i for i, intent in enumerate(self.intents)}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (intent index, phrase, phrase length in tokens)
+        self._output: List[List[Tuple[int, str, int]]] = [[]]
+
+        for index, intent in enumerate(self.intents):
+            for phrase in intent.phrases:
+                self._add_phrase(index, phrase)
+        self._build_failure_links()
+
+    def _add_phrase(self, intent_index: int, phrase: str):
+        tokens = [token for token, _, _ in tokenize(phrase)]
+        if not tokens:
+            raise ValueError(f"Intent phrase has no words: {phrase!r}")
+
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][token] = next_state
+            state = next_state
+        self._output[state].append((intent_index, phrase, len(tokens)))
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[IntentMatch]:
+        """Return every intent phrase occurring in text, in order of their end position."""
+        tokens = tokenize(text)
+        matches = []
+        state = 0
+        for position, (token, _, token_end) in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for intent_index, phrase, length in self._output[state]:
+                start = tokens[position - length + 1][1]
+                matches.append(
+                    IntentMatch(self.intents[intent_index].name, phrase, start, token_end, text)
+                )
+        return matches
+
+    def match(self, text: str, allowed: Optional[Container[str]] = None) -> Optional[IntentMatch]:
+        """Return the winning intent for text, optionally restricted to allowed names."""
+        best = None
+        best_key = None
+        for found in self.find_all(text):
+            if allowed is not None and found.intent not in allowed:
+                continue
+            index = self._index[found.intent]
+            # Higher priority first, then registration order, then the longer phrase
+            key = (-self.intents[index].priority, index, -(found.end - found.start))
+            if best_key is None or key < best_key:
+                best, best_key = found, key
+        return best
+
+    def dispatch(self, text: str, handlers: Dict[str, Callable[[IntentMatch], object]], default=None):
+        """Call the handler of the winning intent, or default(text) when nothing matches."""
+        found = self.match(text, handlers)
+        if found is None:
+            return default(text) if default else None
+        return handlers[found.intent](found)
+
+    def phrases(self) -> List[str]:
+        """Return every registered phrase, in registration order."""
+        return [phrase for intent in self.intents for phrase in intent.phrases]
+
+
+# Compiled once at import and shared by every front end
+MATCHER = IntentMatcher(INTENTS)
+
+
+def match_intent(text: str, allowed: Optional[Container[str]] = None) -> Optional[IntentMatch]:
+    """Match text against the shared intent table."""
+    return MATCHER.match(text, allowed)
+
+
+def dispatch(text: str, handlers: Dict[str, Callable[[IntentMatch], object]], default=None):
+    """Route text to one of handlers through the shared intent table."""
+    return MATCHER.dispatch(text, handlers, default)
+
+
+# Utterances that once resolved to the wrong intent
+REGRESSIONS = [
+    ("search youtube for time lapse", "search_youtube"),
+    ("hey what is the weather in paris", "weather"),
+]
+
+
+def check_regressions():
+    """Raise AssertionError if any REGRESSIONS utterance matches the wrong intent."""
+    for text, expected in REGRESSIONS:
+        found = match_intent(text)
+        actual = found.intent if found else None
+        assert actual == expected, f"{text!r} matched {actual!r}, expected {expected!r}"
+
+
+def benchmark(count: int = 100_000, seed: int = 0):
+    """Dispatch count synthetic utterances against the full command set."""
+    rng = random.Random(seed)
+    filler = ["please", "can", "you", "the", "now", "quickly", "for", "me", "this", "sometimes"]
+    phrases = MATCHER.phrases()
+    utterances = []
+    for _ in range(count):
+        words = rng.choices(filler, k=rng.randint(0, 6))
+        if rng.random() < 0.9:
+            words.insert(rng.randint(0, len(words)), rng.choice(phrases))
+        utterances.append(" ".join(words))
+
+    handlers = {intent.name: (lambda match: match.intent) for intent in INTENTS}
+    start = time.perf_counter()
+    hits = sum(1 for text in utterances if MATCHER.dispatch(text, handlers) is not None)
+    elapsed = time.perf_counter() - start
+
+    print(f"Dispatched {count} utterances in {elapsed:.3f}s "
+          f"({count / elapsed:,.0f}/s, {elapsed / count * 1e6:.2f} us each), {hits} matched")
+
+
+if __name__ == "__main__":
+    check_regressions()
+    benchmark()
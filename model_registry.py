@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk-model-en-us-0.22")
+# Model for the command grammar; it needs a runtime graph (graph/HCLr.fst),
+# which the small Vosk models have and the large ones do not
+VOSK_GRAMMAR_MODEL_PATH = os.getenv("VOSK_GRAMMAR_MODEL_PATH", VOSK_MODEL_PATH)
+# A model size such as "medium", or the path to a downloaded .pt checkpoint
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "medium")
+
+ModelKey = Tuple[str, str]
+
+
+def resident_memory() -> Optional[int]:
+    """Return this process's resident set size in bytes, if it can be measured."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_vosk_model(path: str):
+    """Load a Vosk model directory."""
+    from vosk import Model, SetLogLevel
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Vosk model not found at {path}. "
+            "Please download it from https://alphacephei.com/vosk/models"
+        )
+    SetLogLevel(-1)
+    return Model(path)
+
+
+def load_whisper_model(name: str):
+    """Load a Whisper model by size name, memory-mapping local checkpoints.
+
+    A .pt checkpoint on disk is opened with torch.load(mmap=True), so the
+    weights are paged in from the file instead of copied onto the heap.
+    Size names go through whisper.load_model, which downloads on first use.
+    """
+    import whisper
+
+    if not os.path.isfile(name):
+        return whisper.load_model(name, in_memory=False)
+
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    checkpoint = torch.load(name, map_location="cpu", mmap=True, weights_only=False)
+    model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    return model
+
+
+@dataclass
+class ModelInfo:
+    load_seconds: float
+    # Growth in resident memory across the load; approximate when several
+    # models load at the same time
+    memory_bytes: Optional[int]
+    loaded_at: float
+    uses: int = 0
+
+
+class ModelRegistry:
+    """Loads each speech model once per process and shares it between threads.
+
+    Models are addressed by (kind, name), e.g. ("vosk", "vosk-model-en-us-0.22")
+    or ("whisper", "medium"). The first get() of a model loads it while other
+    callers for the same model wait; warm_up() does this ahead of time.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[str], Any]] = {}
+        self._models: Dict[ModelKey, Any] = {}
+        self._info: Dict[ModelKey, ModelInfo] = {}
+        self._locks: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, loader: Callable[[str], Any]):
+        """Register the function that loads models of a kind from their name."""
+        self._loaders[kind] = loader
+
+    def get(self, kind: str, name: str) -> Any:
+        """Return the shared model, loading it on first use."""
+        model = self.load(kind, name)
+        with self._lock:
+            self._info[(kind, name)].uses += 1
+        return model
+
+    def load(self, kind: str, name: str) -> Any:
+        """Load the model if it is not loaded yet and return it."""
+        key = (kind, name)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            if kind not in self._loaders:
+                raise KeyError(f"No loader registered for {kind} models")
+            load_lock = self._locks.setdefault(key, threading.Lock())
+        # One lock per model, so a slow Whisper load doesn't hold up Vosk
+        with load_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(key)
+        return model
+
+    def _load(self, key: ModelKey) -> Any:
+        kind, name = key
+        rss_before = resident_memory()
+        started = time.perf_counter()
+        model = self._loaders[kind](name)
+        load_seconds = time.perf_counter() - started
+        rss_after = resident_memory()
+        memory = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        with self._lock:
+            self._info[key] = ModelInfo(load_seconds, memory, time.time())
+            self._models[key] = model
+        print(f"Loaded {kind} model {name} in {load_seconds:.1f}s")
+        return model
+
+    def warm_up(self, models: Iterable[ModelKey], background: bool = True) -> Optional[threading.Thread]:
+        """Load models ahead of the first request; failures are reported, not raised."""
+        def load_all():
+            for kind, name in models:
+                try:
+                    self.load(kind, name)
+                except Exception as e:
+                    print(f"Error loading {kind} model {name}: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def is_loaded(self, kind: str, name: str) -> bool:
+        return (kind, name) in self._models
+
+    def unload(self, kind: str, name: str):
+        """Drop the registry's reference so the model can be freed."""
+        with self._lock:
+            self._models.pop((kind, name), None)
+            self._info.pop((kind, name), None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return load time, memory growth and use count for each loaded model."""
+        with self._lock:
+            return {
+                f"{kind}:{name}": {
+                    "load_seconds": round(info.load_seconds, 3),
+                    "memory_mb": round(info.memory_bytes / 2**20, 1) if info.memory_bytes is not None else None,
+                    "uses": info.uses,
+                }
+                for (kind, name), info in self._info.items()
+            }
+
+
+models = ModelRegistry()
+models.register("vosk", load_vosk_model)
+models.register("whisper", load_whisper_model)
+
+
+if __name__ == "__main__":
+    # Report load time and memory for the configured models, and show that
+    # later lookups reuse the loaded instance
+    for kind, name in (("vosk", VOSK_MODEL_PATH), ("whisper", WHISPER_MODEL)):
+        try:
+            models.get(kind, name)
+        except Exception as e:
+            print(f"Skipping {kind} model {name}: {e}")
+            continue
+        started = time.perf_counter()
+        models.get(kind, name)
+        print(f"Second lookup of {kind} model took {(time.perf_counter() - started) * 1e6:.0f} µs")
+    for model, info in models.stats().items():
+        print(model, info)
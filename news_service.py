@@ -0,0 +1,315 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+DEFAULT_NEWS_URL = "https://newsapi.org/v2/top-headlines"
+
+# Only feeds registered with watch() are refreshed in the background, each
+# costing one upstream call per interval (two with the English fallback):
+# 96 a day at the default, so watch a single feed on the 100-call free tier.
+# Other lookups are fetched on demand and cached for one interval, then
+# dropped. Refreshes that keep failing fall back to the last good headlines
+# until they are NEWS_MAX_AGE seconds old, and watched feeds nobody has asked
+# for in NEWS_MAX_IDLE seconds stop being refreshed
+DEFAULT_REFRESH_INTERVAL = float(os.getenv("NEWS_REFRESH_INTERVAL", "900"))
+DEFAULT_MAX_AGE = float(os.getenv("NEWS_MAX_AGE", "3600"))
+DEFAULT_MAX_IDLE = float(os.getenv("NEWS_MAX_IDLE", "86400"))
+
+# (country, language, topic); unset parts are left out of the request
+FeedKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+@dataclass
+class Feed:
+    data: Optional[Dict[str, Any]] = None
+    fetched_at: float = 0.0
+    requested_at: float = field(default_factory=time.time)
+    failures: int = 0
+    last_error: Optional[str] = None
+    watched: bool = False
+
+
+class HeadlineCache:
+    """Latest headlines per feed; watched feeds are kept warm, others cached for one interval."""
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = DEFAULT_NEWS_URL,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 max_age: float = DEFAULT_MAX_AGE, max_idle: float = DEFAULT_MAX_IDLE):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self._feeds: Dict[FeedKey, Feed] = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "refresh_failures": 0}
+
+    @staticmethod
+    def key(country: Optional[str] = None, language: Optional[str] = None,
+            topic: Optional[str] = None) -> FeedKey:
+        return (
+            country.lower() if country else None,
+            language.lower() if language else None,
+            " ".join(topic.casefold().split()) if topic else None,
+        )
+
+    def params(self, key: FeedKey, language: Optional[str] = None) -> Dict[str, str]:
+        country, feed_language, topic = key
+        params = {"apiKey": self.api_key, "country": country,
+                  "language": language or feed_language, "q": topic}
+        return {name: value for name, value in params.items() if value}
+
+    def lookup(self, key: FeedKey) -> Optional[Dict[str, Any]]:
+        """Return the cached headlines for key, or None if missing or too old."""
+        feed = self._feeds.get(key)
+        if feed is None:
+            return None
+        feed.requested_at = time.time()
+        max_age = self.max_age if feed.watched else self.refresh_interval
+        if feed.data is None or time.time() - feed.fetched_at >= max_age:
+            return None
+        return feed.data
+
+    def register(self, key: FeedKey):
+        self._feeds.setdefault(key, Feed()).watched = True
+
+    def store(self, key: FeedKey, data: Dict[str, Any]):
+        feed = self._feeds.setdefault(key, Feed())
+        self.counters["refreshes"] += 1
+        # Only successful responses replace the headlines being served
+        if data.get("status") == "ok":
+            feed.data = data
+            feed.fetched_at = time.time()
+            feed.failures = 0
+            feed.last_error = None
+        else:
+            self.fail(key, data.get("message", "News API returned an error"))
+
+    def fail(self, key: FeedKey, error: str):
+        feed = self._feeds.setdefault(key, Feed())
+        feed.failures += 1
+        feed.last_error = error
+        self.counters["refresh_failures"] += 1
+
+    def due(self) -> list:
+        """Drop expired and idle feeds and return the watched keys that need refreshing."""
+        now = time.time()
+        expired = [
+            key for key, feed in self._feeds.items()
+            if (now - feed.requested_at >= self.max_idle if feed.watched
+                else now - feed.fetched_at >= self.refresh_interval)
+        ]
+        for key in expired:
+            del self._feeds[key]
+        return [key for key, feed in self._feeds.items()
+                if feed.watched and now - feed.fetched_at >= self.refresh_interval]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/refresh counters plus the age and failure count of each feed."""
+        now = time.time()
+        feeds = {
+            "/".join(part or "-" for part in key): {
+                "age": round(now - feed.fetched_at, 1) if feed.data is not None else None,
+                "failures": feed.failures,
+                "last_error": feed.last_error,
+                "watched": feed.watched,
+            }
+            for key, feed in self._feeds.items()
+        }
+        return {**self.counters, "feeds": feeds}
+
+
+class NewsPrefetcher(HeadlineCache):
+    """Refreshes watched feeds on a background thread for the blocking front ends.
+
+    A request for a feed that is not warm fetches it inline (concurrent
+    callers share that fetch); unwatched feeds are then served from memory
+    until they are refresh_interval seconds old.
+    """
+
+    def __init__(self, *args, timeout: float = 5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._in_flight: Dict[FeedKey, Future] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the refresher thread if it is not already running."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="news-refresh", daemon=True)
+            self._thread.start()
+
+    def watch(self, country: Optional[str] = None, language: Optional[str] = None,
+              topic: Optional[str] = None):
+        """Register a feed so it is fetched now and kept warm from then on."""
+        with self._lock:
+            self.register(self.key(country, language, topic))
+        self.start()
+        self._wake.set()
+
+    def get(self, country: Optional[str] = None, language: Optional[str] = None,
+            topic: Optional[str] = None) -> Dict[str, Any]:
+        """Return the News API response for the feed, from memory when warm."""
+        key = self.key(country, language, topic)
+        with self._lock:
+            data = self.lookup(key)
+            if data is not None:
+                self.counters["hits"] += 1
+                return data
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.counters["misses"] += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+
+        self.start()
+        if owner:
+            self._refresh(key, future)
+        return future.result()
+
+    def _run(self):
+        while True:
+            self._wake.wait(min(self.refresh_interval, 60))
+            self._wake.clear()
+            with self._lock:
+                due = {key: Future() for key in self.due() if key not in self._in_flight}
+                self._in_flight.update(due)
+            for key, future in due.items():
+                self._refresh(key, future)
+
+    def _refresh(self, key: FeedKey, future: Future):
+        try:
+            data = self._request(key)
+            with self._lock:
+                self.store(key, data)
+            future.set_result(data)
+        except Exception as e:
+            with self._lock:
+                self.fail(key, str(e))
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _request(self, key: FeedKey) -> Dict[str, Any]:
+        response = requests.get(self.base_url, params=self.params(key), timeout=self.timeout)
+        data = response.json()
+        if data.get("status") != "ok" and key[1] not in (None, "en"):
+            # Fall back to English if the language is not supported
+            response = requests.get(self.base_url, params=self.params(key, "en"), timeout=self.timeout)
+            data = response.json()
+        return data
+
+
+class AsyncNewsPrefetcher(HeadlineCache):
+    """Event-loop variant: a refresher task keeps watched feeds warm on the shared session."""
+
+    def __init__(self, *args, session_factory: Callable, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session_factory = session_factory
+        self._wake: Optional[asyncio.Event] = None
+        self._in_flight: Dict[FeedKey, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        """Start the refresher task on the running loop if it is not already running."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._wake = asyncio.Event()
+            self._in_flight.clear()
+            self._task = loop.create_task(self._run())
+            self._loop = loop
+
+    async def stop(self):
+        """Cancel the refresher task."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def watch(self, country: Optional[str] = None, language: Optional[str] = None,
+              topic: Optional[str] = None):
+        """Register a feed so it is fetched now and kept warm from then on."""
+        self.register(self.key(country, language, topic))
+        self.start()
+        self._wake.set()
+
+    async def get(self, country: Optional[str] = None, language: Optional[str] = None,
+                  topic: Optional[str] = None) -> Dict[str, Any]:
+        """Return the News API response for the feed, from memory when warm."""
+        key = self.key(country, language, topic)
+        data = self.lookup(key)
+        if data is not None:
+            self.counters["hits"] += 1
+            return data
+        self.counters["coalesced" if key in self._in_flight else "misses"] += 1
+        self.start()
+        # shield() so one caller timing out does not cancel the shared fetch
+        return await asyncio.shield(self._start_refresh(key))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(self.refresh_interval, 60))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for key in self.due():
+                self._start_refresh(key)
+
+    def _start_refresh(self, key: FeedKey) -> asyncio.Task:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key))
+            # Background refreshes may fail with nobody awaiting them
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._in_flight[key] = task
+        return task
+
+    async def _refresh(self, key: FeedKey) -> Dict[str, Any]:
+        try:
+            data = await self._request(key)
+            self.store(key, data)
+            return data
+        except Exception as e:
+            self.fail(key, str(e))
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _request(self, key: FeedKey) -> Dict[str, Any]:
+        session = self.session_factory()
+        async with session.get(self.base_url, params=self.params(key)) as response:
+            data = await response.json(content_type=None)
+        if data.get("status") != "ok" and key[1] not in (None, "en"):
+            # Fall back to English if the language is not supported
+            async with session.get(self.base_url, params=self.params(key, "en")) as response:
+                data = await response.json(content_type=None)
+        return data
+
+
+_shared_prefetcher: Optional[NewsPrefetcher] = None
+_shared_prefetcher_lock = threading.Lock()
+
+
+def shared_news_prefetcher() -> NewsPrefetcher:
+    """Return the process-wide prefetcher configured from NEWS_API_KEY and NEWS_URL."""
+    global _shared_prefetcher
+    with _shared_prefetcher_lock:
+        if _shared_prefetcher is None:
+            _shared_prefetcher = NewsPrefetcher(
+                os.getenv("NEWS_API_KEY"), os.getenv("NEWS_URL", DEFAULT_NEWS_URL)
+            )
+        return _shared_prefetcher
@@ -0,0 +1,54 @@
+import sys
+import time
+import wave
+
+from vosk_recognizer import StreamingRecognizer
+
+# Decodes a recording with each partial-result policy and reports the CPU
+# time spent per second of audio. "every block" is the old behaviour of
+# asking Vosk for a partial after every block of audio.
+AUDIO_PATH = sys.argv[1] if len(sys.argv) > 1 else "test_audio.wav"
+REPEATS = 3
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getframerate(), wav.readframes(wav.getnframes())
+
+
+def measure(sample_rate, audio, partial_hz, listening=True):
+    """Return CPU seconds per audio second, partial decodes and partials published."""
+    recognizer = StreamingRecognizer(sample_rate=sample_rate, partial_hz=partial_hz, endpointing=False)
+    recognizer.load()
+    published = []
+    if listening:
+        recognizer.subscribe(lambda result: published.append(result) if result and not result.final else None)
+    block = recognizer.block_size * 2
+    started = time.process_time()
+    for offset in range(0, len(audio), block):
+        recognizer.feed(audio[offset:offset + block])
+    recognizer.finish()
+    cpu = time.process_time() - started
+    return cpu / (len(audio) / 2 / sample_rate), recognizer.partial_decodes, len(published)
+
+
+def main():
+    sample_rate, audio = read_wav(AUDIO_PATH)
+    audio = audio * REPEATS
+    print(f"{AUDIO_PATH} x{REPEATS}: {len(audio) / 2 / sample_rate:.1f}s at {sample_rate} Hz")
+    print(f"{'policy':>14} {'cpu ms/s':>9} {'decodes':>8} {'published':>10}")
+    policies = [
+        ("every block", sample_rate, True),
+        ("10 Hz", 10, True),
+        ("5 Hz", 5, True),
+        ("2 Hz", 2, True),
+        ("no listener", 5, False),
+        ("off", 0, True),
+    ]
+    for name, partial_hz, listening in policies:
+        cpu, decodes, published = measure(sample_rate, audio, partial_hz, listening)
+        print(f"{name:>14} {cpu * 1000:>9.1f} {decodes:>8} {published:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import sys
+import time
+import wave
+
+import numpy as np
+
+from audio_frontend import WAV_FORMATS, AudioFrontEnd
+from audio_preprocess import Preprocessor
+from voice_activity import END, VoiceActivityDetector
+
+# Runs a recording through the preprocessing stage block by block, clean and
+# with hum and fan-like noise mixed in, and reports how many seconds of audio
+# it gets through per CPU second and how much audio the endpointer then
+# passes on to the recognizer
+AUDIO_PATH = sys.argv[1] if len(sys.argv) > 1 else "test_audio.wav"
+SAMPLE_RATE = 16000
+# One detector frame per block, as the recognizers deliver them
+BLOCK_MS = 30
+# Repeat the file so the timing covers more than a few hundred blocks
+REPEATS = 20
+NOISE_SNR_DB = (None, 20, 10)
+
+
+def read_wav(path):
+    """Return the recording as 16 kHz mono 16-bit PCM."""
+    with wave.open(path, "rb") as wav:
+        front_end = AudioFrontEnd(wav.getframerate(), SAMPLE_RATE, wav.getnchannels(),
+                                  WAV_FORMATS[wav.getsampwidth()])
+        data = wav.readframes(wav.getnframes())
+    return front_end.process(data) + front_end.flush()
+
+
+def add_noise(pcm, snr_db, seed=0):
+    """Mix in 50 Hz mains hum and white noise at snr_db below the speech, plus a DC offset."""
+    if snr_db is None:
+        return pcm
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+    t = np.arange(len(samples)) / SAMPLE_RATE
+    noise = np.random.default_rng(seed).normal(size=len(samples)) + np.sin(2 * np.pi * 50 * t)
+    noise *= np.sqrt(np.mean(samples ** 2) / np.mean(noise ** 2)) / 10 ** (snr_db / 20)
+    # Lead in with a second of noise alone, as a microphone does before anyone speaks
+    lead_in = noise[:SAMPLE_RATE]
+    mixed = np.concatenate([lead_in, samples + noise]) + 200
+    return np.clip(np.rint(mixed), -32768, 32767).astype(np.int16).tobytes()
+
+
+def blocks(pcm):
+    size = SAMPLE_RATE * BLOCK_MS // 1000 * 2
+    return [pcm[i:i + size] for i in range(0, len(pcm), size)]
+
+
+def throughput(pcm):
+    """Audio seconds preprocessed per CPU second."""
+    chunks = blocks(pcm) * REPEATS
+    preprocessor = Preprocessor(SAMPLE_RATE)
+    started = time.process_time()
+    for chunk in chunks:
+        preprocessor.process(chunk)
+    elapsed = time.process_time() - started
+    return len(pcm) * REPEATS / (SAMPLE_RATE * 2) / elapsed, preprocessor
+
+
+def endpoint(pcm, preprocess):
+    """Return (utterances, share of the audio passed to the recognizer)."""
+    preprocessor = Preprocessor(SAMPLE_RATE) if preprocess else None
+    vad = VoiceActivityDetector(SAMPLE_RATE)
+    pending = bytearray()
+    passed = utterances = 0
+    # Half a second of silence after the recording so the last utterance closes
+    for chunk in blocks(pcm + bytes(SAMPLE_RATE)):
+        pending += preprocessor.process(chunk) if preprocessor else chunk
+        while len(pending) >= vad.frame_bytes:
+            event, audio = vad.process(bytes(pending[:vad.frame_bytes]))
+            del pending[:vad.frame_bytes]
+            passed += len(audio)
+            utterances += event == END
+    return utterances, passed / len(pcm)
+
+
+def main():
+    clean = read_wav(AUDIO_PATH)
+    print(f"{AUDIO_PATH}: {len(clean) / 2 / SAMPLE_RATE:.2f}s, {BLOCK_MS} ms blocks, x{REPEATS}")
+    print(f"{'noise':>8} {'audio s/CPU s':>14} {'gated':>6} {'utterances':>15} {'to recognizer':>15}")
+    print(f"{'':>8} {'':>14} {'':>6} {'raw':>7} {'clean':>7} {'raw':>7} {'clean':>7}")
+    for snr_db in NOISE_SNR_DB:
+        pcm = add_noise(clean, snr_db)
+        speed, preprocessor = throughput(pcm)
+        raw_utterances, raw_passed = endpoint(pcm, preprocess=False)
+        utterances, passed = endpoint(pcm, preprocess=True)
+        label = "none" if snr_db is None else f"{snr_db} dB"
+        print(f"{label:>8} {speed:>14.0f} {preprocessor.stats()['gated_ratio']:>6.0%} "
+              f"{raw_utterances:>7} {utterances:>7} {raw_passed:>7.0%} {passed:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
 import re
 import json
 import time
-from datetime import datetime
-import requests
-from typing import Dict, List, Tuple, Callable, Union, Optional, Any
+import threading
+from datetime import datetime, timedelta
+from types import MappingProxyType
+import aiohttp
+from typing import Dict, List, Tuple, Callable, Union, Optional, Any, Awaitable, Mapping
 from dataclasses import dataclass
 import speech_recognition as sr
 import pyttsx3
 import random
 import os
+import asyncio
+from translation_cache import TranslationCache
+from weather_service import AsyncWeatherService
+from news_service import AsyncNewsPrefetcher
 
 # Type aliases
 CommandHandler = Callable[[str, str], Union[str, Awaitable[str]]]
@@ -18,8 +24,52 @@ class CommandRule:
     patterns: Dict[str, List[re.Pattern]]
     handler: CommandHandler
 
+@dataclass(frozen=True)
+class LanguageRules:
+    rules: Tuple[CommandRule, ...]
+    # One alternation of every rule's patterns; the named group that matched
+    # identifies the rule, so a single match() call replaces the nested loops
+    matcher: Optional[re.Pattern]
+
+    def find(self, text: str) -> Optional[CommandRule]:
+        if self.matcher is None:
+            return None
+        match = self.matcher.match(text)
+        if match is None:
+            return None
+        return self.rules[int(match.lastgroup[1:])]
+
+# Fixed English responses; translated often enough to be worth pre-warming
+WEATHER_KEY_MSG = "To get weather information, please set up your Weather API key first."
+NEWS_KEY_MSG = "To get news updates, please set up your News API key first."
+NEWS_ERROR_MSG = "Sorry, I couldn't fetch the latest news. Please try again later."
+NO_HEADLINES_MSG = "No recent headlines found."
+GREETING_MSG = "Hello! How can I help you today?"
+ERROR_MSG = "Sorry, I encountered an error while processing your request."
+FALLBACK_MSG = "I'm not sure how to help with that yet. You can try asking me about the weather, setting a reminder, or searching for something."
+
+# Languages the assistant answers in besides English
+SUPPORTED_LANGUAGES = ['es', 'fr', 'de', 'it', 'pt', 'hi', 'mr', 'ml', 'ja', 'ko', 'zh', 'ru', 'ar']
+
+# Translations are cached in memory and on disk across restarts
+translation_cache = TranslationCache(os.getenv('TRANSLATION_CACHE_PATH', 'translations.db'))
+
+# Upstream endpoints (overridable, e.g. to point at a local stub server)
+WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.openweathermap.org/data/2.5/weather')
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/top-headlines')
+TRANSLATION_API_URL = os.getenv('TRANSLATION_API_URL', 'https://libretranslate.de/translate')
+
+# Connection pool shared by every handler: keep-alive connections, a cap per
+# upstream host and a timeout on every call
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv('HTTP_POOL_SIZE_PER_HOST', '20'))
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)
+
 # Global variables
 reminders = []
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_warmup_task: Optional[asyncio.Task] = None
 jokes = {
     'en': [
         "Why don't scientists trust atoms? Because they make up everything!",
@@ -52,6 +102,35 @@ def get_api_keys() -> Dict[str, str]:
         'translationApi': os.getenv('TRANSLATION_API_KEY', '')
     }
 
+# Pooled HTTP session, created on first use inside the running event loop
+def get_http_session() -> aiohttp.ClientSession:
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+            keepalive_timeout=30,
+        )
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+        _http_session_loop = loop
+    return _http_session
+
+async def close_http_session() -> None:
+    global _http_session
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    await news_prefetcher.stop()
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+# Cached, coalesced weather lookups over the pooled session
+weather_service = AsyncWeatherService(get_api_keys()['weatherApi'], WEATHER_API_URL, get_http_session)
+
+# Headlines kept warm per language/topic by a background refresh task
+news_prefetcher = AsyncNewsPrefetcher(get_api_keys()['newsApi'], NEWS_API_URL, session_factory=get_http_session)
+
 # Helper function to get language code
 def get_base_language(lang_code: str) -> str:
     return lang_code.split('-')[0] if '-' in lang_code else lang_code
@@ -64,17 +143,14 @@ async def get_weather(location: str, language: str) -> str:
     
     if not weather_api_key:
         if base_language == 'en':
-            return "To get weather information, please set up your Weather API key first."
+            return WEATHER_KEY_MSG
         else:
-            return await translate_text("To get weather information, please set up your Weather API key first.", "en", base_language)
+            return await translate_text(WEATHER_KEY_MSG, "en", base_language)
     
     try:
-        response = requests.get(
-            f"https://api.openweathermap.org/data/2.5/weather?q={location}&units=metric&appid={weather_api_key}&lang={base_language}"
-        )
-        response.raise_for_status()
+        # Error payloads are not cached and have no 'main', so they land in the except below
+        data = await weather_service.get(location, base_language)
         
-        data = response.json()
         temp = round(data['main']['temp'])
         condition = data['weather'][0]['description']
         city_name = data['name']
@@ -100,50 +176,49 @@ async def get_news(topic: Optional[str], language: str) -> str:
     
     if not news_api_key:
         if base_language == 'en':
-            return "To get news updates, please set up your News API key first."
+            return NEWS_KEY_MSG
         else:
-            return await translate_text("To get news updates, please set up your News API key first.", "en", base_language)
+            return await translate_text(NEWS_KEY_MSG, "en", base_language)
     
     try:
-        url = f"https://newsapi.org/v2/top-headlines?language={base_language}&apiKey={news_api_key}"
-        if topic:
-            url += f"&q={topic}"
+        # Served from the prefetcher; the English fallback happens on refresh
+        data = await news_prefetcher.get(language=base_language, topic=topic)
+        if data.get('status') != 'ok':
+            raise RuntimeError(data.get('message', 'News API returned an error'))
         
-        response = requests.get(url)
-        
-        if not response.ok:
-            # Fallback to English if language not supported
-            url = f"https://newsapi.org/v2/top-headlines?language=en&apiKey={news_api_key}"
-            if topic:
-                url += f"&q={topic}"
-            fallback_response = requests.get(url)
-            fallback_response.raise_for_status()
-            data = fallback_response.json()
-            return await process_news_results(data, topic, language)
-        
-        data = response.json()
         return await process_news_results(data, topic, language)
     except Exception as error:
         print(f"News API error: {error}")
-        error_msg = "Sorry, I couldn't fetch the latest news. Please try again later."
+        error_msg = NEWS_ERROR_MSG
         return error_msg if base_language == 'en' else await translate_text(error_msg, "en", base_language)
 
 async def process_news_results(data: Dict, topic: Optional[str], language: str) -> str:
     base_language = get_base_language(language)
     
     if not data.get('articles'):
-        no_news_msg = f"No recent news found about {topic}." if topic else "No recent headlines found."
+        no_news_msg = f"No recent news found about {topic}." if topic else NO_HEADLINES_MSG
         return no_news_msg if base_language == 'en' else await translate_text(no_news_msg, "en", base_language)
     
     # Get the top 3 news items
-    top_articles = data['articles'][:3]
-    news_items = "\n".join([f"{i+1}. {article['title']}" for i, article in enumerate(top_articles)])
+    titles = [article['title'] for article in data['articles'][:3]]
+    header = f"Here are the latest headlines about {topic}:" if topic else "Here are today's top headlines:"
+    
+    # Translate the header and each headline in one round trip; headlines
+    # are cached individually so they are reused across topics and users
+    if base_language != 'en':
+        header, *titles = await translate_batch([header] + titles, "en", base_language)
     
-    news_msg = f"Here are the latest headlines about {topic}:\n{news_items}" if topic else f"Here are today's top headlines:\n{news_items}"
-    return news_msg if base_language == 'en' else await translate_text(news_msg, "en", base_language)
+    news_items = "\n".join([f"{i+1}. {title}" for i, title in enumerate(titles)])
+    return f"{header}\n{news_items}"
 
 # Translation functionality
-async def translate_text(text: str, source_language: str = "auto", target_language: str) -> str:
+async def translate_text(text: str, source_language: str = "auto", target_language: str = "en") -> str:
+    translated = await translate_batch([text], source_language, target_language)
+    return translated[0]
+
+# Batch translation: duplicates and cached strings are resolved locally and
+# only the misses go to LibreTranslate, in one request per target language
+async def translate_batch(texts: List[str], source_language: str = "auto", target_language: str = "en") -> List[str]:
     api_keys = get_api_keys()
     translation_api_key = api_keys['translationApi']
     
@@ -153,29 +228,82 @@ async def translate_text(text: str, source_language: str = "auto", target_langua
     
     # Don't translate if source and target are the same
     if source_language == target_language and source_language != "auto":
-        return text
+        return list(texts)
     
-    # Use LibreTranslate API
-    try:
-        payload = {
-            "q": text,
-            "source": source_language,
-            "target": target_language,
-            "format": "text",
-        }
-        
-        # Add API key if available
-        if translation_api_key:
-            payload["api_key"] = translation_api_key
-        
-        response = requests.post("https://libretranslate.de/translate", json=payload)
-        response.raise_for_status()
-        
-        data = response.json()
-        return data['translatedText']
-    except Exception as error:
-        print(f"Translation API error: {error}")
-        return text
+    results: Dict[str, str] = {}
+    misses = []
+    for text in dict.fromkeys(texts):
+        cached = translation_cache.get_memory(text, source_language, target_language)
+        if cached is not None:
+            results[text] = cached
+        else:
+            misses.append(text)
+    
+    # The disk tier is SQLite; keep its reads and writes off the event loop
+    loop = asyncio.get_running_loop()
+    if misses:
+        results.update(await loop.run_in_executor(
+            None, translation_cache.get_many, misses, source_language, target_language))
+        misses = [text for text in misses if text not in results]
+    
+    if misses:
+        # Use LibreTranslate API, which accepts a list of strings in "q"
+        try:
+            payload = {
+                "q": misses,
+                "source": source_language,
+                "target": target_language,
+                "format": "text",
+            }
+            
+            # Add API key if available
+            if translation_api_key:
+                payload["api_key"] = translation_api_key
+            
+            async with get_http_session().post(TRANSLATION_API_URL, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+            
+            translated = data['translatedText']
+            if isinstance(translated, str):
+                translated = [translated]
+            if len(translated) != len(misses):
+                raise ValueError(f"expected {len(misses)} translations, got {len(translated)}")
+            
+            fresh = list(zip(misses, translated))
+        except Exception as error:
+            print(f"Translation API error: {error}")
+            fresh = []
+            for text in misses:
+                results[text] = text
+        if fresh:
+            results.update(fresh)
+            await loop.run_in_executor(None, translation_cache.put_many, fresh, source_language, target_language)
+    
+    return [results[text] for text in texts]
+
+# Translate the same strings into several languages concurrently
+async def translate_into_languages(texts: List[str], source_language: str, target_languages: List[str]) -> Dict[str, List[str]]:
+    translations = await asyncio.gather(*(
+        translate_batch(texts, source_language, target_language) for target_language in target_languages
+    ))
+    return dict(zip(target_languages, translations))
+
+# Translate every fixed response into every supported language ahead of time,
+# so the first request in each language is served from the cache
+async def warm_translation_cache(languages: Optional[List[str]] = None) -> Dict[str, int]:
+    static_texts = [WEATHER_KEY_MSG, NEWS_KEY_MSG, NEWS_ERROR_MSG, NO_HEADLINES_MSG,
+                    GREETING_MSG, ERROR_MSG, FALLBACK_MSG] + jokes['en']
+    await translate_into_languages(static_texts, "en", languages or SUPPORTED_LANGUAGES)
+    return translation_cache.stats()
+
+# Start warming the cache in the background, once per event loop; the first
+# command kicks it off, since the module has no app of its own to hook into
+def start_translation_warmup() -> None:
+    global _warmup_task
+    loop = asyncio.get_running_loop()
+    if _warmup_task is None or _warmup_task.get_loop() is not loop:
+        _warmup_task = loop.create_task(warm_translation_cache())
 
 # Email sending (mock implementation)
 async def send_email(to: str, subject: str, body: str, language: str) -> str:
@@ -241,6 +369,28 @@ async def get_joke(language: str) -> str:
     joke = random.choice(jokes['en'])
     return await translate_text(joke, "en", base_language)
 
+async def greet(query: str, language: str) -> str:
+    base_language = get_base_language(language)
+    greetings = {
+        'en': GREETING_MSG,
+        'es': "¡Hola! ¿Cómo puedo ayudarte hoy?",
+        'fr': "Bonjour! Comment puis-je vous aider aujourd'hui?",
+        'de': "Hallo! Wie kann ich Ihnen heute helfen?",
+        'it': "Ciao! Come posso aiutarti oggi?",
+        'pt': "Olá! Como posso ajudá-lo hoje?",
+        'hi': "नमस्ते! आज मैं आपकी कैसे मदद कर सकता हूँ?",
+        'mr': "नमस्कार! आज मी तुमची कशी मदत करू शकतो?",
+        'ml': "ഹലോ! ഞാൻ ഇന്ന് നിങ്ങളെ എങ്ങനെ സഹായിക്കാൻ കഴിയും?",
+        'ja': "こんにちは！本日はどのようにお手伝いできますか？",
+        'ko': "안녕하세요! 오늘 어떻게 도와드릴까요?",
+        'zh': "你好！今天我能帮你什么？",
+        'ru': "Здравствуйте! Чем я могу вам помочь сегодня?",
+        'ar': "مرحبا! كيف يمكنني مساعدتك اليوم؟"
+    }
+    if base_language in greetings:
+        return greetings[base_language]
+    return await translate_text(GREETING_MSG, "en", base_language)
+
 def create_command_rules() -> List[CommandRule]:
     return [
         # Basic greeting patterns
@@ -251,43 +401,76 @@ def create_command_rules() -> List[CommandRule]:
                 'fr': get_patterns_for_language('fr', 'greeting'),
                 'default': get_patterns_for_language('default', 'greeting')
             },
-            handler=async lambda query, language: {
-                'en': "Hello! How can I help you today?",
-                'es': "¡Hola! ¿Cómo puedo ayudarte hoy?",
-                'fr': "Bonjour! Comment puis-je vous aider aujourd'hui?",
-                'de': "Hallo! Wie kann ich Ihnen heute helfen?",
-                'it': "Ciao! Come posso aiutarti oggi?",
-                'pt': "Olá! Como posso ajudá-lo hoje?",
-                'hi': "नमस्ते! आज मैं आपकी कैसे मदद कर सकता हूँ?",
-                'mr': "नमस्कार! आज मी तुमची कशी मदत करू शकतो?",
-                'ml': "ഹലോ! ഞാൻ ഇന്ന് നിങ്ങളെ എങ്ങനെ സഹായിക്കാൻ കഴിയും?",
-                'ja': "こんにちは！本日はどのようにお手伝いできますか？",
-                'ko': "안녕하세요! 오늘 어떻게 도와드릴까요?",
-                'zh': "你好！今天我能帮你什么？",
-                'ru': "Здравствуйте! Чем я могу вам помочь сегодня?",
-                'ar': "مرحبا! كيف يمكنني مساعدتك اليوم؟"
-            }.get(get_base_language(language), 
-                await translate_text("Hello! How can I help you today?", "en", get_base_language(language)))
+            handler=greet
         ),
         # ... (other command rules)
     ]
 
-async def process_user_input(input_text: str, language: str = 'en-US') -> str:
+def _scoped_pattern(pattern: re.Pattern) -> str:
+    # Carry each pattern's own flags into the combined regex as a scoped group
+    flags = ''.join(letter for flag, letter in ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+                    if pattern.flags & flag)
+    return f"(?{flags}:{pattern.pattern})" if flags else f"(?:{pattern.pattern})"
+
+def build_language_rules(rules: List[CommandRule], language: str) -> LanguageRules:
+    alternatives = []
+    for index, rule in enumerate(rules):
+        lang_patterns = rule.patterns.get(language, rule.patterns.get('default', []))
+        if lang_patterns:
+            body = '|'.join(_scoped_pattern(pattern) for pattern in lang_patterns)
+            alternatives.append(f"(?P<r{index}>{body})")
+
+    matcher = re.compile('|'.join(alternatives)) if alternatives else None
+    return LanguageRules(rules=tuple(rules), matcher=matcher)
+
+def build_rule_table() -> Mapping[str, LanguageRules]:
     rules = create_command_rules()
+    languages = {language for rule in rules for language in rule.patterns}
+    languages.add('default')
+    return MappingProxyType({language: build_language_rules(rules, language) for language in languages})
+
+# Compiled rule table, built on first use and replaced wholesale on reload so
+# requests in flight keep the table they started with
+_rule_table: Optional[Mapping[str, LanguageRules]] = None
+_rule_table_lock = threading.Lock()
+
+def get_rule_table() -> Mapping[str, LanguageRules]:
+    global _rule_table
+    table = _rule_table
+    if table is None:
+        with _rule_table_lock:
+            if _rule_table is None:
+                _rule_table = build_rule_table()
+            table = _rule_table
+    return table
+
+# Hot-reload hook: rebuild the rule table (optionally from new language
+# patterns) off to the side, then swap it in with a single assignment
+def reload_command_rules(patterns: Optional[Dict[str, Dict[str, List[re.Pattern]]]] = None) -> Mapping[str, LanguageRules]:
+    global _rule_table, language_patterns
+    with _rule_table_lock:
+        if patterns is not None:
+            language_patterns = patterns
+        table = build_rule_table()
+        _rule_table = table
+    return table
+
+def get_rules_for_language(language: str) -> LanguageRules:
+    table = get_rule_table()
+    return table.get(get_base_language(language), table['default'])
+
+async def process_user_input(input_text: str, language: str = 'en-US') -> str:
+    start_translation_warmup()
     base_language = get_base_language(language)
-    
-    for rule in rules:
-        # First try with language-specific patterns
-        lang_patterns = rule.patterns.get(base_language, rule.patterns.get('default', []))
-        
-        for pattern in lang_patterns:
-            if pattern.match(input_text):
-                try:
-                    return await rule.handler(input_text, language)
-                except Exception as error:
-                    print(f"Error processing command: {error}")
-                    error_msg = "Sorry, I encountered an error while processing your request."
-                    return error_msg if base_language == 'en' else await translate_text(error_msg, "en", base_language)
+    rule = get_rules_for_language(base_language).find(input_text)
+
+    if rule is not None:
+        try:
+            return await rule.handler(input_text, language)
+        except Exception as error:
+            print(f"Error processing command: {error}")
+            error_msg = ERROR_MSG
+            return error_msg if base_language == 'en' else await translate_text(error_msg, "en", base_language)
     
     # If no match in the language-specific patterns, try translating to English
     if base_language != 'en':
@@ -295,21 +478,18 @@ async def process_user_input(input_text: str, language: str = 'en-US') -> str:
             translated_input = await translate_text(input_text, base_language, 'en')
             
             # Now check with English patterns
-            for rule in rules:
-                eng_patterns = rule.patterns.get('en', [])
-                
-                for pattern in eng_patterns:
-                    if pattern.match(translated_input):
-                        try:
-                            return await rule.handler(translated_input, language)
-                        except Exception as error:
-                            print(f"Error processing translated command: {error}")
-                            return await translate_text("Sorry, I encountered an error while processing your request.", "en", base_language)
+            rule = get_rules_for_language('en').find(translated_input)
+            if rule is not None:
+                try:
+                    return await rule.handler(translated_input, language)
+                except Exception as error:
+                    print(f"Error processing translated command: {error}")
+                    return await translate_text(ERROR_MSG, "en", base_language)
         except Exception as error:
             print(f"Translation error: {error}")
     
     # Fallback response
-    fallback_msg = "I'm not sure how to help with that yet. You can try asking me about the weather, setting a reminder, or searching for something."
+    fallback_msg = FALLBACK_MSG
     return fallback_msg if base_language == 'en' else await translate_text(fallback_msg, "en", base_language)
 
 def setup_speech_recognition(language: str):
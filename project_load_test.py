@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+
+from aiohttp import web
+
+# Simulated upstream latency for every stubbed API call (seconds)
+STUB_LATENCY = 0.1
+STUB_PORT = 8765
+
+
+async def stub_weather(request):
+    await asyncio.sleep(STUB_LATENCY)
+    return web.json_response({
+        "name": request.query.get("q", "Mumbai").title(),
+        "main": {"temp": 30.4},
+        "weather": [{"description": "clear sky"}],
+    })
+
+
+async def stub_translate(request):
+    payload = await request.json()
+    await asyncio.sleep(STUB_LATENCY)
+    texts = payload["q"]
+    if isinstance(texts, str):
+        return web.json_response({"translatedText": f"[{payload['target']}] {texts}"})
+    return web.json_response({"translatedText": [f"[{payload['target']}] {text}" for text in texts]})
+
+
+async def start_stub_server():
+    """Serve fake weather and translation APIs on localhost."""
+    app = web.Application()
+    app.router.add_get("/weather", stub_weather)
+    app.router.add_post("/translate", stub_translate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", STUB_PORT).start()
+    return runner
+
+
+async def run_load(project, users: int, requests_per_user: int):
+    """Run users concurrent clients, each asking for the weather in turn."""
+    async def user(index):
+        for n in range(requests_per_user):
+            await project.get_weather(f"city{index}-{n}", "en-US")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return time.perf_counter() - start
+
+
+async def main():
+    base = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ.setdefault("WEATHER_API_KEY", "stub")
+    os.environ["WEATHER_API_URL"] = f"{base}/weather"
+    os.environ["TRANSLATION_API_URL"] = f"{base}/translate"
+    os.environ["TRANSLATION_CACHE_PATH"] = ":memory:"
+    import project
+
+    runner = await start_stub_server()
+    try:
+        print(f"Weather lookups against a stub with {STUB_LATENCY * 1000:.0f} ms latency, "
+              f"{project.HTTP_POOL_SIZE_PER_HOST} connections per host")
+        print(f"{'users':>6} {'requests':>9} {'seconds':>8} {'req/s':>8}")
+        for users, requests_per_user in ((1, 20), (10, 20), (50, 4), (200, 1)):
+            elapsed = await run_load(project, users, requests_per_user)
+            done = users * requests_per_user
+            print(f"{users:>6} {done:>9} {elapsed:>8.2f} {done / elapsed:>8.1f}")
+    finally:
+        await project.close_http_session()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
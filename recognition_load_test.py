@@ -0,0 +1,78 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+import wave
+
+import aiohttp
+from aiohttp import web
+
+from recognition_server import EOF_MESSAGE, RecognitionServer, create_app
+
+# Streams a recording to the recognition server from many clients at once,
+# each paced like a live microphone, and reports the per-session real-time
+# factor and how long audio waited for a decoding worker
+AUDIO_PATH = sys.argv[1] if len(sys.argv) > 1 else "test_audio.wav"
+SERVER_PORT = 8771
+CHUNK_S = 0.1
+CONCURRENCY = (1, 4, 16, 64)
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getframerate(), wav.getnchannels(), wav.readframes(wav.getnframes())
+
+
+async def stream(session, rate, channels, audio):
+    """Send audio in real time, then wait for the server's stats for this session."""
+    chunk_bytes = int(rate * CHUNK_S) * channels * 2
+    url = f"http://127.0.0.1:{SERVER_PORT}/recognize?rate={rate}&channels={channels}"
+    texts = []
+    async with session.ws_connect(url) as ws:
+        async def receive():
+            async for message in ws:
+                result = message.json()
+                if "stats" in result:
+                    return result["stats"]
+                if result.get("text"):
+                    texts.append(result["text"])
+
+        receiver = asyncio.create_task(receive())
+        started = time.perf_counter()
+        for n, offset in enumerate(range(0, len(audio), chunk_bytes)):
+            await ws.send_bytes(audio[offset:offset + chunk_bytes])
+            await asyncio.sleep(max(0.0, started + (n + 1) * CHUNK_S - time.perf_counter()))
+        await ws.send_json(EOF_MESSAGE)
+        stats = await receiver
+    return stats, " ".join(texts)
+
+
+async def main():
+    rate, channels, audio = read_wav(AUDIO_PATH)
+    server = RecognitionServer()
+    runner = web.AppRunner(create_app(server))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", SERVER_PORT).start()
+    try:
+        print(f"{AUDIO_PATH}: {len(audio) / (rate * channels * 2):.2f}s at {rate} Hz, "
+              f"{server.workers} workers on {os.cpu_count()} cores, model {server.model_path}")
+        print(f"{'sessions':>8} {'rtf mean':>9} {'rtf max':>8} {'lag mean ms':>12} {'lag max ms':>11} {'wall s':>7}")
+        async with aiohttp.ClientSession() as session:
+            for sessions in CONCURRENCY:
+                started = time.perf_counter()
+                results = await asyncio.gather(*(stream(session, rate, channels, audio) for _ in range(sessions)))
+                elapsed = time.perf_counter() - started
+                stats = [stats for stats, _ in results]
+                rtfs = [s["rtf"] for s in stats if s["rtf"] is not None]
+                lags = [s["lag_ms"]["mean"] for s in stats if s["lag_ms"]["mean"] is not None]
+                print(f"{sessions:>8} {statistics.mean(rtfs):>9.3f} {max(rtfs):>8.3f} "
+                      f"{statistics.mean(lags):>12.1f} {max(s['lag_ms']['max'] for s in stats):>11.1f} "
+                      f"{elapsed:>7.2f}")
+        print(f"text: {results[0][1]!r}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,268 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Which speech_recognition engines default_engines() races, in order
+RECOGNITION_ENGINES = os.getenv("RECOGNITION_ENGINES", "google,sphinx")
+RACE_THRESHOLD = float(os.getenv("RACE_THRESHOLD", "0.8"))
+RACE_TIMEOUT = float(os.getenv("RACE_TIMEOUT", "8"))
+
+FIRST_CONFIDENT = "first"  # return the first result at or above the threshold
+VOTE = "vote"  # return once a majority of engines agree, else the best-supported text
+
+
+@dataclass
+class Engine:
+    name: str
+    # Takes the audio and returns (text, confidence); raises when it has no answer
+    recognize: Callable[[Any], Tuple[str, Optional[float]]]
+    # Used when the engine reports no confidence of its own
+    default_confidence: float = 0.5
+
+
+@dataclass
+class EngineResult:
+    engine: str
+    text: str
+    confidence: float
+    latency: float
+
+
+@dataclass
+class RaceResult:
+    text: str
+    confidence: float
+    engine: Optional[str]
+    latency: float
+    # Results that were in when the race was decided; stragglers finish later
+    results: List[EngineResult] = field(default_factory=list)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text).casefold().split())
+
+
+class _EngineStats:
+    def __init__(self):
+        self.calls = self.answers = self.failures = self.wins = 0
+        self.agreed = self.compared = 0
+        self.latency_total = self.latency_max = 0.0
+
+
+class RecognitionRace:
+    """Fans one utterance out to several engines and keeps the first good answer.
+
+    In FIRST_CONFIDENT mode the first result whose confidence reaches the
+    threshold wins; in VOTE mode the race ends as soon as a majority of
+    engines agree. Engines still queued when the race is decided are
+    cancelled; calls already in flight cannot be interrupted, so they finish
+    in the background and only count toward the latency and agreement stats.
+    """
+
+    def __init__(self, engines: List[Engine], threshold: float = RACE_THRESHOLD,
+                 mode: str = FIRST_CONFIDENT, timeout: float = RACE_TIMEOUT, workers: Optional[int] = None):
+        if mode not in (FIRST_CONFIDENT, VOTE):
+            raise ValueError(f"Unknown race mode: {mode}")
+        self.engines = engines
+        self.threshold = threshold
+        self.mode = mode
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers or 2 * len(engines),
+                                            thread_name_prefix="recognition-engine")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _EngineStats] = defaultdict(_EngineStats)
+
+    def recognize(self, audio) -> Optional[RaceResult]:
+        """Run every engine on audio and return the winning result, or None if none answered."""
+        started = time.perf_counter()
+        race = {"winner": None, "results": []}
+        futures: Dict[Future, Engine] = {}
+        for engine in self.engines:
+            future = self._executor.submit(self._run_engine, engine, audio, race)
+            futures[future] = engine
+
+        pending = set(futures)
+        deadline = started + self.timeout
+        decided = None
+        while pending and decided is None:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break  # timed out
+            with self._lock:
+                decided = self._decide(race["results"], final=False)
+
+        for future in pending:
+            future.cancel()
+        with self._lock:
+            if decided is None:
+                decided = self._decide(race["results"], final=True)
+            if decided is None:
+                return None
+            text, confidence, engine = decided
+            race["winner"] = normalize_text(text)
+            self._stats[engine].wins += 1
+            # Results already in are compared now; stragglers as they arrive
+            for result in race["results"]:
+                self._compare(result, race["winner"])
+            return RaceResult(text, confidence, engine, time.perf_counter() - started, list(race["results"]))
+
+    def _run_engine(self, engine: Engine, audio, race: dict):
+        started = time.perf_counter()
+        try:
+            text, confidence = engine.recognize(audio)
+        except Exception:
+            self._record(engine.name, time.perf_counter() - started, None)
+            raise
+        result = EngineResult(engine.name, text,
+                              engine.default_confidence if confidence is None else confidence,
+                              time.perf_counter() - started)
+        with self._lock:
+            self._record(engine.name, result.latency, result)
+            race["results"].append(result)
+            if race["winner"] is not None:
+                self._compare(result, race["winner"])
+        return result
+
+    def _decide(self, results: List[EngineResult], final: bool) -> Optional[Tuple[str, float, str]]:
+        answers = [result for result in results if result.text]
+        if not answers:
+            return None
+        if self.mode == FIRST_CONFIDENT:
+            for result in answers:
+                if result.confidence >= self.threshold:
+                    return result.text, result.confidence, result.engine
+
+        votes: Dict[str, List[EngineResult]] = defaultdict(list)
+        for result in answers:
+            votes[normalize_text(result.text)].append(result)
+        best = max(votes.values(), key=lambda group: (len(group), sum(r.confidence for r in group)))
+        if final or (self.mode == VOTE and len(best) > len(self.engines) // 2):
+            top = max(best, key=lambda result: result.confidence)
+            return top.text, sum(r.confidence for r in best) / len(best), top.engine
+        return None
+
+    def _record(self, engine: str, latency: float, result: Optional[EngineResult]):
+        stats = self._stats[engine]
+        stats.calls += 1
+        stats.latency_total += latency
+        stats.latency_max = max(stats.latency_max, latency)
+        if result is None or not result.text:
+            stats.failures += 1
+        else:
+            stats.answers += 1
+
+    def _compare(self, result: EngineResult, winner: str):
+        stats = self._stats[result.engine]
+        stats.compared += 1
+        stats.agreed += normalize_text(result.text) == winner
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-engine calls, wins, latency and agreement with the winning text."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": s.calls,
+                    "answers": s.answers,
+                    "failures": s.failures,
+                    "wins": s.wins,
+                    "latency_avg_ms": round(s.latency_total / s.calls * 1000, 1) if s.calls else None,
+                    "latency_max_ms": round(s.latency_max * 1000, 1),
+                    "agreement": round(s.agreed / s.compared, 3) if s.compared else None,
+                }
+                for name, s in self._stats.items()
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def sr_engine(name: str, default_confidence: float = 0.5, timeout: Optional[float] = None,
+              **options) -> Engine:
+    """Wrap a speech_recognition recognize_<name> method as an engine."""
+    import speech_recognition as sr
+
+    recognizer = sr.Recognizer()
+    # Seconds to wait for a network engine before it raises sr.RequestError
+    recognizer.operation_timeout = timeout
+    method = getattr(recognizer, f"recognize_{name}")
+
+    def recognize(audio):
+        if name != "google":
+            return method(audio, **options), None
+        # Google reports a confidence for its best alternative
+        response = method(audio, show_all=True, **options)
+        if not response:
+            raise sr.UnknownValueError()
+        best = response["alternative"][0]
+        return best["transcript"], best.get("confidence")
+
+    return Engine(name, recognize, default_confidence)
+
+
+def default_engines() -> List[Engine]:
+    """Build the engines named in RECOGNITION_ENGINES that have credentials configured."""
+    credentials = {
+        "wit": {"key": os.getenv("WIT_AI_KEY")},
+        "azure": {"key": os.getenv("AZURE_SPEECH_KEY")},
+        "houndify": {"client_id": os.getenv("HOUNDIFY_CLIENT_ID"),
+                     "client_key": os.getenv("HOUNDIFY_CLIENT_KEY")},
+        "ibm": {"username": os.getenv("IBM_USERNAME"), "password": os.getenv("IBM_PASSWORD")},
+        "whisper": {"language": "english"},
+    }
+    engines = []
+    for name in (name.strip() for name in RECOGNITION_ENGINES.split(",") if name.strip()):
+        options = credentials.get(name, {})
+        # recognize_openai reads its key from the environment itself
+        if not all(options.values()) or (name == "openai" and not os.getenv("OPENAI_API_KEY")):
+            print(f"Skipping {name}: credentials are not configured")
+            continue
+        # Local engines are weaker than the cloud ones when they disagree
+        engines.append(sr_engine(name, 0.4 if name == "sphinx" else 0.6, **options))
+    return engines
+
+
+def stand_in_engine(name: str, text: str, confidence: Optional[float] = 0.9, latency: float = 0.1,
+                    error: Optional[Exception] = None) -> Engine:
+    """A local engine that answers after a fixed delay, for tests and benchmarks."""
+    def recognize(audio):
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        return text, confidence
+
+    return Engine(name, recognize)
+
+
+if __name__ == "__main__":
+    # Sequential calls pay for every engine; the race pays for the first
+    # confident one. Latencies roughly follow local vs cloud engines.
+    engines = [
+        stand_in_engine("sphinx", "what time is it", confidence=0.4, latency=0.3),
+        stand_in_engine("google", "what time is it", confidence=0.92, latency=0.6),
+        stand_in_engine("whisper", "what time is it", confidence=None, latency=1.5),
+        stand_in_engine("wit", "", latency=0.8, error=RuntimeError("quota exceeded")),
+        stand_in_engine("azure", "what time is it", confidence=0.88, latency=0.9),
+    ]
+    started = time.perf_counter()
+    for engine in engines:
+        try:
+            engine.recognize(None)
+        except RuntimeError:
+            pass
+    print(f"sequential: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for mode in (FIRST_CONFIDENT, VOTE):
+        race = RecognitionRace(engines, mode=mode)
+        result = race.recognize(None)
+        print(f"{mode:>10}: {result.latency * 1000:.0f} ms -> {result.text!r} from {result.engine} "
+              f"({result.confidence:.2f})")
+        time.sleep(1.6)  # let stragglers report in
+        for name, stats in race.stats().items():
+            print(f"{'':>12}{name:>8} {stats}")
+        race.shutdown()
@@ -0,0 +1,362 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+from audio_capture import SAMPLE_WIDTH
+from audio_frontend import AudioFrontEnd
+from model_registry import VOSK_MODEL_PATH, models
+from vosk_recognizer import PARTIAL_HZ, SAMPLE_RATE, mean_confidence
+
+try:
+    from vosk import KaldiRecognizer
+except ImportError:  # The server cannot decode without it; create_app() says so at startup
+    KaldiRecognizer = None
+
+# Decoding threads; Vosk releases the GIL while it decodes, so one per core
+RECOGNITION_WORKERS = int(os.getenv("RECOGNITION_WORKERS", "0")) or os.cpu_count() or 1
+# A session's socket stops being read once this much of its audio is waiting to be decoded
+RECOGNITION_MAX_BACKLOG_S = float(os.getenv("RECOGNITION_MAX_BACKLOG_S", "5"))
+# Audio a worker decodes for one session before moving on to the next waiting session
+RECOGNITION_SLICE_S = float(os.getenv("RECOGNITION_SLICE_S", "0.5"))
+
+# Sent by the client after its last audio, as with the Vosk server protocol
+EOF_MESSAGE = {"eof": 1}
+
+
+class RecognitionSession:
+    """One client's audio stream, decoded by its own KaldiRecognizer over the shared model.
+
+    Audio is queued as it arrives and decoded in slices on the server's
+    worker pool, never on the event loop and never on two workers at once.
+    Results are handed back to the loop through the outbox, as the Vosk
+    server's JSON messages: {"partial": ...} and {"text": ..., "result": [...]}.
+    """
+
+    def __init__(self, session_id: int, model, executor: ThreadPoolExecutor,
+                 loop: asyncio.AbstractEventLoop, input_rate: int = SAMPLE_RATE, channels: int = 1,
+                 partials: bool = True, slice_s: float = RECOGNITION_SLICE_S):
+        self.id = session_id
+        self.executor = executor
+        self.loop = loop
+        self.front_end = AudioFrontEnd(input_rate, SAMPLE_RATE, channels)
+        self.recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+        self.recognizer.SetWords(True)
+        self._bytes_per_second = input_rate * self.front_end.input_frame_bytes
+        self._slice_bytes = int(slice_s * self._bytes_per_second)
+        self._partial_interval = int(SAMPLE_RATE / PARTIAL_HZ) * SAMPLE_WIDTH if partials and PARTIAL_HZ > 0 else 0
+        self._since_partial = 0
+        self._last_partial_json = ""
+        self.outbox: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+        # (input audio, time received); None marks the end of the stream
+        self._chunks: Deque[Tuple[Optional[bytes], float]] = deque()
+        # Clients may split the stream anywhere; a trailing partial frame waits for the next message
+        self._remainder = b""
+        self._backlog = 0
+        self._scheduled = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self.started_at = time.perf_counter()
+        self.audio_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.results = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._chunks_decoded = 0
+
+    @property
+    def backlog_seconds(self) -> float:
+        return self._backlog / self._bytes_per_second
+
+    def submit(self, data: bytes):
+        """Queue raw input audio for decoding; call from the event loop."""
+        if self._remainder:
+            data = self._remainder + data
+        whole = len(data) - len(data) % self.front_end.input_frame_bytes
+        self._remainder = data[whole:]
+        if whole > 0:
+            self._enqueue(data[:whole])
+
+    def finish(self):
+        """Decode what is queued, then send the final result and the session stats."""
+        self._enqueue(None)
+
+    def cancel(self):
+        """Drop queued audio; the client is gone and nothing will read the results."""
+        with self._lock:
+            self._chunks.clear()
+            self._backlog = 0
+        self._enqueue(None)
+
+    async def wait_drained(self):
+        """Wait until the backlog is back under RECOGNITION_MAX_BACKLOG_S."""
+        await self._drained.wait()
+
+    def _enqueue(self, data: Optional[bytes]):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = data is None
+            self._chunks.append((data, time.perf_counter()))
+            if data is not None:
+                self._backlog += len(data)
+                if self.backlog_seconds > RECOGNITION_MAX_BACKLOG_S:
+                    self._drained.clear()
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.executor.submit(self._decode_slice)
+
+    def _decode_slice(self):
+        """Runs on a worker: decode up to one slice of queued audio, then yield the worker."""
+        try:
+            finished = self._decode_queued()
+        except Exception as e:
+            # The executor would swallow this; end the session so the handler is not left waiting
+            print(f"Recognition session {self.id} failed: {e}")
+            with self._lock:
+                self._chunks.clear()
+                self._backlog = 0
+                self._closed = True
+            self._post({"error": str(e) or type(e).__name__})
+            self._post(None)
+            finished = True
+        if finished or self.backlog_seconds <= RECOGNITION_MAX_BACKLOG_S:
+            self.loop.call_soon_threadsafe(self._drained.set)
+
+    def _decode_queued(self) -> bool:
+        """Decode queued chunks for one slice; returns True once the stream has ended."""
+        decoded = 0
+        while decoded < self._slice_bytes:
+            with self._lock:
+                if not self._chunks:
+                    self._scheduled = False
+                    return False
+                data, received_at = self._chunks.popleft()
+                if data is not None:
+                    self._backlog -= len(data)
+            started = time.perf_counter()
+            lag = started - received_at
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+            self._chunks_decoded += 1
+            if data is None:
+                self._decode(self.front_end.flush())
+                self._send_final(self.recognizer.FinalResult())
+                self.decode_seconds += time.perf_counter() - started
+                self._post({"stats": self.stats()})
+                self._post(None)
+                return True
+            self._decode(self.front_end.process(data))
+            self.decode_seconds += time.perf_counter() - started
+            self.audio_seconds += len(data) / self._bytes_per_second
+            decoded += len(data)
+        # Slice used up: go to the back of the pool's queue so other sessions get a turn
+        self.executor.submit(self._decode_slice)
+        return False
+
+    def _decode(self, pcm: bytes):
+        if not pcm:
+            return
+        if self.recognizer.AcceptWaveform(pcm):
+            self._send_final(self.recognizer.Result())
+            return
+        if not self._partial_interval:
+            return
+        self._since_partial += len(pcm)
+        if self._since_partial < self._partial_interval:
+            return
+        self._since_partial = 0
+        partial_json = self.recognizer.PartialResult()
+        # Vosk repeats the same partial for most blocks; skip parsing and sending those
+        if partial_json == self._last_partial_json:
+            return
+        self._last_partial_json = partial_json
+        partial = json.loads(partial_json)
+        if partial.get("partial"):
+            self._post(partial)
+
+    def _send_final(self, result_json: str):
+        self._since_partial = 0
+        self._last_partial_json = ""
+        result = json.loads(result_json)
+        if not result.get("text"):
+            return
+        self.results += 1
+        result["confidence"] = mean_confidence(result.get("result", []))
+        self._post(result)
+
+    def _post(self, message: Optional[dict]):
+        self.loop.call_soon_threadsafe(self.outbox.put_nowait, message)
+
+    def stats(self) -> Dict[str, Any]:
+        """Real-time factor (decode time per audio second) and how long audio waited for a worker."""
+        return {
+            "id": self.id,
+            "audio_seconds": round(self.audio_seconds, 3),
+            "rtf": round(self.decode_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+            "results": self.results,
+            "lag_ms": {
+                "mean": round(self._lag_total / self._chunks_decoded * 1000, 1) if self._chunks_decoded else None,
+                "max": round(self._lag_max * 1000, 1),
+            },
+            "backlog_seconds": round(self.backlog_seconds, 3),
+            "age_seconds": round(time.perf_counter() - self.started_at, 3),
+        }
+
+
+class RecognitionServer:
+    """Accepts many concurrent audio streams and decodes them on one worker pool.
+
+    The Vosk model is loaded once through the model registry and shared by
+    every session's recognizer. Sessions take turns on the pool one slice
+    of audio at a time, so a long or fast stream cannot starve the others.
+    """
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH, workers: int = RECOGNITION_WORKERS):
+        self.model_path = model_path
+        self.workers = workers
+        self.model = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recognition-worker")
+        self._ids = itertools.count(1)
+        self.sessions: Dict[int, RecognitionSession] = {}
+        self.counters = {"opened": 0, "completed": 0, "disconnected": 0}
+        self._audio_seconds = 0.0
+        self._decode_seconds = 0.0
+
+    def load(self):
+        if KaldiRecognizer is None:
+            raise RuntimeError("Vosk is not installed. Install it with 'pip install vosk'.")
+        self.model = models.get("vosk", self.model_path)
+
+    def open_session(self, input_rate: int, channels: int, partials: bool) -> RecognitionSession:
+        session = RecognitionSession(next(self._ids), self.model, self._executor,
+                                     asyncio.get_running_loop(), input_rate, channels, partials)
+        self.sessions[session.id] = session
+        self.counters["opened"] += 1
+        return session
+
+    def close_session(self, session: RecognitionSession, completed: bool):
+        self.sessions.pop(session.id, None)
+        self.counters["completed" if completed else "disconnected"] += 1
+        self._audio_seconds += session.audio_seconds
+        self._decode_seconds += session.decode_seconds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = [session.stats() for session in self.sessions.values()]
+        audio = self._audio_seconds + sum(session.audio_seconds for session in self.sessions.values())
+        decode = self._decode_seconds + sum(session.decode_seconds for session in self.sessions.values())
+        return {
+            "workers": self.workers,
+            **self.counters,
+            "active": len(sessions),
+            "audio_seconds": round(audio, 3),
+            # Decode time per audio second across every session; under 1 / workers keeps up with real time
+            "rtf": round(decode / audio, 4) if audio else None,
+            "backlog_seconds": round(sum(session["backlog_seconds"] for session in sessions), 3),
+            "sessions": sessions,
+        }
+
+
+def is_eof(text: str) -> bool:
+    try:
+        return json.loads(text) == EOF_MESSAGE
+    except ValueError:
+        return False
+
+
+async def send_results(ws: web.WebSocketResponse, session: RecognitionSession):
+    """Forward the session's results to the client until the session ends."""
+    while True:
+        message = await session.outbox.get()
+        if message is None:
+            return
+        if not ws.closed:
+            try:
+                await ws.send_json(message)
+            except ConnectionError:
+                pass
+        if "error" in message:
+            # Decoding failed; closing the socket ends recognize()'s read loop too
+            await ws.close()
+
+
+async def recognize(request):
+    """Stream binary 16-bit PCM in, JSON results out; ?rate= and ?channels= describe the input."""
+    server = request.app["recognition"]
+    try:
+        input_rate = int(request.query.get("rate", SAMPLE_RATE))
+        channels = int(request.query.get("channels", "1"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="rate and channels must be integers")
+    if input_rate <= 0 or channels < 1:
+        raise web.HTTPBadRequest(text="rate must be positive and channels at least 1")
+    partials = request.query.get("partials", "1") == "1"
+
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    session = server.open_session(input_rate, channels, partials)
+    sender = asyncio.create_task(send_results(ws, session))
+    completed = False
+    try:
+        async for message in ws:
+            if message.type == WSMsgType.BINARY:
+                session.submit(message.data)
+                # Backpressure: stop reading this socket until its audio is decoded
+                await session.wait_drained()
+            elif message.type == WSMsgType.TEXT:
+                if is_eof(message.data):
+                    completed = True
+                    break
+            elif message.type == WSMsgType.ERROR:
+                print(f"Recognition session {session.id} failed: {ws.exception()}")
+                break
+    finally:
+        if completed:
+            session.finish()
+        else:
+            session.cancel()
+        await sender
+        server.close_session(session, completed)
+    await ws.close()
+    return ws
+
+
+async def metrics(request):
+    return web.json_response(request.app["recognition"].stats())
+
+
+async def load_model(app):
+    # Loading takes seconds for the large models; keep the loop responsive meanwhile
+    await asyncio.get_running_loop().run_in_executor(None, app["recognition"].load)
+
+
+async def stop_workers(app):
+    app["recognition"].shutdown()
+
+
+def create_app(server: Optional[RecognitionServer] = None):
+    """Build the recognition web application: /recognize (WebSocket) and /metrics."""
+    app = web.Application()
+    app["recognition"] = server or RecognitionServer()
+    app.router.add_get("/recognize", recognize)
+    app.router.add_get("/metrics", metrics)
+    app.on_startup.append(load_model)
+    app.on_cleanup.append(stop_workers)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=int(os.getenv("RECOGNITION_PORT", "2700")))
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import statistics
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+from werkzeug.serving import make_server
+
+# Stubbed weather/news backends with a fixed latency, so both server modes
+# are measured against the same slow upstream
+STUB_LATENCY = 0.2
+STUB_PORT = 8766
+FLASK_PORT = 8767
+ASYNC_PORT = 8768
+
+os.environ.setdefault("API_KEY", "stub")
+os.environ.setdefault("BASE_URL", f"http://127.0.0.1:{STUB_PORT}/weather")
+os.environ.setdefault("NEWS_API_KEY", "stub")
+os.environ.setdefault("NEWS_URL", f"http://127.0.0.1:{STUB_PORT}/news")
+# Keep speech output out of the measurement
+os.environ["SPEECH_OUTPUT"] = "off"
+
+import speech_assistant  # noqa: E402
+import speech_assistant_async  # noqa: E402
+
+# Keep per-request logging out of the measurement
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+
+async def stub_weather(request):
+    await asyncio.sleep(STUB_LATENCY)
+    return web.json_response({
+        "cod": 200,
+        "main": {"temp": 30.4, "humidity": 70},
+        "weather": [{"description": "clear sky"}],
+        "wind": {"speed": 3.1},
+    })
+
+
+async def stub_news(request):
+    await asyncio.sleep(STUB_LATENCY)
+    articles = [{"title": f"Headline {i}"} for i in range(1, 6)]
+    return web.json_response({"status": "ok", "articles": articles})
+
+
+def serve_in_thread(app, port):
+    """Run an aiohttp application on its own event loop thread."""
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+
+
+def start_servers():
+    stub = web.Application()
+    stub.router.add_get("/weather", stub_weather)
+    stub.router.add_get("/news", stub_news)
+    serve_in_thread(stub, STUB_PORT)
+    serve_in_thread(speech_assistant_async.create_app(), ASYNC_PORT)
+
+    flask_server = make_server("127.0.0.1", FLASK_PORT, speech_assistant.app, threaded=True)
+    threading.Thread(target=flask_server.serve_forever, daemon=True).start()
+
+
+async def run_load(port, concurrency, total):
+    """Send total weather/news commands with concurrency clients in flight."""
+    url = f"http://127.0.0.1:{port}/process_command"
+    commands = ["weather in pune", "what's the news"]
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client(session):
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data={"command": commands[n % 2], "type": "text"}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return total / elapsed, statistics.median(latencies), p99, errors
+
+
+async def main():
+    start_servers()
+    print(f"Upstream latency {STUB_LATENCY * 1000:.0f} ms, "
+          f"Flask mode with {speech_assistant.COMMAND_WORKERS} command workers")
+    print(f"{'mode':>6} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in (10, 50, 200):
+        total = concurrency * 4
+        for mode, port in (("flask", FLASK_PORT), ("async", ASYNC_PORT)):
+            rps, p50, p99, errors = await run_load(port, concurrency, total)
+            print(f"{mode:>6} {concurrency:>8} {rps:>8.1f} {p50 * 1000:>8.0f} {p99 * 1000:>8.0f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,132 +1,132 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 import os
-import pyttsx3
-import speech_recognition as sr
+import base64
+import json
 import random
 import webbrowser
 import datetime
 import subprocess
-import requests
-import threading
-import queue
-import time
+from concurrent.futures import TimeoutError
+from intents import dispatch, match_intent
+from command_pool import CommandPool, CommandRejected
+from tts_service import SpeechOutput, DROP_OLDEST
+from weather_service import shared_weather_service
+from news_service import DEFAULT_NEWS_URL, shared_news_prefetcher
+from tiered_recognizer import current_tiered_recognizer, shared_tiered_recognizer
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 
-# Initialize text-to-speech engine
-try:
-    engine = pyttsx3.init()
-    voices = engine.getProperty("voices")
-    engine.setProperty("voice", voices[0].id)
-    engine.setProperty("rate", 175)
-except Exception as e:
-    print(f"Error initializing text-to-speech engine: {e}")
-    engine = None
-
 # API configurations
 API_KEY = os.getenv("API_KEY")  # Weather API key
 BASE_URL = os.getenv("BASE_URL")  # Weather base URL
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+NEWS_URL = os.getenv("NEWS_URL", DEFAULT_NEWS_URL)
+NEWS_COUNTRY = os.getenv("NEWS_COUNTRY", "in")
+
+# Command worker pool settings
+COMMAND_WORKERS = int(os.getenv("COMMAND_WORKERS", "4"))
+COMMAND_MAX_PENDING = int(os.getenv("COMMAND_MAX_PENDING", "64"))
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "10"))
+
+# Speech output: "local" plays on the server's speakers, "client" returns the
+# synthesized audio in the response instead, "off" disables speech entirely
+SPEECH_OUTPUT = os.getenv("SPEECH_OUTPUT", "local")
+
+# Text-to-speech runs on its own thread so responses never wait for the speakers
+speech_output = SpeechOutput(
+    max_queue=int(os.getenv("SPEECH_QUEUE_SIZE", "16")),
+    policy=os.getenv("SPEECH_QUEUE_POLICY", DROP_OLDEST),
+    enabled=SPEECH_OUTPUT == "local",
+)
 
-# Queue for command processing
-command_queue = queue.Queue()
-response_queue = queue.Queue()
+# Headlines are refreshed in the background so "news" never waits on News API
+news_prefetcher = shared_news_prefetcher()
 
 
 def speak(audio):
-    """Speak out the given text."""
-    if engine:
-        try:
-            engine.say(audio)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"Error in speech synthesis: {e}")
+    """Queue the given text for speech and return it."""
+    speech_output.say(audio)
     return audio
 
 
-def process_command(request_text):
-    """Process the command and return the response."""
-    if not request_text:
-        return "Sorry, I didn't catch that. Could you please repeat?"
+def synthesize_audio(text):
+    """Render text to WAV and return it base64-encoded, or None on failure."""
+    try:
+        audio = speech_output.synthesize(text).result(timeout=COMMAND_TIMEOUT)
+        return base64.b64encode(audio).decode("ascii")
+    except Exception as e:
+        print(f"Error synthesizing speech: {e}")
+        return None
+
+
+def play_music():
+    """Open a random song on YouTube."""
+    response = speak("Playing Music!")
+    songs = [
+        "https://www.youtube.com/watch?v=1G4isv_Fylg",
+        "https://www.youtube.com/watch?v=pElk1ShPrcE",
+        "https://www.youtube.com/watch?v=1cDoRqPnCXU",
+    ]
+    webbrowser.open(random.choice(songs))
+    return response
 
-    request_text = request_text.lower()
-    response = ""
 
-    try:
-        if any(greeting in request_text for greeting in ["hello", "hi", "hey"]):
-            response = speak("Welcome! How can I assist you?")
-
-        elif "play music" in request_text or "play song" in request_text:
-            response = speak("Playing Music!")
-            songs = [
-                "https://www.youtube.com/watch?v=1G4isv_Fylg",
-                "https://www.youtube.com/watch?v=pElk1ShPrcE",
-                "https://www.youtube.com/watch?v=1cDoRqPnCXU",
-            ]
-            webbrowser.open(random.choice(songs))
-
-        elif "time" in request_text:
-            now_time = datetime.datetime.now().strftime("%H:%M")
-            response = speak(f"Current time is {now_time}")
-
-        elif "date" in request_text:
-            now_date = datetime.datetime.now().strftime("%d-%m-%Y")
-            response = speak(f"Today's date is {now_date}")
-
-        elif "search google for" in request_text:
-            search_query = request_text.replace("search google for", "").strip()
-            if search_query:
-                search_web(search_query, "google")
-                response = speak(f"Searching Google for {search_query}")
-
-        elif "search youtube for" in request_text:
-            search_query = request_text.replace("search youtube for", "").strip()
-            if search_query:
-                search_web(search_query, "youtube")
-                response = speak(f"Searching YouTube for {search_query}")
-
-        elif "search maps for" in request_text or "search google maps for" in request_text:
-            search_query = (
-                request_text.replace("search maps for", "")
-                .replace("search google maps for", "")
-                .strip()
-            )
-            if search_query:
-                search_web(search_query, "maps")
-                response = speak(f"Searching Maps for {search_query}")
-
-        elif request_text.startswith("open "):
-            app_name = request_text[5:].strip()
-            response = open_application(app_name)
-
-        elif "weather" in request_text or "what's the weather" in request_text:
-            city = request_text.replace("weather", "").replace("what's the", "").strip()
-            if city:
-                response = get_weather(city)
-            else:
-                response = speak("I couldn't get the city name.")
+def search_for(search_query, platform, label):
+    """Search the platform and announce it, unless the query is empty."""
+    if not search_query:
+        return ""
+    search_web(search_query, platform)
+    return speak(f"Searching {label} for {search_query}")
 
-        elif "set alarm" in request_text or "create alarm" in request_text:
-            response = set_alarm()
 
-        elif "set reminder" in request_text or "create reminder" in request_text:
-            response = set_reminder()
+def city_from(match):
+    """Extract the city name from a weather command."""
+    return match.remainder.replace("what's the", "").strip()
 
-        elif "news" in request_text or "headlines" in request_text or "what's the news" in request_text:
-            response = get_news()
 
-        else:
-            response = speak("I'm not sure how to help with that. Can you try something else?")
+def weather_for(match):
+    """Fetch the weather for the city named in the command."""
+    city = city_from(match)
+    if city:
+        return get_weather(city)
+    return speak("I couldn't get the city name.")
 
+
+# Intent handlers, routed through the shared matcher in intents.py
+handlers = {
+    "greeting": lambda match: speak("Welcome! How can I assist you?"),
+    "play_music": lambda match: play_music(),
+    "time": lambda match: speak(f"Current time is {datetime.datetime.now().strftime('%H:%M')}"),
+    "date": lambda match: speak(f"Today's date is {datetime.datetime.now().strftime('%d-%m-%Y')}"),
+    "search_google": lambda match: search_for(match.remainder, "google", "Google"),
+    "search_youtube": lambda match: search_for(match.remainder, "youtube", "YouTube"),
+    "search_maps": lambda match: search_for(match.remainder, "maps", "Maps"),
+    "open": lambda match: open_application(match.remainder),
+    "weather": weather_for,
+    "set_alarm": lambda match: set_alarm(),
+    "set_reminder": lambda match: set_reminder(),
+    "news": lambda match: get_news(),
+}
+
+
+def process_command(request_text):
+    """Process the command and return the response."""
+    if not request_text:
+        return "Sorry, I didn't catch that. Could you please repeat?"
+
+    try:
+        return dispatch(
+            request_text.lower(),
+            handlers,
+            default=lambda text: speak("I'm not sure how to help with that. Can you try something else?"),
+        )
     except Exception as e:
         print(f"Error processing command: {e}")
-        response = speak("Sorry, I encountered an error processing your request.")
-
-    return response
+        return speak("Sorry, I encountered an error processing your request.")
 
 
 def search_web(query, platform):
@@ -165,30 +165,30 @@ def open_application(app_name):
     return speak("Sorry, I couldn't find that application.")
 
 
+def describe_weather(city, data):
+    """Turn an OpenWeatherMap response into the spoken weather report."""
+    if data.get("cod") != 200:
+        return f"Sorry, I couldn't fetch the weather. Error: {data.get('message', 'Unknown error')}"
+
+    temp = data["main"]["temp"]
+    weather_desc = data["weather"][0]["description"]
+    humidity = data["main"]["humidity"]
+    wind_speed = data["wind"]["speed"]
+
+    return (
+        f"The current temperature in {city} is {temp} degrees Celsius, "
+        f"with {weather_desc}. The humidity is {humidity} percent, "
+        f"and the wind speed is {wind_speed} meters per second."
+    )
+
+
 def get_weather(city):
     """Fetches weather data for a given city."""
     if not API_KEY or not BASE_URL:
         return speak("Weather service is not configured properly.")
 
     try:
-        params = {"q": city, "appid": API_KEY, "units": "metric"}
-        response = requests.get(BASE_URL, params=params, timeout=5)
-        data = response.json()
-
-        if data.get("cod") != 200:
-            return speak(f"Sorry, I couldn't fetch the weather. Error: {data.get('message', 'Unknown error')}")
-
-        temp = data["main"]["temp"]
-        weather_desc = data["weather"][0]["description"]
-        humidity = data["main"]["humidity"]
-        wind_speed = data["wind"]["speed"]
-
-        weather_info = (
-            f"The current temperature in {city} is {temp} degrees Celsius, "
-            f"with {weather_desc}. The humidity is {humidity} percent, "
-            f"and the wind speed is {wind_speed} meters per second."
-        )
-        return speak(weather_info)
+        return speak(describe_weather(city, shared_weather_service().get(city)))
 
     except Exception as e:
         print(f"Error fetching weather: {e}")
@@ -205,70 +205,105 @@ def set_reminder():
     return speak("I'll open the Clock app where you can set your reminder.")
 
 
+def news_parts(data):
+    """Yield the spoken headline summary piece by piece: the intro, then each headline."""
+    if data.get("status") != "ok":
+        yield "Sorry, I couldn't fetch the news at the moment."
+        return
+
+    articles = data.get("articles", [])[:5]  # Get top 5 articles
+    if not articles:
+        yield "No news headlines available at the moment."
+        return
+
+    yield "Here are the top news headlines: "
+    for i, article in enumerate(articles, 1):
+        title = article.get("title", "No title available")
+        yield f"{i}. {title}. "
+
+
+def describe_news(data):
+    """Turn a News API response into the spoken headline summary."""
+    return "".join(news_parts(data))
+
+
+def fetch_news():
+    """Return the top headlines response, kept warm by the news prefetcher."""
+    return news_prefetcher.get(country=NEWS_COUNTRY)
+
+
 def get_news():
     """Fetch top news headlines using News API."""
     if not NEWS_API_KEY:
         return speak("News service is not configured properly.")
 
     try:
-        url = f"https://newsapi.org/v2/top-headlines?country=in&apiKey={NEWS_API_KEY}"
-        response = requests.get(url, timeout=5)
-        data = response.json()
-
-        if data.get("status") != "ok":
-            return speak("Sorry, I couldn't fetch the news at the moment.")
+        return speak(describe_news(fetch_news()))
 
-        articles = data.get("articles", [])[:5]  # Get top 5 articles
-        if not articles:
-            return speak("No news headlines available at the moment.")
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+        return speak("There was an error getting the news.")
 
-        news_text = "Here are the top news headlines: "
-        for i, article in enumerate(articles, 1):
-            title = article.get("title", "No title available")
-            news_text += f"{i}. {title}. "
 
-        return speak(news_text)
+def stream_news():
+    """Yield and speak each part of the news summary as soon as it is ready."""
+    if not NEWS_API_KEY:
+        yield speak("News service is not configured properly.")
+        return
 
+    try:
+        data = fetch_news()
     except Exception as e:
         print(f"Error fetching news: {e}")
-        return speak("There was an error getting the news.")
+        yield speak("There was an error getting the news.")
+        return
+
+    for part in news_parts(data):
+        yield speak(part)
+
+
+def stream_command(request_text):
+    """Yield the response to a command in parts; multi-part answers stream."""
+    match = match_intent(request_text.lower(), handlers) if request_text else None
+    if match is not None and match.intent == "news":
+        yield from stream_news()
+        return
+
+    try:
+        yield command_pool.run(request_text, timeout=COMMAND_TIMEOUT)
+    except CommandRejected:
+        yield "The assistant is busy right now. Please try again shortly."
+    except TimeoutError:
+        yield "The assistant is taking too long to respond."
+
+
+def sse_event(data, event=None):
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 
 def recognize_speech():
     """Capture voice command from user."""
     try:
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            print("Listening...")
-            r.adjust_for_ambient_noise(source)
-            audio = r.listen(source, timeout=5)
-            content = r.recognize_google(audio, language="en-in")
-            print("You said:", content)
-            return content.lower()
-    except sr.UnknownValueError:
-        return "Sorry, I couldn't understand that."
-    except sr.WaitTimeoutError:
-        return "No speech detected, try again."
+        # The microphone stays open between requests, and commands are
+        # recognized locally unless the local model is unsure
+        print("Listening...")
+        result = shared_tiered_recognizer().listen(timeout=5)
+        if result is None:
+            return "No speech detected, try again."
+        if not result.text:
+            return "Sorry, I couldn't understand that."
+        print("You said:", result.text)
+        return result.text.lower()
     except Exception as e:
         print(f"Speech recognition error: {e}")
         return "There was an error processing your voice command."
 
 
-def command_processor():
-    """Process commands from the queue."""
-    while True:
-        command = command_queue.get()
-        if command == 'exit':
-            break
-        response = process_command(command)
-        response_queue.put(response)
-        command_queue.task_done()
-
-
-# Start the command processor thread
-processor_thread = threading.Thread(target=command_processor)
-processor_thread.daemon = True
-processor_thread.start()
+# Each command runs on its own worker with its own future, so a slow weather
+# or news lookup never blocks other requests or answers the wrong one
+command_pool = CommandPool(process_command, workers=COMMAND_WORKERS, max_pending=COMMAND_MAX_PENDING)
 
 
 @app.route('/')
@@ -285,22 +320,66 @@ def handle_command():
         command_text = recognize_speech()
 
     if command_text:
-        command_queue.put(command_text)
         try:
-            # Wait for response with timeout
-            response = response_queue.get(timeout=10)
-            return jsonify({'response': response})
-        except queue.Empty:
+            response = command_pool.run(command_text, timeout=COMMAND_TIMEOUT)
+            payload = {'response': response}
+            if SPEECH_OUTPUT == 'client' or request.form.get('audio'):
+                payload['audio'] = synthesize_audio(response)
+            return jsonify(payload)
+        except CommandRejected:
+            return jsonify({'response': "The assistant is busy right now. Please try again shortly."}), 503
+        except TimeoutError:
             return jsonify({'response': "The assistant is taking too long to respond."})
 
     return jsonify({'response': "No command received"})
 
 
+@app.route('/process_command_stream', methods=['POST'])
+def handle_command_stream():
+    """Same contract as /process_command, but answers as server-sent events."""
+    command_type = request.form.get('type', 'text')
+    command_text = request.form.get('command', '').strip()
+    wants_audio = SPEECH_OUTPUT == 'client' or bool(request.form.get('audio'))
+
+    def events():
+        text = recognize_speech() if command_type == 'voice' else command_text
+        if not text:
+            yield sse_event({'text': "No command received"})
+        else:
+            for part in stream_command(text):
+                payload = {'text': part}
+                if wants_audio:
+                    payload['audio'] = synthesize_audio(part)
+                yield sse_event(payload)
+        yield sse_event({}, event='done')
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/metrics')
+def metrics():
+    # Only report recognition once something has started it; reading metrics
+    # must not load the model or open the microphone
+    recognizer = current_tiered_recognizer()
+    return jsonify({
+        **command_pool.metrics(),
+        'speech': speech_output.stats(),
+        'news': news_prefetcher.stats(),
+        'recognition': recognizer.stats() if recognizer is not None else None,
+    })
+
+
 @app.route('/exit')
 def exit_app():
-    command_queue.put('exit')
+    command_pool.shutdown()
     return "Assistant is shutting down..."
 
 
 if __name__ == '__main__':
+    if NEWS_API_KEY:
+        news_prefetcher.watch(country=NEWS_COUNTRY)
     app.run(debug=True, threaded=True)
\ No newline at end of file
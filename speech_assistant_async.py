@@ -0,0 +1,200 @@
+import asyncio
+import os
+
+import aiohttp
+from aiohttp import web
+
+import speech_assistant as assistant
+from intents import match_intent
+from news_service import AsyncNewsPrefetcher
+from weather_service import AsyncWeatherService
+
+# Same /process_command contract as the Flask app in speech_assistant.py, but
+# handlers await their network I/O instead of parking a thread per request,
+# so one process can hold thousands of slow commands in flight.
+
+COMMAND_TIMEOUT = assistant.COMMAND_TIMEOUT
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html")
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+
+async def speak(text):
+    """Queue text for speech and return it."""
+    return assistant.speak(text)
+
+
+async def get_weather(weather_service, city):
+    """Fetches weather data for a given city without blocking the loop."""
+    if not assistant.API_KEY or not assistant.BASE_URL:
+        return await speak("Weather service is not configured properly.")
+
+    try:
+        data = await weather_service.get(city)
+        return await speak(assistant.describe_weather(city, data))
+    except Exception as e:
+        print(f"Error fetching weather: {e}")
+        return await speak("There was an error retrieving the weather.")
+
+
+async def fetch_news(news_prefetcher):
+    """Return the top headlines response, kept warm by the news prefetcher."""
+    return await news_prefetcher.get(country=assistant.NEWS_COUNTRY)
+
+
+async def get_news(news_prefetcher):
+    """Fetch top news headlines without blocking the loop."""
+    if not assistant.NEWS_API_KEY:
+        return await speak("News service is not configured properly.")
+
+    try:
+        return await speak(assistant.describe_news(await fetch_news(news_prefetcher)))
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+        return await speak("There was an error getting the news.")
+
+
+async def stream_command(app, request_text):
+    """Yield the response to a command in parts; multi-part answers stream."""
+    match = match_intent(request_text.lower(), assistant.handlers) if request_text else None
+    if match is None or match.intent != "news":
+        try:
+            yield await asyncio.wait_for(process_command(app, request_text), COMMAND_TIMEOUT)
+        except asyncio.TimeoutError:
+            yield "The assistant is taking too long to respond."
+        return
+
+    if not assistant.NEWS_API_KEY:
+        yield await speak("News service is not configured properly.")
+        return
+
+    try:
+        data = await fetch_news(app["news"])
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+        yield await speak("There was an error getting the news.")
+        return
+
+    for part in assistant.news_parts(data):
+        yield await speak(part)
+
+
+async def process_command(app, request_text):
+    """Process the command and return the response."""
+    if not request_text:
+        return "Sorry, I didn't catch that. Could you please repeat?"
+
+    try:
+        match = match_intent(request_text.lower(), assistant.handlers)
+        if match is None:
+            return await speak("I'm not sure how to help with that. Can you try something else?")
+
+        if match.intent == "weather":
+            city = assistant.city_from(match)
+            if city:
+                return await get_weather(app["weather"], city)
+            return await speak("I couldn't get the city name.")
+
+        if match.intent == "news":
+            return await get_news(app["news"])
+
+        # The remaining handlers do no network I/O; run them off the loop
+        # because they may still block on launching apps or the browser
+        return await asyncio.to_thread(assistant.handlers[match.intent], match)
+
+    except Exception as e:
+        print(f"Error processing command: {e}")
+        return await speak("Sorry, I encountered an error processing your request.")
+
+
+def wants_audio(form):
+    """Whether the client asked for synthesized audio, as the Flask handlers decide it."""
+    return assistant.SPEECH_OUTPUT == "client" or bool(form.get("audio"))
+
+
+async def home(request):
+    return web.FileResponse(TEMPLATE_PATH)
+
+
+async def handle_command(request):
+    form = await request.post()
+    command_type = form.get("type", "text")
+    command_text = form.get("command", "").strip()
+
+    if command_type == "voice":
+        command_text = await asyncio.to_thread(assistant.recognize_speech)
+
+    if command_text:
+        try:
+            response = await asyncio.wait_for(
+                process_command(request.app, command_text), COMMAND_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return web.json_response({"response": "The assistant is taking too long to respond."})
+        payload = {"response": response}
+        if wants_audio(form):
+            payload["audio"] = await asyncio.to_thread(assistant.synthesize_audio, response)
+        return web.json_response(payload)
+
+    return web.json_response({"response": "No command received"})
+
+
+async def handle_command_stream(request):
+    """Same contract as /process_command, but answers as server-sent events."""
+    form = await request.post()
+    command_type = form.get("type", "text")
+    command_text = form.get("command", "").strip()
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    if command_type == "voice":
+        command_text = await asyncio.to_thread(assistant.recognize_speech)
+
+    if not command_text:
+        await response.write(assistant.sse_event({"text": "No command received"}).encode())
+    else:
+        audio = wants_audio(form)
+        async for part in stream_command(request.app, command_text):
+            payload = {"text": part}
+            if audio:
+                payload["audio"] = await asyncio.to_thread(assistant.synthesize_audio, part)
+            await response.write(assistant.sse_event(payload).encode())
+    await response.write(assistant.sse_event({}, event="done").encode())
+    return response
+
+
+async def open_http_session(app):
+    app["http"] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0, limit_per_host=200, keepalive_timeout=30),
+        timeout=UPSTREAM_TIMEOUT,
+    )
+    app["weather"] = AsyncWeatherService(assistant.API_KEY, assistant.BASE_URL, lambda: app["http"])
+    app["news"] = AsyncNewsPrefetcher(
+        assistant.NEWS_API_KEY, assistant.NEWS_URL, session_factory=lambda: app["http"]
+    )
+    if assistant.NEWS_API_KEY:
+        app["news"].watch(country=assistant.NEWS_COUNTRY)
+
+
+async def close_http_session(app):
+    await app["news"].stop()
+    await app["http"].close()
+
+
+def create_app():
+    """Build the asyncio web application."""
+    app = web.Application()
+    app.router.add_get("/", home)
+    app.router.add_post("/process_command", handle_command)
+    app.router.add_post("/process_command_stream", handle_command_stream)
+    app.on_startup.append(open_http_session)
+    app.on_cleanup.append(close_http_session)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=int(os.getenv("PORT", "5000")))
@@ -1,7 +1,6 @@
 from dotenv import load_dotenv
 import os
 import pyttsx3
-import speech_recognition as sr
 import random
 import webbrowser
 import datetime
@@ -9,12 +8,15 @@ import os
 import subprocess
 import smtplib
 import ctypes
-import requests
 import pyautogui  # For simulating keyboard typing
-import whisper
-import tempfile
-import sounddevice as sd
-import scipy.io.wavfile
+import threading
+import re
+from intents import match_intent
+from weather_service import shared_weather_service
+from news_service import shared_news_prefetcher
+from tiered_recognizer import shared_tiered_recognizer
+from model_registry import VOSK_MODEL_PATH, models
+from whisper_dictation import WhisperDictation
 
 
 
@@ -40,21 +42,19 @@ def speak(audio):
 
 def command():
     """Capture voice command from user."""
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening...")
-        r.adjust_for_ambient_noise(source)
-        try:
-            audio = r.listen(source, timeout=5)
-            content = r.recognize_google(audio, language="en-in")
-            print("You said:", content)
-            return content.lower()
-        except sr.UnknownValueError:
-            print("Sorry, I couldn't understand that.")
-            return ""
-        except sr.WaitTimeoutError:
-            print("No speech detected, try again.")
-            return ""
+    # Vosk answers locally; Google is only asked when Vosk is unsure or missing
+    print("Listening...")
+    result = shared_tiered_recognizer().listen(
+        timeout=5, on_partial=lambda partial: print("...Listening:", partial, end="\r")
+    )
+    if result is None:
+        print("No speech detected, try again.")
+        return ""
+    if not result.text:
+        print("Sorry, I couldn't understand that.")
+        return ""
+    print("You said:", result.text)
+    return result.text.lower()
 
 
 def search_web(query, platform):
@@ -116,9 +116,7 @@ def change_volume(action):
 def get_weather(city):
     """Fetches weather data for a given city."""
     try:
-        params = {"q": city, "appid": API_KEY, "units": "metric"}
-        response = requests.get(BASE_URL, params=params)
-        data = response.json()
+        data = shared_weather_service().get(city)
 
         print("API Response:", data)  # Debugging line to check API response
 
@@ -190,34 +188,46 @@ def dictate_to_file(filename="dictation.txt"):
             elif spoken_text:
                 file.write(spoken_text + "\n")
 
-# def dictate_with_whisper(filename="whisper_dictation.txt", duration=30):
-#     """Records audio for a given duration and transcribes using Whisper."""
-#     speak(f"Start speaking. I will record your voice for {duration} seconds.")
-    
-#     # Record audio
-#     fs = 16000  # Sample rate
-#     speak("Recording now...")
-#     recording = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='int16')
-#     sd.wait()
-#     speak("Recording complete. Transcribing now...")
-
-#     with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmpfile:
-#         scipy.io.wavfile.write(tmpfile.name, fs, recording)
-#         audio_path = tmpfile.name
-
-#     try:
-#         model = whisper.load_model("medium")
-#         result = model.transcribe(audio_path)
-#         text = result["text"]
-
-#         with open(filename, "a", encoding="utf-8") as f:
-#             f.write(text + "\n")
+def dictate_with_whisper(filename="whisper_dictation.txt", max_duration=600):
+    """Transcribe long-form dictation with Whisper while you speak, until 'stop dictation'."""
+    speak("Start speaking. I will write everything you say into a file. Say 'stop dictation' to finish.")
+    stop_words = ["stop", "dictation"]
+    finished = threading.Event()
+    written = 0
+
+    with open(filename, "a", encoding="utf-8") as f:
+        def write_committed(text):
+            nonlocal written
+            if finished.is_set():
+                return
+            print(text, end="", flush=True)
+            words = dictation.words
+            spoken = [re.sub(r"[^\w']", "", word.text).lower() for word in words]
+            for i in range(written, len(spoken) - len(stop_words) + 1):
+                if spoken[i:i + len(stop_words)] == stop_words:
+                    words = words[:i]
+                    finished.set()
+                    break
+            else:
+                # The newest word is held back in case it starts the stop phrase
+                words = words[:len(words) - len(stop_words) + 1]
+            f.write("".join(word.text for word in words[written:]))
+            f.flush()
+            written = max(written, len(words))
 
-#         print("Transcribed Text:", text)
-#         speak("Transcription complete. The text has been saved.")
-#     except Exception as e:
-#         print("Error with Whisper transcription:", e)
-#         speak("Sorry, there was a problem with transcription.")
+        try:
+            dictation = WhisperDictation(on_text=write_committed)
+            dictation.start()
+            finished.wait(max_duration)
+            dictation.stop()
+            if not finished.is_set():
+                f.write("".join(word.text for word in dictation.words[written:]))
+            f.write("\n")
+            print()
+            speak("Dictation stopped. Your words have been saved.")
+        except Exception as e:
+            print("Error with Whisper transcription:", e)
+            speak("Sorry, there was a problem with transcription.")
 
 # # LibreTranslate base URL
 # LIBRETRANSLATE_URL = "https://libretranslate.com/translate"
@@ -258,10 +268,7 @@ def set_reminder():
 def get_news():
     """Fetch top news headlines using News API."""
     try:
-        url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}"
-        print("Fetching news from:", url)  # Debug line
-        response = requests.get(url)
-        data = response.json()
+        data = shared_news_prefetcher().get(country="us")
 
         print("API Response Status:", data.get("status"))  # Debug
         if data["status"] != "ok":
@@ -286,6 +293,116 @@ def get_news():
         speak("There was an error getting the news.")
 
 
+def play_music():
+    """Open a random song on YouTube."""
+    speak("Playing Music!")
+    songs = [
+        "https://www.youtube.com/watch?v=1G4isv_Fylg",
+        "https://www.youtube.com/watch?v=pElk1ShPrcE",
+        "https://www.youtube.com/watch?v=1cDoRqPnCXU",
+    ]
+    webbrowser.open(random.choice(songs))
+
+
+def search_for(search_query, platform):
+    """Search the platform unless the query is empty."""
+    if search_query:
+        search_web(search_query, platform)
+
+
+def ask_weather():
+    """Ask for a city and speak its weather."""
+    speak("Which city's weather would you like to know?")
+    city = command()
+    if city:
+        get_weather(city)
+    else:
+        speak("I couldn't get the city name.")
+
+
+def compose_email():
+    """Ask for recipient, subject and message, then send the email."""
+    speak("To whom should I send the email?")
+    recipient_name = command()
+
+    to_email = email_contacts.get(recipient_name)
+    if not to_email:
+        speak("I couldn't find that contact. Please try again.")
+        return
+
+    speak("What should be the subject?")
+    subject = command()
+    if not subject:
+        speak("Subject not recognized.")
+        return
+
+    speak("What is the message?")
+    message = command()
+    if not message:
+        speak("Message not recognized.")
+        return
+
+    send_email(to_email, subject, message)
+
+
+# def voice_translate():
+#     speak("What do you want to translate?")
+#     sentence = command()
+#     if not sentence:
+#         speak("I didn't catch that.")
+#         return
+
+#     speak("Which language do you want to translate to?")
+#     target_lang = command()
+
+#     lang_map = {
+#         "hindi": "hi",
+#         "marathi": "mr",
+#         "gujarati": "gu",
+#         "tamil": "ta",
+#         "telugu": "te",
+#         "bengali": "bn",
+#         "kannada": "kn",
+#         "english": "en",
+#         "urdu": "ur",
+#         "malayalam": "ml",
+#     }
+
+#     lang_code = lang_map.get(target_lang.lower())
+#     if not lang_code:
+#         speak("Sorry, I don't support that language yet.")
+#     else:
+#         translated = translate_text(sentence, source_lang="en", target_lang=lang_code)
+#         print("Translation:", translated)
+#         speak(f"The translated sentence is: {translated}")
+
+
+# Intent handlers, routed through the shared matcher in intents.py
+handlers = {
+    "greeting": lambda match: speak("Welcome! How can I assist you?"),
+    "play_music": lambda match: play_music(),
+    "time": lambda match: speak("Current time is " + datetime.datetime.now().strftime("%H:%M")),
+    "date": lambda match: speak("Today's date is " + datetime.datetime.now().strftime("%d-%m-%Y")),
+    "search_google": lambda match: search_for(match.remainder, "google"),
+    "search_youtube": lambda match: search_for(match.remainder, "youtube"),
+    "search_maps": lambda match: search_for(match.remainder, "maps"),
+    "open": lambda match: open_application(match.remainder),
+    "volume_up": lambda match: change_volume("increase"),
+    "volume_down": lambda match: change_volume("decrease"),
+    "volume_mute": lambda match: change_volume("mute"),
+    "volume_unmute": lambda match: change_volume("unmute"),
+    "weather": lambda match: ask_weather(),
+    "send_email": lambda match: compose_email(),
+    "dictation": lambda match: dictate_to_file(),
+    "whisper_dictation": lambda match: dictate_with_whisper(),
+    # "translate": lambda match: voice_translate(),
+    "set_alarm": lambda match: set_alarm(),
+    "set_reminder": lambda match: set_reminder(),
+    "news": lambda match: get_news(),
+    "exit": lambda match: speak("Goodbye! See you soon."),
+}
+
+
 def main_process():
     """Main function to process commands."""
     while True:
@@ -294,144 +411,18 @@ def main_process():
         if not request:
             continue  # Skip empty commands
 
-        if "hello" in request or "hi" in request or "hey" in request:
-            speak("Welcome! How can I assist you?")
-
-        elif (
-            "play music" in request
-            or "play song" in request
-            or "play a song" in request
-        ):
-            speak("Playing Music!")
-            songs = [
-                "https://www.youtube.com/watch?v=1G4isv_Fylg",
-                "https://www.youtube.com/watch?v=pElk1ShPrcE",
-                "https://www.youtube.com/watch?v=1cDoRqPnCXU",
-            ]
-            webbrowser.open(random.choice(songs))
-
-        elif "time" in request:
-            now_time = datetime.datetime.now().strftime("%H:%M")
-            speak("Current time is " + now_time)
-
-        elif "date" in request:
-            now_date = datetime.datetime.now().strftime("%d-%m-%Y")
-            speak("Today's date is " + now_date)
-
-        elif "search google for" in request:
-            search_query = request.replace("search google for", "").strip()
-            if search_query:
-                search_web(search_query, "google")
-
-        elif "search youtube for" in request:
-            search_query = request.replace("search youtube for", "").strip()
-            if search_query:
-                search_web(search_query, "youtube")
-
-        elif "search maps for" in request or "search google maps for" in request:
-            search_query = (
-                request.replace("search maps for", "")
-                .replace("search google maps for", "")
-                .strip()
-            )
-            if search_query:
-                search_web(search_query, "maps")
-
-        elif "open" in request:
-            app_name = request.replace("open", "").strip()
-            open_application(app_name)
-
-        elif "increase volume" in request:
-            change_volume("increase")
-
-        elif "decrease volume" in request:
-            change_volume("decrease")
+        match = match_intent(request, handlers)
+        if not match:
+            continue
 
-        elif "mute volume" in request:
-            change_volume("mute")
-
-        elif "unmute volume" in request:
-            change_volume("unmute")
-
-        elif "weather" in request or "what's the weather" in request:
-            speak("Which city's weather would you like to know?")
-            city = command()
-            if city:
-                get_weather(city)
-            else:
-                speak("I couldn't get the city name.")
-
-        elif "send email" in request:
-            speak("To whom should I send the email?")
-            recipient_name = command()
-
-            to_email = email_contacts.get(recipient_name)
-            if not to_email:
-                speak("I couldn't find that contact. Please try again.")
-                continue
-
-            speak("What should be the subject?")
-            subject = command()
-            if not subject:
-                speak("Subject not recognized.")
-                continue
-
-            speak("What is the message?")
-            message = command()
-            if not message:
-                speak("Message not recognized.")
-                continue
-
-            send_email(to_email, subject, message)
-
-        elif "start dictation" in request or "dictate" in request:
-            dictate_to_file()
-
-        # elif "translate" in request:
-        #     speak("What do you want to translate?")
-        #     sentence = command()
-        #     if not sentence:
-        #         speak("I didn't catch that.")
-        #         return
-
-        #     speak("Which language do you want to translate to?")
-        #     target_lang = command()
-
-        #     lang_map = {
-        #         "hindi": "hi",
-        #         "marathi": "mr",
-        #         "gujarati": "gu",
-        #         "tamil": "ta",
-        #         "telugu": "te",
-        #         "bengali": "bn",
-        #         "kannada": "kn",
-        #         "english": "en",
-        #         "urdu": "ur",
-        #         "malayalam": "ml",
-        #     }
-
-        #     lang_code = lang_map.get(target_lang.lower())
-        #     if not lang_code:
-        #         speak("Sorry, I don't support that language yet.")
-        #     else:
-        #         translated = translate_text(sentence, source_lang="en", target_lang=lang_code)
-        #         print("Translation:", translated)
-        #         speak(f"The translated sentence is: {translated}")
-        elif "set alarm" in request or "create alarm" in request:
-            set_alarm()
-
-        elif "set reminder" in request or "create reminder" in request:
-            set_reminder()
-
-        elif (
-            "news" in request or "headlines" in request or "what's the news" in request
-        ):
-            get_news()
-
-        elif "exit" in request or "stop" in request or "bye" in request:
-            speak("Goodbye! See you soon.")
+        handlers[match.intent](match)
+        if match.intent == "exit":
             break
 
 
 if __name__ == "__main__":
+    # Load the offline model while the first prompt is being set up
+    models.warm_up([("vosk", VOSK_MODEL_PATH)])
+    if NEWS_API_KEY:
+        shared_news_prefetcher().watch(country="us")
     main_process()
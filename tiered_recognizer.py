@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import speech_recognition as sr
+
+from audio_capture import SAMPLE_WIDTH, shared_microphone
+from recognition_race import Engine, sr_engine
+from vosk_recognizer import StreamingRecognizer, shared_recognizer
+
+# Local results below this mean per-word confidence are sent to the cloud tier
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.7"))
+# speech_recognition engine used as the cloud tier; the language applies to Google
+CLOUD_ENGINE = os.getenv("CLOUD_ENGINE", "google")
+CLOUD_LANGUAGE = os.getenv("CLOUD_LANGUAGE", "en-in")
+CLOUD_TIMEOUT = float(os.getenv("CLOUD_TIMEOUT", "5"))
+# After CLOUD_FAILURE_THRESHOLD failures in a row the cloud tier is skipped
+# for CLOUD_RETRY_AFTER seconds, then a single trial call decides whether to resume
+CLOUD_FAILURE_THRESHOLD = int(os.getenv("CLOUD_FAILURE_THRESHOLD", "3"))
+CLOUD_RETRY_AFTER = float(os.getenv("CLOUD_RETRY_AFTER", "60"))
+
+LOCAL = "local"
+CLOUD = "cloud"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing service until retry_after seconds have passed."""
+
+    def __init__(self, failure_threshold: int = CLOUD_FAILURE_THRESHOLD, retry_after: float = CLOUD_RETRY_AFTER,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.retry_after = retry_after
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go through; only one trial call is let through when half-open."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.retry_after:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) or type(error).__name__
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "trips": self.trips,
+                    "last_error": self.last_error}
+
+
+@dataclass
+class TieredResult:
+    # "" when speech was heard but neither tier understood it
+    text: str
+    confidence: Optional[float]
+    tier: Optional[str]
+    # Seconds spent after the local result, i.e. waiting on the cloud tier
+    latency: float
+
+
+class TieredRecognizer:
+    """Local-first speech recognition with a cloud engine as the fallback tier.
+
+    Each utterance is decoded by the local Vosk recognizer, and is sent to
+    the cloud engine only when the local confidence is below the threshold.
+    The cloud tier sits behind a circuit breaker, so while it is failing
+    (offline, quota exhausted) commands are answered locally without
+    waiting on the network. Without a local model every utterance goes to
+    the cloud.
+    """
+
+    def __init__(self, local: Optional[StreamingRecognizer], cloud: Optional[Engine],
+                 threshold: float = LOCAL_CONFIDENCE_THRESHOLD, breaker: Optional[CircuitBreaker] = None,
+                 microphone_factory=shared_microphone):
+        self.local = local
+        self.cloud = cloud
+        self.threshold = threshold
+        self.breaker = breaker or CircuitBreaker()
+        self.microphone_factory = microphone_factory
+        self._lock = threading.Lock()
+        self.counters = {
+            "utterances": 0,
+            "no_speech": 0,
+            "local_answers": 0,
+            "cloud_answers": 0,
+            "escalations": 0,
+            # Low-confidence local results kept because the cloud could not help
+            "local_fallbacks": 0,
+            "cloud_skipped": 0,
+            "cloud_failures": 0,
+            "not_understood": 0,
+        }
+
+    def listen(self, timeout: float = 5, phrase_time_limit: float = 15,
+               on_partial: Optional[Callable[[str], None]] = None) -> Optional[TieredResult]:
+        """Recognize the next utterance; None if no speech starts within timeout seconds."""
+        if self.local is not None:
+            result = self.local.listen_result(timeout, phrase_time_limit, on_partial)
+            if result is None:
+                self._count("no_speech")
+                return None
+            started = time.perf_counter()
+            self._count("utterances")
+            if result.confidence is None or result.confidence >= self.threshold:
+                self._count("local_answers")
+                return TieredResult(result.text, result.confidence, LOCAL, 0.0)
+            return self._escalate(result.audio, self.local.sample_rate, started,
+                                  TieredResult(result.text, result.confidence, LOCAL, 0.0))
+
+        utterance = self.microphone_factory().listen(timeout=timeout)
+        if utterance is None:
+            self._count("no_speech")
+            return None
+        self._count("utterances")
+        return self._escalate(utterance.audio, utterance.sample_rate, time.perf_counter(), None)
+
+    def _escalate(self, audio: bytes, sample_rate: int, started: float,
+                  fallback: Optional[TieredResult]) -> TieredResult:
+        if self.cloud is None or not self.breaker.allow():
+            self._count("cloud_skipped")
+            return self._fall_back(fallback, started)
+
+        self._count("escalations")
+        try:
+            text, confidence = self.cloud.recognize(sr.AudioData(audio, sample_rate, SAMPLE_WIDTH))
+        except sr.UnknownValueError:
+            # The service answered; it just heard nothing it could transcribe
+            self.breaker.success()
+            return self._fall_back(fallback, started)
+        except Exception as e:
+            print(f"Cloud recognition failed: {e}")
+            self.breaker.failure(e)
+            self._count("cloud_failures")
+            return self._fall_back(fallback, started)
+
+        self.breaker.success()
+        if not text:
+            return self._fall_back(fallback, started)
+        self._count("cloud_answers")
+        return TieredResult(text, confidence, CLOUD, time.perf_counter() - started)
+
+    def _fall_back(self, fallback: Optional[TieredResult], started: float) -> TieredResult:
+        if fallback is None:
+            self._count("not_understood")
+            return TieredResult("", None, None, time.perf_counter() - started)
+        self._count("local_fallbacks")
+        fallback.latency = time.perf_counter() - started
+        return fallback
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-tier answer counts, the local answer rate and the cloud breaker state."""
+        with self._lock:
+            counters = dict(self.counters)
+        answered = counters["local_answers"] + counters["local_fallbacks"] + counters["cloud_answers"]
+        return {
+            **counters,
+            "local_rate": round((answered - counters["cloud_answers"]) / answered, 3) if answered else None,
+            "local_available": self.local is not None,
+            # Local results decoded by the command grammar vs. left to the open vocabulary
+            "grammar": {"hits": self.local.grammar_hits, "misses": self.local.grammar_misses}
+            if self.local is not None else None,
+            "preprocess": self.local.preprocessor.stats()
+            if self.local is not None and self.local.preprocessor is not None else None,
+            "cloud": self.breaker.stats(),
+        }
+
+
+_shared_tiered: Optional[TieredRecognizer] = None
+_shared_tiered_lock = threading.Lock()
+
+
+def shared_tiered_recognizer() -> TieredRecognizer:
+    """Return the process-wide tiered recognizer over the shared Vosk recognizer."""
+    global _shared_tiered
+    with _shared_tiered_lock:
+        if _shared_tiered is None:
+            options = {"language": CLOUD_LANGUAGE} if CLOUD_ENGINE == "google" else {}
+            cloud = sr_engine(CLOUD_ENGINE, timeout=CLOUD_TIMEOUT, **options)
+            _shared_tiered = TieredRecognizer(shared_recognizer(), cloud)
+        return _shared_tiered
+
+
+def current_tiered_recognizer() -> Optional[TieredRecognizer]:
+    """Return the shared tiered recognizer if something has created it, without creating it."""
+    with _shared_tiered_lock:
+        return _shared_tiered
@@ -0,0 +1,180 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Disk hits record their access time in memory; it is written to SQLite in
+# one statement once this many are pending, or with the next insert
+TOUCH_BATCH_SIZE = 64
+
+
+class TranslationCache:
+    """Two-tier translation cache: an in-memory LRU in front of a SQLite store.
+
+    Entries are keyed by a hash of (source, target, text), expire after ttl
+    seconds and are evicted least-recently-used once either tier is full.
+    get_memory() never touches the disk; get_many() and put_many() do, and
+    async callers run them in an executor.
+    """
+
+    def __init__(self, db_path: str = "translations.db", memory_size: int = 1024,
+                 disk_size: int = 50000, ttl: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # key -> access time not yet written to disk
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY, source TEXT, target TEXT, translated TEXT,"
+            " created_at REAL, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON translations (accessed_at)")
+        self._db.commit()
+        # Kept up to date on every insert and delete, so the table is counted only once
+        (self._disk_entries,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+
+    @staticmethod
+    def make_key(text: str, source: str, target: str) -> str:
+        """Hash the source language, target language and text into a cache key."""
+        return hashlib.sha256(f"{source}\0{target}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        """Return the cached translation, or None on a miss or an expired entry."""
+        return self.get_many([text], source, target).get(text)
+
+    def get_memory(self, text: str, source: str, target: str) -> Optional[str]:
+        """Return the translation if it is in the memory tier; never blocks on the disk."""
+        with self._lock:
+            translated = self._memory_get(self.make_key(text, source, target), time.time())
+            if translated is not None:
+                self.hits += 1
+            return translated
+
+    def get_many(self, texts: Iterable[str], source: str, target: str) -> Dict[str, str]:
+        """Return {text: translation} for the cached texts; memory misses are looked up in one query."""
+        now = time.time()
+        found: Dict[str, str] = {}
+        with self._lock:
+            pending: Dict[str, str] = {}
+            for text in texts:
+                key = self.make_key(text, source, target)
+                translated = self._memory_get(key, now)
+                if translated is not None:
+                    found[text] = translated
+                    self.hits += 1
+                else:
+                    pending[key] = text
+            if not pending:
+                return found
+
+            rows = self._db.execute(
+                f"SELECT key, translated, created_at FROM translations WHERE key IN ({','.join('?' * len(pending))})",
+                list(pending),
+            ).fetchall()
+            expired = []
+            for key, translated, created_at in rows:
+                if now - created_at >= self.ttl:
+                    expired.append((key,))
+                    continue
+                self._touched[key] = now
+                self._remember(key, translated, created_at)
+                found[pending.pop(key)] = translated
+                self.hits += 1
+                self.disk_hits += 1
+            self.misses += len(pending)
+            if expired:
+                self._disk_entries -= self._db.executemany(
+                    "DELETE FROM translations WHERE key = ?", expired).rowcount
+            if expired or len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touched()
+                self._db.commit()
+            return found
+
+    def put(self, text: str, source: str, target: str, translated: str):
+        """Store a translation in both tiers."""
+        self.put_many([(text, translated)], source, target)
+
+    def put_many(self, translations: List[Tuple[str, str]], source: str, target: str):
+        """Store (text, translation) pairs in both tiers with one commit."""
+        if not translations:
+            return
+        now = time.time()
+        rows = [(self.make_key(text, source, target), source, target, translated, now, now)
+                for text, translated in translations]
+        with self._lock:
+            for key, _, _, translated, _, _ in rows:
+                self._remember(key, translated, now)
+            keys = [row[0] for row in rows]
+            existing = {key for (key,) in self._db.execute(
+                f"SELECT key FROM translations WHERE key IN ({','.join('?' * len(keys))})", keys)}
+            self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._disk_entries += len(set(keys) - existing)
+            self._flush_touched()
+            self._evict_disk(now)
+            self._db.commit()
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        translated, created_at = entry
+        if now - created_at < self.ttl:
+            self._memory.move_to_end(key)
+            return translated
+        del self._memory[key]
+        return None
+
+    def _remember(self, key: str, translated: str, created_at: float):
+        self._memory[key] = (translated, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE translations SET accessed_at = ? WHERE key = ?",
+                                 [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict_disk(self, now: float):
+        # Expired rows are also dropped when read, so only purge them when space is needed
+        if self._disk_entries <= self.disk_size:
+            return
+        self._disk_entries -= self._db.execute(
+            "DELETE FROM translations WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        if self._disk_entries > self.disk_size:
+            self._disk_entries -= self._db.execute(
+                "DELETE FROM translations WHERE key IN ("
+                " SELECT key FROM translations ORDER BY accessed_at LIMIT ?)",
+                (self._disk_entries - self.disk_size,),
+            ).rowcount
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM translations")
+            self._db.commit()
+            self._disk_entries = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the size of each tier."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries,
+            }
@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pyttsx3
+
+# Lower numbers are spoken first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# What to do when the queue is full
+DROP_NEW = "drop_new"  # reject the incoming utterance
+DROP_OLDEST = "drop_oldest"  # evict the oldest utterance of the lowest priority
+COALESCE = "coalesce"  # append the text to the newest queued utterance, else drop_oldest
+
+
+def create_engine(rate: int = 175):
+    """Initialize pyttsx3 with the assistant's default voice and rate."""
+    engine = pyttsx3.init()
+    voices = engine.getProperty("voices")
+    engine.setProperty("voice", voices[0].id)
+    engine.setProperty("rate", rate)
+    return engine
+
+
+@dataclass(order=True)
+class SpeechJob:
+    priority: int
+    sequence: int
+    text: str = field(compare=False)
+    # Set for synthesize() jobs: the WAV bytes are delivered here instead of played
+    result: Optional[Future] = field(default=None, compare=False)
+
+
+class SpeechOutput:
+    """Owns the TTS engine on a single thread fed by a bounded priority queue.
+
+    say() returns as soon as the text is queued, so callers such as HTTP
+    handlers never wait for the speakers. synthesize() renders text to WAV
+    bytes on the same thread for callers that play audio on the client.
+    """
+
+    def __init__(self, engine_factory: Callable = create_engine, max_queue: int = 16,
+                 policy: str = DROP_OLDEST, enabled: bool = True):
+        if policy not in (DROP_NEW, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.engine_factory = engine_factory
+        self.max_queue = max_queue
+        self.policy = policy
+        self.enabled = enabled
+        self._queue: List[SpeechJob] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {"spoken": 0, "synthesized": 0, "dropped": 0, "coalesced": 0, "errors": 0}
+
+    def start(self):
+        """Start the TTS thread if it is not already running."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="tts-output", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the TTS thread after the utterance in progress.
+
+        Queued synthesize() jobs fail instead of waiting forever; queued
+        say() text stays queued for the next start().
+        """
+        with self._condition:
+            self._running = False
+            pending = [job for job in self._queue if job.result is not None]
+            if pending:
+                self._queue = [job for job in self._queue if job.result is None]
+                heapq.heapify(self._queue)
+            self._condition.notify_all()
+        for job in pending:
+            job.result.set_exception(RuntimeError("Speech output stopped"))
+        if self._thread:
+            self._thread.join(timeout)
+
+    def say(self, text: str, priority: int = PRIORITY_NORMAL) -> bool:
+        """Queue text to be spoken locally; returns False if it was dropped."""
+        if not self.enabled or not text:
+            return False
+        self.start()
+        return self._enqueue(SpeechJob(priority, next(self._sequence), text))
+
+    def synthesize(self, text: str, priority: int = PRIORITY_NORMAL) -> Future:
+        """Queue text to be rendered to WAV bytes; the future holds the audio."""
+        result = Future()
+        self.start()
+        if not self._enqueue(SpeechJob(priority, next(self._sequence), text, result)):
+            result.set_exception(RuntimeError("Speech queue is full"))
+        return result
+
+    def _enqueue(self, job: SpeechJob) -> bool:
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                if self.policy == COALESCE and job.result is None:
+                    newest = max((queued for queued in self._queue if queued.result is None),
+                                 key=lambda queued: queued.sequence, default=None)
+                    if newest is not None:
+                        newest.text = f"{newest.text} {job.text}"
+                        newest.priority = min(newest.priority, job.priority)
+                        heapq.heapify(self._queue)
+                        self.counters["coalesced"] += 1
+                        return True
+                if self.policy == DROP_NEW:
+                    self.counters["dropped"] += 1
+                    return False
+                # DROP_OLDEST: evict the oldest of the least urgent utterances
+                victim = max(self._queue, key=lambda queued: (queued.priority, -queued.sequence))
+                if victim.priority < job.priority:
+                    self.counters["dropped"] += 1
+                    return False
+                self._queue.remove(victim)
+                heapq.heapify(self._queue)
+                if victim.result is not None:
+                    victim.result.set_exception(RuntimeError("Dropped from the speech queue"))
+                self.counters["dropped"] += 1
+            heapq.heappush(self._queue, job)
+            self._condition.notify()
+            return True
+
+    def _run(self):
+        # pyttsx3 engines must be driven from the thread that created them
+        try:
+            engine = self.engine_factory()
+        except Exception as e:
+            print(f"Error initializing text-to-speech engine: {e}")
+            engine = None
+
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                job = heapq.heappop(self._queue)
+
+            if job.result is not None:
+                self._synthesize(engine, job)
+            else:
+                self._speak(engine, job)
+
+    def _speak(self, engine, job: SpeechJob):
+        if engine is None:
+            return
+        try:
+            engine.say(job.text)
+            engine.runAndWait()
+            self._count("spoken")
+        except Exception as e:
+            self._count("errors")
+            print(f"Error in speech synthesis: {e}")
+
+    def _synthesize(self, engine, job: SpeechJob):
+        if engine is None:
+            job.result.set_exception(RuntimeError("Text-to-speech engine is not available"))
+            return
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            engine.save_to_file(job.text, path)
+            engine.runAndWait()
+            with open(path, "rb") as f:
+                job.result.set_result(f.read())
+            self._count("synthesized")
+        except Exception as e:
+            self._count("errors")
+            job.result.set_exception(e)
+        finally:
+            os.unlink(path)
+
+    def _count(self, name: str):
+        with self._condition:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and spoken/synthesized/dropped counters."""
+        with self._condition:
+            return {**self.counters, "queued": len(self._queue)}
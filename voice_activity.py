@@ -0,0 +1,219 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # Optional; the energy detector needs nothing extra
+    webrtcvad = None
+
+SAMPLE_WIDTH = 2  # 16-bit mono PCM
+
+# Frames of FRAME_MS are classified one at a time. START_MS of speech opens an
+# utterance, HANGOVER_MS of silence closes it, and PRE_ROLL_MS of audio from
+# before the start is kept so the first syllable is not clipped.
+FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+START_MS = int(os.getenv("VAD_START_MS", "90"))
+HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "200"))
+PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))
+MAX_UTTERANCE_S = float(os.getenv("VAD_MAX_UTTERANCE_S", "15"))
+# "energy", or "webrtc" when the webrtcvad package is installed
+VAD_BACKEND = os.getenv("VAD_BACKEND", "energy")
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+
+# Energy detector: a frame is speech when its RMS is SPEECH_RATIO times the
+# tracked noise floor (and at least MIN_SPEECH_RMS), unless it crosses zero
+# so often that it is broadband noise such as a fan or hiss
+SPEECH_RATIO = 3.0
+MIN_SPEECH_RMS = 50.0
+MAX_SPEECH_ZCR = 0.5
+NOISE_FLOOR_ALPHA = 0.05
+
+# Events returned by VoiceActivityDetector.process()
+START = "start"
+SPEECH = "speech"
+END = "end"
+
+
+class NoiseFloor:
+    """Running estimate of background energy, updated from non-speech frames."""
+
+    def __init__(self, initial: float = MIN_SPEECH_RMS / SPEECH_RATIO, alpha: float = NOISE_FLOOR_ALPHA,
+                 ratio: float = SPEECH_RATIO, minimum: float = MIN_SPEECH_RMS):
+        self.level = initial
+        self.alpha = alpha
+        self.ratio = ratio
+        self.minimum = minimum
+
+    @property
+    def threshold(self) -> float:
+        return max(self.level * self.ratio, self.minimum)
+
+    def is_speech(self, rms: float) -> bool:
+        return rms >= self.threshold
+
+    def update(self, rms: float):
+        self.level += self.alpha * (rms - self.level)
+
+
+def frame_rms(frame: bytes, out: Optional[np.ndarray] = None) -> float:
+    """RMS of 16-bit PCM; out, a float32 array as long as the frame, saves allocating one."""
+    samples = np.frombuffer(frame, dtype=np.int16)
+    if not samples.size:
+        return 0.0
+    if out is None or out.size != samples.size:
+        out = np.empty(samples.size, dtype=np.float32)
+    np.copyto(out, samples)
+    return float(np.sqrt(np.dot(out, out) / samples.size))
+
+
+def zero_crossing_rate(frame: bytes, out: Optional[np.ndarray] = None) -> float:
+    """Fraction of adjacent samples that change sign; out works as in frame_rms()."""
+    samples = np.frombuffer(frame, dtype=np.int16)
+    if samples.size < 2:
+        return 0.0
+    if out is None or out.size != samples.size:
+        out = np.empty(samples.size, dtype=np.float32)
+    # With s[i] = 1 for negative samples, 0 otherwise, the sign changes are
+    # sum((s[i] - s[i+1])^2), expanded so no temporary array is needed
+    np.less(samples, 0, out=out)
+    negative = out.sum()
+    changes = 2 * negative - out[0] - out[-1] - 2 * np.dot(out[:-1], out[1:])
+    return float(changes) / (samples.size - 1)
+
+
+class FrameRing:
+    """Holds the last few frames in one preallocated buffer, overwriting the oldest."""
+
+    def __init__(self, frames: int, frame_bytes: int):
+        self.frame_bytes = frame_bytes
+        self._slots = frames
+        self._view = memoryview(bytearray(frames * frame_bytes))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, frame: bytes):
+        """Copy one frame_bytes frame into the next slot."""
+        start = self._next * self.frame_bytes
+        self._view[start:start + self.frame_bytes] = frame
+        self._next = (self._next + 1) % self._slots
+        self._count = min(self._count + 1, self._slots)
+
+    def drain(self) -> bytes:
+        """Return the held frames, oldest first, and empty the ring."""
+        first = (self._next - self._count) % self._slots
+        end = first + self._count
+        if end <= self._slots:
+            audio = self._view[first * self.frame_bytes:end * self.frame_bytes].tobytes()
+        else:
+            audio = (self._view[first * self.frame_bytes:].tobytes()
+                     + self._view[:(end - self._slots) * self.frame_bytes].tobytes())
+        self.clear()
+        return audio
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+
+class VoiceActivityDetector:
+    """Frame-by-frame speech detector and endpointer.
+
+    process() takes one frame at a time and says what to pass on to
+    recognition: START with the pre-roll, SPEECH frames (including short
+    pauses once speech resumes), and END after hangover_ms of silence or at
+    max_utterance_s. END may carry the last frames of a cut-off utterance.
+    Silence before an utterance and the trailing hangover are never passed on.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int = FRAME_MS, start_ms: int = START_MS,
+                 hangover_ms: int = HANGOVER_MS, pre_roll_ms: int = PRE_ROLL_MS,
+                 max_utterance_s: float = MAX_UTTERANCE_S, backend: str = VAD_BACKEND,
+                 aggressiveness: int = VAD_AGGRESSIVENESS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self.noise_floor = NoiseFloor()
+        self._webrtc = None
+        if backend == "webrtc":
+            if webrtcvad is None:
+                raise RuntimeError("webrtcvad is not installed")
+            if sample_rate not in (8000, 16000, 32000, 48000) or frame_ms not in (10, 20, 30):
+                raise ValueError("WebRTC VAD needs 8/16/32/48 kHz audio in 10, 20 or 30 ms frames")
+            self._webrtc = webrtcvad.Vad(aggressiveness)
+        elif backend != "energy":
+            raise ValueError(f"Unknown VAD backend: {backend}")
+        # Silent frames are copied into fixed slots rather than new objects
+        self._pre_roll = FrameRing(max(1, pre_roll_ms // frame_ms), self.frame_bytes)
+        self._held = FrameRing(self.hangover_frames, self.frame_bytes)
+        # Scratch space for measuring each frame without allocating
+        self._scratch = np.empty(self.frame_bytes // SAMPLE_WIDTH, dtype=np.float32)
+        self.in_speech = False
+        self._speech_run = 0
+        self._length = 0
+        # Frame counters, for measuring endpoint latency in audio time
+        self.frames = 0
+        self.last_speech_frame = 0
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Classify one frame, updating the noise floor from non-speech frames."""
+        rms = frame_rms(frame, self._scratch)
+        if self._webrtc is not None:
+            speech = self._webrtc.is_speech(bytes(frame), self.sample_rate)
+        else:
+            speech = self.noise_floor.is_speech(rms) and zero_crossing_rate(frame, self._scratch) < MAX_SPEECH_ZCR
+        if not speech and not self.in_speech:
+            self.noise_floor.update(rms)
+        return speech
+
+    def process(self, frame: bytes) -> Tuple[Optional[str], bytes]:
+        """Consume one frame; return the event and the audio to pass on, if any.
+
+        frame (frame_bytes long) may be a memoryview into a reused buffer: it
+        is copied into preallocated slots while held, and passed on as is
+        only while speech continues.
+        """
+        self.frames += 1
+        speech = self.is_speech(frame)
+        if speech:
+            self.last_speech_frame = self.frames
+
+        if not self.in_speech:
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run < self.start_frames:
+                return None, b""
+            self.in_speech = True
+            audio = self._pre_roll.drain()
+            self._length = len(audio) // self.frame_bytes
+            return START, audio
+
+        self._length += 1
+        if speech:
+            # A pause turned out to be mid-utterance: release it with this frame
+            audio = self._held.drain() + frame if len(self._held) else frame
+            if self._length >= self.max_frames:
+                self.reset()
+                return END, audio
+            return SPEECH, audio
+
+        self._held.append(frame)
+        if len(self._held) >= self.hangover_frames or self._length >= self.max_frames:
+            self.reset()
+            return END, b""
+        return None, b""
+
+    def reset(self):
+        """Forget the utterance in progress; the noise floor is kept."""
+        self.in_speech = False
+        self._speech_run = 0
+        self._length = 0
+        self._held.clear()
+        self._pre_roll.clear()
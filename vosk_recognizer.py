@@ -0,0 +1,459 @@
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from intents import MATCHER
+from audio_capture import SAMPLE_WIDTH, BlockRing
+from audio_frontend import AUDIO_INPUT_CHANNELS, AudioFrontEnd, input_rate_for
+from audio_preprocess import AUDIO_PREPROCESS, Preprocessor
+from model_registry import VOSK_GRAMMAR_MODEL_PATH, VOSK_MODEL_PATH as MODEL_PATH, models
+from voice_activity import END, VoiceActivityDetector
+
+try:
+    import sounddevice as sd
+    from vosk import KaldiRecognizer
+except ImportError:  # Vosk is optional; callers fall back to cloud recognition
+    sd = None
+    KaldiRecognizer = None
+
+# Rate the decoder runs at; microphones recording at other rates or with
+# more channels are converted by the audio front end
+SAMPLE_RATE = 16000
+
+# Without endpointing, 4000 frames is a quarter second of audio, so partials
+# arrive well under a second; with it, blocks match the detector's frames
+BLOCK_SIZE = 4000
+
+# Partial results are decoded at most VOSK_PARTIAL_HZ times per second of
+# audio, and only while something is listening for them; 0 turns them off
+PARTIAL_HZ = float(os.getenv("VOSK_PARTIAL_HZ", "5"))
+
+# A grammar result is used instead of the open-vocabulary one only when it is
+# a whole command phrase with at least this mean per-word confidence
+GRAMMAR_CONFIDENCE = float(os.getenv("VOSK_GRAMMAR_CONFIDENCE", "0.8"))
+# Set to 0 to decode with the open-vocabulary model alone
+VOSK_GRAMMAR = os.getenv("VOSK_GRAMMAR", "1") == "1"
+
+
+def supports_grammar(model_path: str) -> bool:
+    """True if the model has a runtime graph, so a grammar actually restricts its search."""
+    return os.path.exists(os.path.join(model_path, "graph", "HCLr.fst"))
+
+
+def mean_confidence(words: List[dict]) -> Optional[float]:
+    return sum(word["conf"] for word in words) / len(words) if words else None
+
+
+@dataclass
+class RecognitionResult:
+    text: str
+    final: bool
+    words: List[dict] = field(default_factory=list)
+    # Bumped by reset(); results from before a reset are stale for listen()
+    epoch: int = 0
+    # Final results only: mean per-word confidence and the audio that was decoded
+    confidence: Optional[float] = None
+    audio: bytes = b""
+
+
+class StreamingRecognizer:
+    """Offline speech recognition over a microphone stream that stays open.
+
+    Audio from the sounddevice callback is decoded on a worker thread. Each
+    result goes to the on_partial/on_final callbacks, to subscribe()d
+    callbacks and to every active results() generator. listen() blocks for
+    the next utterance, which is the drop-in replacement for a
+    recognize_google call per command.
+
+    Partials cost a PartialResult() decode and a JSON parse each, so they
+    are only produced every 1/partial_hz seconds of audio, only when their
+    text changed, and not at all while no callback or subscriber wants them.
+
+    With grammar (a list of command phrases), a second decoder restricted
+    to those phrases runs on the same audio. Its result replaces the
+    open-vocabulary one when it is a whole phrase decoded confidently; any
+    other speech comes back as "[unk]" from it and is rejected.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, sample_rate: int = SAMPLE_RATE,
+                 block_size: Optional[int] = None, device=None,
+                 on_partial: Optional[Callable[[str], None]] = None,
+                 on_final: Optional[Callable[[str], None]] = None, max_queue: int = 64,
+                 endpointing: bool = True, vad: Optional[VoiceActivityDetector] = None,
+                 grammar: Optional[List[str]] = None, grammar_model_path: Optional[str] = None,
+                 grammar_confidence: float = GRAMMAR_CONFIDENCE, partial_hz: float = PARTIAL_HZ,
+                 input_rate: Optional[int] = None, channels: int = AUDIO_INPUT_CHANNELS,
+                 preprocess: bool = AUDIO_PREPROCESS):
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        # Only speech reaches the decoder, and utterances are finalized as soon
+        # as the detector's hangover expires rather than by Vosk's own timeout
+        self.vad = vad or (VoiceActivityDetector(sample_rate) if endpointing else None)
+        if block_size is None:
+            block_size = self.vad.frame_bytes // 2 if self.vad else BLOCK_SIZE
+        self.block_size = block_size
+        self.device = device
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.front_end = AudioFrontEnd(input_rate or input_rate_for(device, sample_rate, channels),
+                                       sample_rate, channels)
+        # Denoising and gating before the endpointer keep noise from opening utterances
+        self.preprocessor = Preprocessor(sample_rate) if preprocess else None
+        # Device frames per callback, so each block converts to block_size frames
+        self.input_block_size = round(block_size * self.front_end.input_rate / sample_rate)
+        # max_queue blocks of audio between the callback and the decoder thread
+        self._ring = BlockRing(self.input_block_size * self.front_end.input_frame_bytes, max_queue)
+        # Blocks captured before this count belong to the audio before the last reset()
+        self._discard_before = 0
+        # (deliver, wants partials) for each subscriber
+        self._subscribers: List[Tuple[Callable[[Optional[RecognitionResult]], None], bool]] = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._recognizer = None
+        self._epoch = 0
+        self._pending_epoch = 0
+        self._last_partial = ""
+        self._last_partial_json = ""
+        self.partial_hz = partial_hz
+        self._partial_interval = int(sample_rate / partial_hz) * SAMPLE_WIDTH if partial_hz > 0 else 0
+        self._since_partial = 0
+        self.partial_decodes = 0
+        self._pending = bytearray()
+        self._utterance = bytearray()
+        # Input overflows and underflows reported by the audio device itself
+        self.device_overflows = 0
+        self.underruns = 0
+        self._accepts_buffers = True
+        self.grammar = sorted({" ".join(phrase.lower().split()) for phrase in grammar or []})
+        self.grammar_model_path = grammar_model_path or model_path
+        self.grammar_confidence = grammar_confidence
+        self._grammar_recognizer = None
+        # Grammar results from endpoints the grammar decoder found on its own
+        self._grammar_parts: List[dict] = []
+        self.grammar_hits = 0
+        self.grammar_misses = 0
+
+    def start(self):
+        """Load the model, open the microphone and start decoding."""
+        with self._lock:
+            if self._running:
+                return
+            self.load()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="vosk-recognizer", daemon=True)
+            self._thread.start()
+            try:
+                self._stream = self._open_stream()
+                self._stream.start()
+            except Exception:
+                self._running = False
+                self._thread.join()
+                raise
+
+    def load(self):
+        """Create the decoders without opening the microphone, so feed() can be called directly."""
+        if KaldiRecognizer is None:
+            raise RuntimeError("Vosk is not installed. Install it with 'pip install vosk'.")
+        self._recognizer = KaldiRecognizer(models.get("vosk", self.model_path), self.sample_rate)
+        self._recognizer.SetWords(True)
+        if self.grammar:
+            self._grammar_recognizer = self._open_grammar_recognizer()
+
+    def _open_grammar_recognizer(self):
+        if not supports_grammar(self.grammar_model_path):
+            print(f"Vosk model at {self.grammar_model_path} cannot use a grammar; "
+                  "set VOSK_GRAMMAR_MODEL_PATH to a small model to enable the command fast path")
+            return None
+        recognizer = KaldiRecognizer(models.get("vosk", self.grammar_model_path), self.sample_rate,
+                                     json.dumps(self.grammar + ["[unk]"]))
+        recognizer.SetWords(True)
+        return recognizer
+
+    def _open_stream(self):
+        return sd.RawInputStream(samplerate=self.front_end.input_rate, blocksize=self.input_block_size,
+                                 device=self.device, dtype="int16", channels=self.front_end.channels,
+                                 callback=self._callback)
+
+    def stop(self):
+        """Close the microphone and end every results() generator."""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        if self._thread is not None:
+            self._thread.join()
+        for deliver, _ in list(self._subscribers):
+            deliver(None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def overruns(self) -> int:
+        """Blocks dropped because decoding fell behind the microphone."""
+        return self._ring.overruns
+
+    def _callback(self, indata, frames, time_info, status):
+        # Runs on the audio thread: count problems rather than print, and
+        # copy the block straight into the ring without blocking
+        if status:
+            self.device_overflows += bool(status.input_overflow)
+            self.underruns += bool(status.input_underflow)
+        self._ring.write(indata)
+
+    def _run(self):
+        while self._running:
+            block = self._ring.get(timeout=0.1)
+            if block is None:
+                continue
+            try:
+                if self._ring.released < self._discard_before:
+                    continue
+                if self._pending_epoch != self._epoch:
+                    # The recognizer is only touched from this thread
+                    self._recognizer.Reset()
+                    if self._grammar_recognizer is not None:
+                        self._grammar_recognizer.Reset()
+                        self._grammar_parts.clear()
+                    self._last_partial = ""
+                    self._last_partial_json = ""
+                    self._since_partial = 0
+                    self._pending.clear()
+                    self._utterance.clear()
+                    if self.vad:
+                        self.vad.reset()
+                    self._epoch = self._pending_epoch
+                # A no-op for 16 kHz mono input, which stays a view into the ring unless preprocessed
+                audio = self.front_end.process(block)
+                if self.preprocessor is not None:
+                    audio = self.preprocessor.process(audio)
+                self.feed(audio)
+            finally:
+                self._ring.release()
+
+    def feed(self, data: bytes):
+        """Pass raw audio through the endpointer (if any) into the decoder."""
+        if self.vad is None:
+            self.accept(data)
+            return
+        if not self._pending and len(data) == self.vad.frame_bytes:
+            # Blocks are one detector frame long, so they normally go through uncopied
+            self._process_frame(data)
+            return
+        self._pending += data
+        frame_bytes = self.vad.frame_bytes
+        while len(self._pending) >= frame_bytes:
+            self._process_frame(bytes(self._pending[:frame_bytes]))
+            del self._pending[:frame_bytes]
+
+    def _process_frame(self, frame: bytes):
+        event, audio = self.vad.process(frame)
+        if audio:
+            self.accept(audio)
+        if event == END:
+            self.finish()
+
+    def accept(self, data: bytes) -> Optional[RecognitionResult]:
+        """Decode one block of 16-bit mono PCM and publish any new result."""
+        self._utterance += data
+        # The open-vocabulary decoder decides where utterances end
+        if self._grammar_recognizer is not None and self._accept_waveform(self._grammar_recognizer, data):
+            self._grammar_parts.append(json.loads(self._grammar_recognizer.Result()))
+        if self._accept_waveform(self._recognizer, data):
+            return self._final(self._recognizer.Result())
+
+        if not self._wants_partials():
+            return None
+        self._since_partial += len(data)
+        if self._since_partial < self._partial_interval:
+            return None
+        self._since_partial = 0
+        self.partial_decodes += 1
+        partial_json = self._recognizer.PartialResult()
+        # Vosk repeats the same partial for most blocks; skip parsing and publishing those
+        if partial_json == self._last_partial_json:
+            return None
+        self._last_partial_json = partial_json
+        text = json.loads(partial_json).get("partial", "")
+        if not text or text == self._last_partial:
+            return None
+        self._last_partial = text
+        if self.on_partial:
+            self.on_partial(text)
+        return self._publish(RecognitionResult(text, False, epoch=self._epoch))
+
+    def _wants_partials(self) -> bool:
+        if self._partial_interval <= 0:
+            return False
+        return self.on_partial is not None or any(partials for _, partials in self._subscribers)
+
+    def _accept_waveform(self, recognizer, data) -> bool:
+        if self._accepts_buffers:
+            try:
+                return recognizer.AcceptWaveform(data)
+            except TypeError:
+                # This Vosk build only takes bytes; copy from now on
+                self._accepts_buffers = False
+        return recognizer.AcceptWaveform(bytes(data))
+
+    def finish(self) -> Optional[RecognitionResult]:
+        """End the current utterance now and publish its final result."""
+        return self._final(self._recognizer.FinalResult())
+
+    def _final(self, result_json: str) -> Optional[RecognitionResult]:
+        result = json.loads(result_json)
+        self._last_partial = ""
+        self._last_partial_json = ""
+        self._since_partial = 0
+        audio = bytes(self._utterance)
+        self._utterance.clear()
+        text = result.get("text", "")
+        words = result.get("result", [])
+        command = self._grammar_final()
+        if command is not None:
+            text, words = command
+            self.grammar_hits += 1
+        elif self._grammar_recognizer is not None and text:
+            self.grammar_misses += 1
+        if not text:
+            return None
+        if self.on_final:
+            self.on_final(text)
+        return self._publish(RecognitionResult(text, True, words, self._epoch, mean_confidence(words), audio))
+
+    def _grammar_final(self) -> Optional[Tuple[str, List[dict]]]:
+        """Finish the grammar decoder's utterance; return it if it is an accepted command."""
+        if self._grammar_recognizer is None:
+            return None
+        parts = self._grammar_parts + [json.loads(self._grammar_recognizer.FinalResult())]
+        self._grammar_parts = []
+        text = " ".join(part["text"] for part in parts if part.get("text"))
+        if not text:
+            return None
+        words = [word for part in parts for word in part.get("result", [])]
+        # "[unk]" is never a phrase, so anything outside the grammar is rejected here
+        confidence = mean_confidence(words)
+        if text in self.grammar and confidence is not None and confidence >= self.grammar_confidence:
+            return text, words
+        return None
+
+    def _publish(self, recognized: RecognitionResult) -> RecognitionResult:
+        for deliver, partials in list(self._subscribers):
+            if recognized.final or partials:
+                deliver(recognized)
+        return recognized
+
+    def reset(self) -> int:
+        """Drop buffered audio and the utterance in progress; returns the new epoch."""
+        with self._lock:
+            self._discard_before = self._ring.written
+            self._pending_epoch += 1
+            return self._pending_epoch
+
+    def subscribe(self, callback: Callable[[Optional[RecognitionResult]], None],
+                  partials: bool = True) -> Callable[[], None]:
+        """Call callback on the decoder thread with each result, and None on stop().
+
+        With partials=False only final results are delivered, and partials
+        are not decoded for this subscriber at all. Returns a function that
+        unsubscribes.
+        """
+        subscriber = (callback, partials)
+        self._subscribers.append(subscriber)
+        return lambda: self._subscribers.remove(subscriber)
+
+    def results(self, final_only: bool = False) -> Iterator[RecognitionResult]:
+        """Yield results as they are recognized until stop() is called."""
+        results: "queue.Queue[Optional[RecognitionResult]]" = queue.Queue()
+        unsubscribe = self.subscribe(results.put, partials=not final_only)
+        try:
+            while True:
+                result = results.get()
+                if result is None:
+                    return
+                yield result
+        finally:
+            unsubscribe()
+
+    def listen(self, timeout: float = 5, phrase_time_limit: float = 15,
+               on_partial: Optional[Callable[[str], None]] = None) -> str:
+        """Return the next utterance, or "" if no speech starts within timeout seconds.
+
+        Audio buffered before the call (such as the assistant's own voice) is
+        discarded, matching a microphone opened just for this command.
+        """
+        result = self.listen_result(timeout, phrase_time_limit, on_partial)
+        return result.text if result else ""
+
+    def listen_result(self, timeout: float = 5, phrase_time_limit: float = 15,
+                      on_partial: Optional[Callable[[str], None]] = None) -> Optional[RecognitionResult]:
+        """Like listen(), but return the final result with its confidence and audio, or None."""
+        results: "queue.Queue[Optional[RecognitionResult]]" = queue.Queue()
+        # With endpointing, the detector says when speech has started, so
+        # partials are only needed if the caller shows them
+        unsubscribe = self.subscribe(results.put, partials=on_partial is not None or self.vad is None)
+        epoch = self.reset()
+        deadline = time.monotonic() + timeout
+        extended = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if extended or self.vad is None or not self.vad.in_speech:
+                        return None
+                    # Speech has started: allow the rest of the phrase to finish
+                    deadline = time.monotonic() + phrase_time_limit
+                    extended = True
+                    continue
+                try:
+                    result = results.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if result is None:
+                    return None
+                if result.epoch < epoch:
+                    continue
+                if result.final:
+                    return result
+                if on_partial:
+                    on_partial(result.text)
+                # Speech has started: allow the rest of the phrase to finish
+                deadline = max(deadline, time.monotonic() + phrase_time_limit)
+        finally:
+            unsubscribe()
+
+
+_shared_recognizer: Optional[StreamingRecognizer] = None
+_shared_recognizer_lock = threading.Lock()
+_shared_recognizer_failed = False
+
+
+def shared_recognizer() -> Optional[StreamingRecognizer]:
+    """Return the started process-wide recognizer, or None if Vosk is unavailable."""
+    global _shared_recognizer, _shared_recognizer_failed
+    with _shared_recognizer_lock:
+        if _shared_recognizer is None and not _shared_recognizer_failed:
+            # Known commands are decoded against the intent phrases first
+            recognizer = StreamingRecognizer(grammar=MATCHER.phrases() if VOSK_GRAMMAR else None,
+                                             grammar_model_path=VOSK_GRAMMAR_MODEL_PATH)
+            try:
+                recognizer.start()
+                _shared_recognizer = recognizer
+            except Exception as e:
+                print(f"Offline recognition unavailable, using Google instead: {e}")
+                _shared_recognizer_failed = True
+        return _shared_recognizer
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+# Weather for a city changes on the order of minutes: serve cached reports for
+# WEATHER_CACHE_TTL seconds, then keep serving them for up to WEATHER_STALE_TTL
+# seconds while a background refresh runs
+DEFAULT_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+DEFAULT_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", "3600"))
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_city(city: str) -> str:
+    """Reduce a spoken or typed city name to a cache key ("  New-York " -> "new york")."""
+    return " ".join(re.sub(r"[^\w\s]", " ", city).casefold().split())
+
+
+class WeatherCache:
+    """Per-city TTL cache of OpenWeatherMap responses, shared by both services."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, stale_ttl: float = DEFAULT_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[CacheKey, Tuple[Dict[str, Any], float]] = {}
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    @staticmethod
+    def key(city: str, language: str = "en") -> CacheKey:
+        return normalize_city(city), language
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Return (data, fresh); data is None when missing or too old to serve."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        data, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < self.ttl:
+            return data, True
+        if age < self.stale_ttl:
+            return data, False
+        del self._entries[key]
+        return None, False
+
+    def store(self, key: CacheKey, data: Dict[str, Any]):
+        # Only successful reports are cached; errors such as an unknown city are retried
+        if data.get("cod") == 200:
+            self._entries[key] = (data, time.time())
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "cities": len(self._entries)}
+
+
+class WeatherService(WeatherCache):
+    """Thread-safe weather lookups for the blocking front ends.
+
+    Concurrent requests for the same city share one upstream call, and stale
+    reports are returned immediately while a background thread refreshes them.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str], timeout: float = 5, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._in_flight: Dict[CacheKey, Future] = {}
+
+    def get(self, city: str, language: str = "en") -> Dict[str, Any]:
+        """Return the OpenWeatherMap response for city, from cache when possible."""
+        key = self.key(city, language)
+        with self._lock:
+            data, fresh = self.lookup(key)
+            if data is not None:
+                self.counters["hits" if fresh else "stale_hits"] += 1
+                if not fresh and key not in self._in_flight:
+                    future = self._in_flight[key] = Future()
+                    threading.Thread(
+                        target=self._fetch, args=(key, city, language, future), daemon=True
+                    ).start()
+                return data
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.counters["misses"] += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+
+        # The first caller fetches; everyone else asking for the city waits on its future
+        if owner:
+            self._fetch(key, city, language, future)
+        return future.result()
+
+    def _fetch(self, key: CacheKey, city: str, language: str, future: Future):
+        try:
+            params = {"q": city, "appid": self.api_key, "units": "metric", "lang": language}
+            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+            data = response.json()
+            with self._lock:
+                self.store(key, data)
+                self._in_flight.pop(key, None)
+            future.set_result(data)
+        except Exception as e:
+            with self._lock:
+                self.counters["errors"] += 1
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+
+
+class AsyncWeatherService(WeatherCache):
+    """Event-loop weather lookups with the same caching, coalescing and stale serving."""
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str],
+                 session_factory: Callable, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.session_factory = session_factory
+        self._in_flight: Dict[CacheKey, asyncio.Task] = {}
+
+    async def get(self, city: str, language: str = "en") -> Dict[str, Any]:
+        """Return the OpenWeatherMap response for city, from cache when possible."""
+        key = self.key(city, language)
+        data, fresh = self.lookup(key)
+        if data is not None:
+            self.counters["hits" if fresh else "stale_hits"] += 1
+            if not fresh:
+                self._start_fetch(key, city, language)
+            return data
+
+        if key in self._in_flight:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+        # shield() so one caller timing out does not cancel the shared fetch
+        return await asyncio.shield(self._start_fetch(key, city, language))
+
+    def _start_fetch(self, key: CacheKey, city: str, language: str) -> asyncio.Task:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, city, language))
+            # Background refreshes may fail with nobody awaiting them
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._in_flight[key] = task
+        return task
+
+    async def _fetch(self, key: CacheKey, city: str, language: str) -> Dict[str, Any]:
+        try:
+            params = {"q": city, "appid": self.api_key, "units": "metric", "lang": language}
+            async with self.session_factory().get(self.base_url, params=params) as response:
+                data = await response.json(content_type=None)
+            self.store(key, data)
+            return data
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+
+_shared_service: Optional[WeatherService] = None
+_shared_service_lock = threading.Lock()
+
+
+def shared_weather_service() -> WeatherService:
+    """Return the process-wide service configured from API_KEY and BASE_URL."""
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = WeatherService(os.getenv("API_KEY"), os.getenv("BASE_URL"))
+        return _shared_service
@@ -0,0 +1,281 @@
+import os
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from audio_capture import SAMPLE_WIDTH, DeviceStatus, RingBuffer, WavInputStream
+from audio_frontend import AUDIO_INPUT_CHANNELS, AudioFrontEnd, input_rate_for
+from model_registry import WHISPER_MODEL, models
+from voice_activity import MIN_SPEECH_RMS, frame_rms
+
+try:
+    import sounddevice as sd
+except ImportError:  # Only needed for a real microphone; WAV input works without it
+    sd = None
+
+# Whisper works on 16 kHz audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Every DICTATION_STEP_S of new audio, the last DICTATION_WINDOW_S (at most) is
+# transcribed. Words ending within DICTATION_HOLDBACK_S of the newest audio may
+# be cut off mid-word, so they wait for the next window, which overlaps this one.
+DICTATION_STEP_S = float(os.getenv("DICTATION_STEP_S", "2"))
+DICTATION_WINDOW_S = float(os.getenv("DICTATION_WINDOW_S", "15"))
+DICTATION_HOLDBACK_S = float(os.getenv("DICTATION_HOLDBACK_S", "1"))
+# Audio kept before the first uncommitted word, so it is decoded in context
+DICTATION_CONTEXT_S = float(os.getenv("DICTATION_CONTEXT_S", "1"))
+DICTATION_LANGUAGE = os.getenv("DICTATION_LANGUAGE", "en")
+
+
+@dataclass
+class DictatedWord:
+    text: str
+    # Seconds from the start of the stream
+    start: float
+    end: float
+    # Wall-clock time the word was committed
+    emitted_at: float
+
+
+def to_float_audio(pcm: bytes) -> np.ndarray:
+    """Convert 16-bit PCM to the float32 samples Whisper expects."""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class WhisperDictation:
+    """Long-form dictation that transcribes overlapping windows while the speaker talks.
+
+    The input callback only copies audio into a ring buffer; a worker thread
+    transcribes a window ending at the newest audio every step_s seconds,
+    passing Whisper the samples directly. Words are committed once they are
+    clear of the window's trailing edge, and each window starts just before
+    the first uncommitted word, so the overlap gives every word context
+    without transcribing it twice. Committed text goes to on_text as it is
+    recognized. The model comes from the shared registry, loaded once.
+
+    Input at any rate (input_rate, by default 16 kHz if the device supports
+    it) and channel count is converted to 16 kHz mono as it is read.
+    """
+
+    def __init__(self, model_name: str = WHISPER_MODEL, input_rate: Optional[int] = None,
+                 channels: int = AUDIO_INPUT_CHANNELS,
+                 on_text: Optional[Callable[[str], None]] = None, device=None,
+                 stream_factory: Optional[Callable] = None, step_s: float = DICTATION_STEP_S,
+                 window_s: float = DICTATION_WINDOW_S, holdback_s: float = DICTATION_HOLDBACK_S,
+                 context_s: float = DICTATION_CONTEXT_S, language: Optional[str] = DICTATION_LANGUAGE,
+                 buffer_seconds: float = 120.0):
+        self.model_name = model_name
+        if input_rate is None:
+            input_rate = WHISPER_SAMPLE_RATE if stream_factory else input_rate_for(device, WHISPER_SAMPLE_RATE, channels)
+        self.front_end = AudioFrontEnd(input_rate, WHISPER_SAMPLE_RATE, channels)
+        self.on_text = on_text
+        self.device = device
+        self.stream_factory = stream_factory or self._open_device
+        self.step_s = step_s
+        self.window_s = window_s
+        self.holdback_s = holdback_s
+        self.context_s = context_s
+        self.language = language
+        self.buffer = RingBuffer(int(buffer_seconds * input_rate) * self.front_end.input_frame_bytes)
+        self.words: List[DictatedWord] = []
+        # Per transcribed window: (audio seconds, processing seconds)
+        self.windows: List[tuple] = []
+        # 16 kHz mono audio not yet behind the window
+        self._audio = bytearray()
+        # Stream position, in seconds, of the first byte in _audio
+        self._audio_offset = 0.0
+        self._committed_until = 0.0
+        self._model = None
+        self._fp16 = False
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.started_at = 0.0
+        self.device_status = DeviceStatus()
+
+    @property
+    def text(self) -> str:
+        return "".join(word.text for word in self.words).strip()
+
+    @classmethod
+    def from_wav(cls, path: str, speed: float = 1.0, **kwargs) -> "WhisperDictation":
+        """Dictate from a WAV file played as a live input device."""
+        import wave
+
+        with wave.open(path, "rb") as wav:
+            input_rate = wav.getframerate()
+            channels = wav.getnchannels()
+
+        def factory(samplerate, blocksize, callback):
+            return WavInputStream(path, samplerate, blocksize, callback, speed=speed)
+
+        return cls(input_rate=input_rate, channels=channels, stream_factory=factory, **kwargs)
+
+    def _open_device(self, samplerate, blocksize, callback):
+        if sd is None:
+            raise RuntimeError("sounddevice is not installed")
+        return sd.RawInputStream(samplerate=samplerate, blocksize=blocksize, device=self.device,
+                                 dtype="int16", channels=self.front_end.channels, callback=callback)
+
+    def start(self):
+        """Load the model, open the input and start transcribing."""
+        self._model = models.get("whisper", self.model_name)
+        # Half precision is only supported on the GPU
+        parameter = next(self._model.parameters(), None)
+        self._fp16 = parameter is not None and parameter.is_cuda
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="whisper-dictation", daemon=True)
+        self._thread.start()
+        self.started_at = time.time()
+        try:
+            input_rate = self.front_end.input_rate
+            self._stream = self.stream_factory(input_rate, int(input_rate * 0.1), self._callback)
+            self._stream.start()
+        except Exception:
+            self._running = False
+            self.buffer.close()
+            self._thread.join()
+            raise
+
+    def stop(self) -> str:
+        """Close the input, transcribe what is left and return the full text."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._running = False
+        self.buffer.close()
+        if self._thread is not None:
+            self._thread.join()
+        return self.text
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _callback(self, indata, frames, time_info, status):
+        # Runs on the audio thread: only count problems; _run reports them
+        self.device_status.record(status)
+        self.buffer.write(indata)
+
+    def _run(self):
+        frame_bytes = self.front_end.input_frame_bytes
+        step_bytes = int(self.step_s * self.front_end.input_rate) * frame_bytes
+        while self._running:
+            chunk = self.buffer.read(step_bytes, timeout=0.1)
+            self.device_status.report()
+            if not chunk:
+                continue
+            # If transcription fell behind, catch up on everything buffered in one window
+            backlog = len(self.buffer) - len(self.buffer) % frame_bytes
+            if backlog:
+                chunk += self.buffer.read(backlog, timeout=0)
+            self._audio += self.front_end.process(chunk)
+            self._transcribe(final=False)
+        # The input is closed: whatever is left is no longer at risk of being cut off
+        remaining = len(self.buffer) - len(self.buffer) % frame_bytes
+        if remaining:
+            self._audio += self.front_end.process(self.buffer.read(remaining, timeout=0))
+        self._audio += self.front_end.flush()
+        self._transcribe(final=True)
+
+    def _seconds(self, size: int) -> float:
+        return size / (WHISPER_SAMPLE_RATE * SAMPLE_WIDTH)
+
+    def _transcribe(self, final: bool):
+        window_end = self._audio_offset + self._seconds(len(self._audio))
+        # Start just before the first uncommitted word, but never more than window_s back
+        window_start = max(self._committed_until - self.context_s, window_end - self.window_s,
+                           self._audio_offset)
+        self._trim(window_start)
+        if not self._audio:
+            return
+        if frame_rms(bytes(self._audio)) < MIN_SPEECH_RMS:
+            # Nothing but silence since the last word: skip the model entirely
+            self._committed_until = window_end
+            return
+
+        started = time.perf_counter()
+        result = self._model.transcribe(
+            to_float_audio(bytes(self._audio)), language=self.language, fp16=self._fp16,
+            word_timestamps=True, condition_on_previous_text=False,
+            # The committed tail keeps spelling and punctuation consistent across windows
+            initial_prompt=self.text[-200:] or None,
+        )
+        self.windows.append((window_end - window_start, time.perf_counter() - started))
+
+        commit_until = window_end if final else window_end - self.holdback_s
+        committed = []
+        for word in (word for segment in result.get("segments", []) for word in segment.get("words", [])):
+            start = window_start + word["start"]
+            end = window_start + word["end"]
+            # Words before the commit point were emitted by an earlier window
+            if start < self._committed_until - 0.05:
+                continue
+            if end > commit_until:
+                break
+            committed.append(DictatedWord(word["word"], start, end, time.time()))
+        if committed:
+            self.words.extend(committed)
+            self._committed_until = committed[-1].end
+            if self.on_text:
+                self.on_text("".join(word.text for word in committed))
+        elif window_end - self._committed_until > self.window_s:
+            # A full window without a word (noise or music): stop waiting on it
+            self._committed_until = window_end - self.holdback_s
+
+    def _trim(self, start: float):
+        """Drop audio before start; the window only ever moves forward."""
+        drop = int((start - self._audio_offset) * WHISPER_SAMPLE_RATE) * SAMPLE_WIDTH
+        if drop > 0:
+            del self._audio[:drop]
+            self._audio_offset += self._seconds(drop)
+
+
+def main(argv=None):
+    """Replay a WAV file in real time and report how far the text lags behind the speaker."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark streaming Whisper dictation on CPU.")
+    parser.add_argument("path", nargs="?", default="test_audio.wav", help="16-bit mono WAV file")
+    parser.add_argument("--model", default=os.getenv("DICTATION_BENCHMARK_MODEL", "base"),
+                        help="Whisper model size or .pt checkpoint")
+    parser.add_argument("--step", type=float, default=DICTATION_STEP_S)
+    parser.add_argument("--window", type=float, default=DICTATION_WINDOW_S)
+    args = parser.parse_args(argv)
+
+    # CPU only: hide any GPU before torch is imported by the model loader
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    dictation = WhisperDictation.from_wav(args.path, model_name=args.model, step_s=args.step,
+                                          window_s=args.window,
+                                          on_text=lambda text: print(text, end="", flush=True))
+    dictation.start()
+    dictation._stream.finished.wait()
+    text = dictation.stop()
+    print()
+
+    # Lag behind the speaker: when a word appeared minus when it was spoken
+    lags = [word.emitted_at - (dictation.started_at + word.end) for word in dictation.words]
+    audio_seconds = sum(seconds for seconds, _ in dictation.windows)
+    processing = sum(seconds for _, seconds in dictation.windows)
+    print(f"{len(dictation.words)} words, {len(text)} characters, {len(dictation.windows)} windows "
+          f"(step {args.step}s, window {args.window}s, model {args.model}, CPU)", file=sys.stderr)
+    if lags:
+        lags.sort()
+        print(f"lag behind speaker: mean {statistics.mean(lags):.2f}s, "
+              f"p95 {lags[int(0.95 * (len(lags) - 1))]:.2f}s, max {lags[-1]:.2f}s", file=sys.stderr)
+    if audio_seconds:
+        print(f"window RTF {processing / audio_seconds:.2f} "
+              f"({processing:.1f}s processing for {audio_seconds:.1f}s of windowed audio)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()